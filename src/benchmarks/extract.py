@@ -0,0 +1,91 @@
+import argparse
+import json
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from bs4 import BeautifulSoup
+
+from service.extract import BACKENDS, plan_for
+
+
+# Each saved page is <name>.html next to <name>.json holding the marketplace
+# selectors it was scraped with (product_selector, title_selector, ...).
+# benchmarks/pages ships a 60-card search listing; pass another directory to
+# run on your own saves.
+DEFAULT_PAGES_DIR = Path(__file__).parent / "pages"
+
+
+def legacy_extract(html: str, marketplace) -> dict:
+    soup = BeautifulSoup(html, "html.parser")
+
+    title_element = soup.find(class_=marketplace.title_selector)
+    price_element = soup.find(class_=marketplace.price_selector)
+    url_element = soup.find(class_=marketplace.title_selector)
+    desc_element = soup.find(class_=marketplace.description_selector)
+    description = {}
+    for dl in soup.find_all("dl"):
+        dt = dl.find("dt")
+        dd = dl.find("dd")
+        if dt and dd:
+            description[dt.get_text(strip=True)] = dd.get_text(strip=True)
+
+    return {
+        "product_title": title_element.get_text(strip=True) if title_element else None,
+        "price": price_element.get_text(strip=True) if price_element else None,
+        "url": url_element.get("href") if url_element else None,
+        "description": description if desc_element else None,
+    }
+
+
+def load_pages(pages_dir: Path):
+    for html_path in sorted(pages_dir.glob("*.html")):
+        selectors = json.loads(html_path.with_suffix(".json").read_text("utf-8"))
+        marketplace = SimpleNamespace(
+            product_selector=selectors["product_selector"],
+            title_selector=selectors.get("title_selector"),
+            price_selector=selectors.get("price_selector"),
+            link_selector=selectors.get("link_selector"),
+            description_selector=selectors.get("description_selector"),
+            next_page_selector=selectors.get("next_page_selector"),
+            max_results=selectors.get("max_results"),
+        )
+        yield html_path.stem, html_path.read_text("utf-8"), marketplace
+
+
+def timed(fn, repeat: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - started) / repeat * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare extraction backends on saved marketplace pages."
+    )
+    parser.add_argument("pages_dir", nargs="?", type=Path, default=DEFAULT_PAGES_DIR)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    pages = list(load_pages(args.pages_dir))
+    if not pages:
+        parser.error(f"no <name>.html/<name>.json pairs found in {args.pages_dir}")
+
+    header = f"{'page':<24} {'KiB':>7} {'legacy ms':>10}"
+    for backend in BACKENDS:
+        header += f" {backend + ' ms':>14} {'speedup':>8}"
+    print(header)
+
+    for name, html, marketplace in pages:
+        plan = plan_for(marketplace)
+        legacy = timed(lambda: legacy_extract(html, marketplace), args.repeat)
+        row = f"{name:<24} {len(html.encode()) / 1024:>7.0f} {legacy:>10.2f}"
+        for extract in BACKENDS.values():
+            elapsed = timed(lambda: extract(html, plan), args.repeat)
+            row += f" {elapsed:>14.2f} {legacy / elapsed:>7.1f}x"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+import asyncio
+import random
+import time
+from types import SimpleNamespace
+
+from service.fanout import fan_out, run_bounded
+
+
+# Marketplace scrapes take 10-20 s in production; scaled down 100x here.
+MIN_SCRAPE_SECONDS = 0.10
+MAX_SCRAPE_SECONDS = 0.20
+MARKETPLACE_COUNTS = (1, 2, 4, 8)
+
+
+async def fake_scrape(marketplace):
+    await asyncio.sleep(marketplace.duration)
+    return marketplace.id
+
+
+async def bounded_scrape(marketplace):
+    return await run_bounded(marketplace, lambda: fake_scrape(marketplace))
+
+
+async def sequential(marketplaces):
+    return [await fake_scrape(marketplace) for marketplace in marketplaces]
+
+
+async def measure(runner, marketplaces) -> float:
+    started = time.perf_counter()
+    await runner(marketplaces)
+    return time.perf_counter() - started
+
+
+async def main():
+    random.seed(42)
+    print(f"{'marketplaces':>12} {'sum':>8} {'max':>8} {'sequential':>11} {'fan-out':>8}")
+    for count in MARKETPLACE_COUNTS:
+        marketplaces = [
+            SimpleNamespace(
+                id=i,
+                duration=random.uniform(MIN_SCRAPE_SECONDS, MAX_SCRAPE_SECONDS),
+                rate_limit_per_second=None,
+                rate_limit_burst=None,
+                max_concurrency=None,
+            )
+            for i in range(count)
+        ]
+        durations = [marketplace.duration for marketplace in marketplaces]
+        seq = await measure(sequential, marketplaces)
+        par = await measure(lambda mps: fan_out(mps, bounded_scrape), marketplaces)
+        print(
+            f"{count:>12} {sum(durations):>8.3f} {max(durations):>8.3f}"
+            f" {seq:>11.3f} {par:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
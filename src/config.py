@@ -0,0 +1,135 @@
+import os
+from dotenv import load_dotenv
+
+
+load_dotenv()
+
+
+def _bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+BROWSER_HEADLESS = _bool("BROWSER_HEADLESS", True)
+BROWSER_POOL_SIZE = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+BROWSER_CONTEXTS_PER_BROWSER = int(os.getenv("BROWSER_CONTEXTS_PER_BROWSER", "4"))
+BROWSER_MAX_PAGES = int(os.getenv("BROWSER_MAX_PAGES", "200"))
+BROWSER_MAX_MEMORY_MB = int(os.getenv("BROWSER_MAX_MEMORY_MB", "1500"))
+
+SCRAPE_MAX_CONCURRENCY = int(os.getenv("SCRAPE_MAX_CONCURRENCY", "8"))
+BACKGROUND_MAX_CONCURRENCY = int(
+    os.getenv("BACKGROUND_MAX_CONCURRENCY", str(max(1, SCRAPE_MAX_CONCURRENCY // 2)))
+)
+SCRAPE_MAX_CONCURRENCY_PER_MARKETPLACE = int(
+    os.getenv("SCRAPE_MAX_CONCURRENCY_PER_MARKETPLACE", "2")
+)
+RATE_LIMIT_PER_SECOND = float(os.getenv("RATE_LIMIT_PER_SECOND", "2"))
+RATE_LIMIT_BURST = int(os.getenv("RATE_LIMIT_BURST", "4"))
+LIMIT_MIN_CONCURRENCY = int(os.getenv("LIMIT_MIN_CONCURRENCY", "1"))
+LIMIT_MAX_CONCURRENCY = int(os.getenv("LIMIT_MAX_CONCURRENCY", "6"))
+LIMIT_INCREASE_STEP = float(os.getenv("LIMIT_INCREASE_STEP", "1"))
+LIMIT_DECREASE_FACTOR = float(os.getenv("LIMIT_DECREASE_FACTOR", "0.5"))
+LIMIT_LATENCY_SPIKE_FACTOR = float(os.getenv("LIMIT_LATENCY_SPIKE_FACTOR", "2.5"))
+LIMIT_LATENCY_EWMA_ALPHA = float(os.getenv("LIMIT_LATENCY_EWMA_ALPHA", "0.2"))
+
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "10"))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "300"))
+
+DEADLINE_NAVIGATION_SHARE = float(os.getenv("DEADLINE_NAVIGATION_SHARE", "0.4"))
+DEADLINE_READINESS_SHARE = float(os.getenv("DEADLINE_READINESS_SHARE", "0.35"))
+DEADLINE_EXTRACTION_SHARE = float(os.getenv("DEADLINE_EXTRACTION_SHARE", "0.1"))
+DEADLINE_WRITE_SHARE = float(os.getenv("DEADLINE_WRITE_SHARE", "0.15"))
+DEADLINE_MIN_STAGE_MS = int(os.getenv("DEADLINE_MIN_STAGE_MS", "100"))
+
+READY_MAX_WAIT_MS = int(os.getenv("READY_MAX_WAIT_MS", "10000"))
+READY_MIN_WAIT_MS = int(os.getenv("READY_MIN_WAIT_MS", "2000"))
+READY_PERCENTILE = float(os.getenv("READY_PERCENTILE", "95"))
+READY_HEADROOM = float(os.getenv("READY_HEADROOM", "1.5"))
+READY_SAMPLE_SIZE = int(os.getenv("READY_SAMPLE_SIZE", "50"))
+READY_MIN_SAMPLES = int(os.getenv("READY_MIN_SAMPLES", "5"))
+
+BLOCKED_RESOURCE_TYPES = [
+    t.strip()
+    for t in os.getenv("BLOCKED_RESOURCE_TYPES", "image,media,font").split(",")
+    if t.strip()
+]
+BLOCKED_URL_PATTERNS = [
+    p.strip()
+    for p in os.getenv(
+        "BLOCKED_URL_PATTERNS",
+        "*google-analytics.com*,*googletagmanager.com*,*doubleclick.net*,"
+        "*facebook.net*,*connect.facebook.com*,*hotjar.com*,*criteo.*,"
+        "*adservice.google.*,*mc.yandex.*,*tiktok.com/i18n/pixel*",
+    ).split(",")
+    if p.strip()
+]
+
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "10"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_USER_AGENT = os.getenv(
+    "HTTP_USER_AGENT",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/136.0.0.0 Safari/537.36",
+)
+RENDER_MODE_REPROBE_SECONDS = int(os.getenv("RENDER_MODE_REPROBE_SECONDS", "3600"))
+
+EXTRACTOR_BACKEND = os.getenv("EXTRACTOR_BACKEND", "selectolax")
+
+EXTRACT_PROCESS_WORKERS = int(
+    os.getenv("EXTRACT_PROCESS_WORKERS", str(max(1, (os.cpu_count() or 2) // 2)))
+)
+EXTRACT_INLINE_MAX_BYTES = int(os.getenv("EXTRACT_INLINE_MAX_BYTES", str(256 * 1024)))
+
+SCRAPE_MAX_RESULTS = int(os.getenv("SCRAPE_MAX_RESULTS", "20"))
+
+SCRAPE_CACHE_TTL_SECONDS = int(os.getenv("SCRAPE_CACHE_TTL_SECONDS", "900"))
+SCRAPE_CACHE_MAX_ENTRIES = int(os.getenv("SCRAPE_CACHE_MAX_ENTRIES", "1000"))
+SCRAPE_CACHE_PERSIST = _bool("SCRAPE_CACHE_PERSIST", False)
+
+SCRAPE_JOB_CONCURRENCY = int(os.getenv("SCRAPE_JOB_CONCURRENCY", "4"))
+SCRAPE_JOB_EVENTS_RETENTION_SECONDS = int(
+    os.getenv("SCRAPE_JOB_EVENTS_RETENTION_SECONDS", "300")
+)
+
+SCRAPE_EXECUTION = os.getenv("SCRAPE_EXECUTION", "local")
+QUEUE_MAX_ATTEMPTS = int(os.getenv("QUEUE_MAX_ATTEMPTS", "3"))
+QUEUE_LEASE_SECONDS = int(os.getenv("QUEUE_LEASE_SECONDS", "120"))
+QUEUE_BACKOFF_BASE_SECONDS = int(os.getenv("QUEUE_BACKOFF_BASE_SECONDS", "30"))
+QUEUE_BACKOFF_MAX_SECONDS = int(os.getenv("QUEUE_BACKOFF_MAX_SECONDS", "900"))
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+WORKER_POLL_SECONDS = float(os.getenv("WORKER_POLL_SECONDS", "2"))
+
+BATCH_LANE_WORKERS = int(os.getenv("BATCH_LANE_WORKERS", "2"))
+BATCH_CONTEXT_REUSE = int(os.getenv("BATCH_CONTEXT_REUSE", "25"))
+BATCH_MAX_TASKS = int(os.getenv("BATCH_MAX_TASKS", "100000"))
+
+BULK_WRITE_SIZE = int(os.getenv("BULK_WRITE_SIZE", "500"))
+BULK_COPY_THRESHOLD = int(os.getenv("BULK_COPY_THRESHOLD", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "5000"))
+PAGE_DEFAULT_LIMIT = int(os.getenv("PAGE_DEFAULT_LIMIT", "100"))
+PAGE_MAX_LIMIT = int(os.getenv("PAGE_MAX_LIMIT", "1000"))
+
+SCHEDULER_ENABLED = _bool("SCHEDULER_ENABLED", False)
+SCHEDULER_TICK_SECONDS = float(os.getenv("SCHEDULER_TICK_SECONDS", "60"))
+SCHEDULER_MAX_PER_TICK = int(os.getenv("SCHEDULER_MAX_PER_TICK", "100"))
+SCHEDULER_DEFAULT_INTERVAL_MINUTES = int(
+    os.getenv("SCHEDULER_DEFAULT_INTERVAL_MINUTES", "1440")
+)
+SCHEDULER_JITTER = float(os.getenv("SCHEDULER_JITTER", "0.1"))
+SCHEDULER_FRESH_FRACTION = float(os.getenv("SCHEDULER_FRESH_FRACTION", "0.5"))
+
+CHANGE_FEED_ENABLED = _bool("CHANGE_FEED_ENABLED", True)
+CHANGE_FEED_INTERVAL_SECONDS = float(os.getenv("CHANGE_FEED_INTERVAL_SECONDS", "1"))
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+RETENTION_ENABLED = _bool("RETENTION_ENABLED", False)
+RETENTION_DAYS = int(os.getenv("RETENTION_DAYS", "180"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "20000"))
+RETENTION_INTERVAL_SECONDS = float(os.getenv("RETENTION_INTERVAL_SECONDS", "3600"))
+# Raw price history is dropped by whole months and is not archived; 0 keeps
+# it forever. Daily rollups are always kept.
+PRICE_HISTORY_RETENTION_DAYS = int(os.getenv("PRICE_HISTORY_RETENTION_DAYS", "0"))
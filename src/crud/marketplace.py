@@ -1,6 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy import update, delete
+import config
+from crud.pagination import Page, fetch_page
 from models.marketplace import Marketplace
 from schemas import MarketplaceCreate, MarketplaceUpdate
 
@@ -25,6 +27,22 @@ async def get_marketplaces(db: AsyncSession):
     return result.scalars().all()
 
 
+async def get_marketplaces_page(
+    db: AsyncSession,
+    cursor: str | None = None,
+    limit: int = config.PAGE_DEFAULT_LIMIT,
+    fields: list[str] | None = None,
+) -> Page:
+    return await fetch_page(db, Marketplace, [], cursor, limit, fields)
+
+
+async def get_marketplaces_by_ids(db: AsyncSession, marketplace_ids: list[int]):
+    result = await db.execute(
+        select(Marketplace).where(Marketplace.id.in_(marketplace_ids))
+    )
+    return result.scalars().all()
+
+
 async def update_marketplace(
     db: AsyncSession, marketplace_id: int, marketplace: MarketplaceUpdate
 ):
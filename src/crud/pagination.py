@@ -0,0 +1,88 @@
+import base64
+import binascii
+import json
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+
+class Page(NamedTuple):
+    items: list[Any]
+    next_cursor: Optional[str]
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    if not cursor:
+        return 0
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"])
+    except (binascii.Error, ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+
+
+def parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+
+def _columns(model, fields: list[str]) -> list:
+    table = model.__table__
+    unknown = [field for field in fields if field not in table.c]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    # The id is always selected: the next cursor is built from it.
+    return [table.c.id] + [table.c[field] for field in fields if field != "id"]
+
+
+# Keyset pagination on the primary key: every page is an index seek past the
+# last id of the previous one, so its cost does not depend on the offset.
+async def fetch_page(
+    db: AsyncSession,
+    model,
+    conditions: list,
+    cursor: Optional[str],
+    limit: int,
+    fields: Optional[list[str]] = None,
+) -> Page:
+    after = decode_cursor(cursor)
+    query = select(*_columns(model, fields)) if fields else select(model)
+    for condition in conditions:
+        query = query.where(condition)
+    query = query.where(model.id > after).order_by(model.id).limit(limit + 1)
+    result = await db.execute(query)
+    if fields:
+        items = [dict(row) for row in result.mappings().all()]
+    else:
+        items = list(result.scalars().all())
+    if len(items) <= limit:
+        return Page(items, None)
+    items = items[:limit]
+    last = items[-1]
+    return Page(items, encode_cursor(last["id"] if fields else last.id))
+
+
+def page_rows(
+    rows: list[dict],
+    cursor: Optional[str],
+    limit: int,
+    fields: Optional[list[str]] = None,
+) -> Page:
+    after = decode_cursor(cursor)
+    rows = sorted((row for row in rows if row["id"] > after), key=lambda r: r["id"])
+    items = rows[:limit]
+    if fields:
+        unknown = [field for field in fields if items and field not in items[0]]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        items = [
+            {"id": row["id"], **{field: row[field] for field in fields}}
+            for row in items
+        ]
+    next_cursor = encode_cursor(items[-1]["id"]) if len(rows) > limit else None
+    return Page(items, next_cursor)
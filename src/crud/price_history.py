@@ -0,0 +1,205 @@
+import datetime
+from sqlalchemy import Date, case, cast, func, insert, text
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from database import engine
+from models import pricehistory
+
+_partitions: set[datetime.date] = set()
+
+
+def _month(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def _next_month(month: datetime.date) -> datetime.date:
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def partition_ddl(month: datetime.date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS price_history_{month:%Y_%m} "
+        f"PARTITION OF price_history "
+        f"FOR VALUES FROM ('{month}') TO ('{_next_month(month)}')"
+    )
+
+
+async def ensure_partitions(months: set[datetime.date]):
+    missing = months - _partitions
+    if not missing:
+        return
+    # Own short transaction: creating a partition locks the parent table, so
+    # it must not stay locked for the rest of the caller's write.
+    async with engine.begin() as connection:
+        await connection.execute(
+            text("SELECT pg_advisory_xact_lock(hashtext('price_history_partitions'))")
+        )
+        for month in sorted(missing):
+            await connection.execute(text(partition_ddl(month)))
+    _partitions.update(missing)
+
+
+async def drop_partitions_before(day: datetime.date) -> list[str]:
+    # Raw observations of a month are dropped once the whole month is past
+    # retention; its daily rollups are kept, so history still covers it.
+    async with engine.begin() as connection:
+        result = await connection.execute(
+            text(
+                "SELECT child.relname FROM pg_inherits "
+                "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+                "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+                "WHERE parent.relname = 'price_history'"
+            )
+        )
+        dropped = []
+        for name in result.scalars().all():
+            # Partitions created by hand under other names are left alone.
+            try:
+                month = datetime.datetime.strptime(name, "price_history_%Y_%m").date()
+            except ValueError:
+                continue
+            if _next_month(month) <= day:
+                await connection.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                _partitions.discard(month)
+                dropped.append(name)
+    return dropped
+
+
+def _observations(rows: list[dict], observed_at: datetime.datetime) -> list[dict]:
+    # One observation per scrape and marketplace: the first priced row, which
+    # is the top search result, same as the price comparison uses.
+    observations = {}
+    for row in rows:
+        key = (row["request_id"], row["marketplace_id"])
+        if (
+            key in observations
+            or row["product_id"] is None
+            or row["status"] != "success"
+            or row["price_minor"] is None
+        ):
+            continue
+        observations[key] = {
+            "observed_at": observed_at,
+            "product_id": row["product_id"],
+            "marketplace_id": row["marketplace_id"],
+            "request_id": row["request_id"],
+            "price_minor": row["price_minor"],
+            "currency": row["scraped_currency"],
+        }
+    return list(observations.values())
+
+
+# A day's rollup stays in the currency it was first seen in. Samples in
+# another currency would skew its prices, so they are left to the raw
+# history only.
+def _daily_rollups(observations: list[dict]) -> list[dict]:
+    rollups = {}
+    for observation in observations:
+        key = (
+            observation["product_id"],
+            observation["marketplace_id"],
+            observation["observed_at"].date(),
+        )
+        price = observation["price_minor"]
+        rollup = rollups.get(key)
+        if rollup is None:
+            rollups[key] = {
+                "product_id": key[0],
+                "marketplace_id": key[1],
+                "day": key[2],
+                "min_price_minor": price,
+                "max_price_minor": price,
+                "sum_price_minor": price,
+                "samples": 1,
+                "last_price_minor": price,
+                "last_observed_at": observation["observed_at"],
+                "currency": observation["currency"],
+            }
+            continue
+        if observation["currency"] != rollup["currency"]:
+            continue
+        rollup["min_price_minor"] = min(rollup["min_price_minor"], price)
+        rollup["max_price_minor"] = max(rollup["max_price_minor"], price)
+        rollup["sum_price_minor"] += price
+        rollup["samples"] += 1
+        if observation["observed_at"] >= rollup["last_observed_at"]:
+            rollup["last_price_minor"] = price
+            rollup["last_observed_at"] = observation["observed_at"]
+    # Sorted so concurrent writers lock rollup rows in the same order.
+    return [rollups[key] for key in sorted(rollups)]
+
+
+async def record_prices(db: AsyncSession, rows: list[dict]):
+    observations = _observations(rows, datetime.datetime.now())
+    if not observations:
+        return
+    await ensure_partitions(
+        {_month(observation["observed_at"].date()) for observation in observations}
+    )
+    await db.execute(insert(pricehistory.PriceHistory), observations)
+
+    rollup = pricehistory.PriceDailyRollup
+    statement = pg_insert(rollup).values(_daily_rollups(observations))
+    newer = statement.excluded.last_observed_at >= rollup.last_observed_at
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=[rollup.product_id, rollup.marketplace_id, rollup.day],
+            set_={
+                "min_price_minor": func.least(
+                    rollup.min_price_minor, statement.excluded.min_price_minor
+                ),
+                "max_price_minor": func.greatest(
+                    rollup.max_price_minor, statement.excluded.max_price_minor
+                ),
+                "sum_price_minor": rollup.sum_price_minor
+                + statement.excluded.sum_price_minor,
+                "samples": rollup.samples + statement.excluded.samples,
+                "last_price_minor": case(
+                    (newer, statement.excluded.last_price_minor),
+                    else_=rollup.last_price_minor,
+                ),
+                "last_observed_at": func.greatest(
+                    rollup.last_observed_at, statement.excluded.last_observed_at
+                ),
+            },
+            where=rollup.currency.is_not_distinct_from(statement.excluded.currency),
+        )
+    )
+
+
+async def get_price_history(
+    db: AsyncSession,
+    product_id: int,
+    since: datetime.date,
+    resolution: str = "day",
+    marketplace_ids: list[int] | None = None,
+):
+    rollup = pricehistory.PriceDailyRollup
+    period = cast(func.date_trunc(resolution, rollup.day), Date).label("period")
+    last_price = array_agg(
+        aggregate_order_by(rollup.last_price_minor, rollup.day.desc())
+    )[1]
+    query = (
+        select(
+            rollup.marketplace_id,
+            period,
+            rollup.currency,
+            func.min(rollup.min_price_minor).label("min_price_minor"),
+            func.max(rollup.max_price_minor).label("max_price_minor"),
+            func.sum(rollup.sum_price_minor).label("sum_price_minor"),
+            func.sum(rollup.samples).label("samples"),
+            last_price.label("last_price_minor"),
+        )
+        .where(rollup.product_id == product_id)
+        .where(rollup.day >= since)
+        # By label: a second date_trunc would be a separate bind parameter,
+        # which Postgres does not accept as the same grouping expression.
+        .group_by(rollup.marketplace_id, "period", rollup.currency)
+        .order_by(rollup.marketplace_id, period)
+    )
+    if marketplace_ids is not None:
+        query = query.where(rollup.marketplace_id.in_(marketplace_ids))
+    result = await db.execute(query)
+    return result.all()
@@ -1,6 +1,9 @@
+import datetime
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import update, delete
+from sqlalchemy import or_, update, delete
+import config
+from crud.pagination import Page, fetch_page
 from models.product import Product
 from schemas import ProductCreate, ProductUpdate
 
@@ -18,11 +21,48 @@ async def get_product(db: AsyncSession, product_id: int):
     return result.scalar_one_or_none()
 
 
-async def get_products(db: AsyncSession):
-    result = await db.execute(select(Product))
+async def get_products(
+    db: AsyncSession,
+    cursor: str | None = None,
+    limit: int = config.PAGE_DEFAULT_LIMIT,
+    fields: list[str] | None = None,
+) -> Page:
+    return await fetch_page(db, Product, [], cursor, limit, fields)
+
+
+async def get_products_by_ids(db: AsyncSession, product_ids: list[int]):
+    result = await db.execute(select(Product).where(Product.id.in_(product_ids)))
+    return result.scalars().all()
+
+
+async def get_due_products(db: AsyncSession, now: datetime.datetime, limit: int):
+    result = await db.execute(
+        select(Product)
+        .where(
+            or_(
+                Product.refresh_interval_minutes.is_(None),
+                Product.refresh_interval_minutes > 0,
+            )
+        )
+        .where(or_(Product.next_refresh_at.is_(None), Product.next_refresh_at <= now))
+        .order_by(Product.next_refresh_at.asc().nulls_first())
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
     return result.scalars().all()
 
 
+async def set_next_refresh(db: AsyncSession, schedule: dict[int, datetime.datetime]):
+    await db.execute(
+        update(Product),
+        [
+            {"id": product_id, "next_refresh_at": next_refresh_at}
+            for product_id, next_refresh_at in schedule.items()
+        ],
+    )
+    await db.commit()
+
+
 async def update_product(db: AsyncSession, product: ProductUpdate):
     await db.execute(
         update(Product).where(Product.id == product.id).values(**product.model_dump())
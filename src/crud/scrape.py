@@ -1,16 +1,25 @@
 import datetime
+import json
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy import insert
-from sqlalchemy.orm import joinedload
+from sqlalchemy import delete, func, insert, or_, text, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import aliased, joinedload
+from crud import price_history as crud_price_history
+from crud.pagination import Page, fetch_page
+from models import marketplace
 from models import scraperequest
 from models import scrapedproduct
+from models import scrapesighting
 from schemas import ScrapeRequestCreate
 from schemas import ScrapedProductCreate
+import config
 
 
-async def create_scrape_request(db: AsyncSession, request_data: ScrapeRequestCreate):
-    new_request = scraperequest.ScrapeRequest(**request_data.dict())
+async def create_scrape_request(
+    db: AsyncSession, request_data: ScrapeRequestCreate, status: str = "running"
+):
+    new_request = scraperequest.ScrapeRequest(**request_data.dict(), status=status)
     db.add(new_request)
     await db.commit()
     await db.refresh(new_request)
@@ -26,44 +35,123 @@ async def get_scrape_request(db: AsyncSession, request_id: int):
     return result.scalar_one_or_none()
 
 
-async def get_all_scrape_requests(db: AsyncSession):
-    result = await db.execute(select(scraperequest.ScrapeRequest))
-    return result.scalars().all()
+async def update_scrape_request_status(
+    db: AsyncSession, request_id: int, status: str, finished: bool = False
+):
+    values = {"status": status}
+    if finished:
+        values["finished_at"] = datetime.datetime.now()
+    await db.execute(
+        update(scraperequest.ScrapeRequest)
+        .where(scraperequest.ScrapeRequest.id == request_id)
+        .values(**values)
+    )
+    await db.commit()
+
 
+async def get_all_scrape_requests(
+    db: AsyncSession,
+    cursor: str | None = None,
+    limit: int = config.PAGE_DEFAULT_LIMIT,
+    fields: list[str] | None = None,
+) -> Page:
+    return await fetch_page(db, scraperequest.ScrapeRequest, [], cursor, limit, fields)
 
-async def get_requests_by_date(date: datetime.date, db: AsyncSession):
-    result = await db.execute(
-        select(scraperequest.ScrapeRequest).where(
-            scraperequest.ScrapeRequest.requested_at == date
-        )
+
+async def get_requests_by_date(
+    date: datetime.date,
+    db: AsyncSession,
+    cursor: str | None = None,
+    limit: int = config.PAGE_DEFAULT_LIMIT,
+    fields: list[str] | None = None,
+) -> Page:
+    return await fetch_page(
+        db,
+        scraperequest.ScrapeRequest,
+        [scraperequest.ScrapeRequest.requested_at == date],
+        cursor,
+        limit,
+        fields,
     )
-    return result.scalars().all()
 
 
-async def find_product_by_marketplace(
-    product_id: int, marketplace_id: int, db: AsyncSession
+async def get_latest_prices(
+    db: AsyncSession, product_id: int, marketplace_ids: list[int] | None = None
 ):
+    scraped = scrapedproduct.ScrapedProduct
+    # Latest successful snapshot per marketplace; within one scrape the top
+    # search result represents the marketplace.
+    latest = (
+        select(scraped)
+        .distinct(scraped.marketplace_id)
+        .where(scraped.product_id == product_id)
+        .where(scraped.status == "success")
+        .where(scraped.price_minor.is_not(None))
+        .order_by(
+            scraped.marketplace_id,
+            scraped.last_request_id.desc(),
+            scraped.page,
+            scraped.position,
+            scraped.id,
+        )
+    )
+    if marketplace_ids is not None:
+        latest = latest.where(scraped.marketplace_id.in_(marketplace_ids))
+    latest = latest.subquery()
+    snapshot = aliased(scraped, latest)
+    # Prices are only comparable within one currency, so ranks are too.
+    rank = (
+        func.rank()
+        .over(partition_by=latest.c.scraped_currency, order_by=latest.c.price_minor)
+        .label("rank")
+    )
     result = await db.execute(
-        select(scrapedproduct.ScrapedProduct)
-        .where(scrapedproduct.ScrapedProduct.marketplace_id == marketplace_id)
-        .where(scrapedproduct.ScrapedProduct.product_id == product_id)
+        select(snapshot, marketplace.Marketplace.name, rank)
+        .join(
+            marketplace.Marketplace,
+            marketplace.Marketplace.id == snapshot.marketplace_id,
+        )
+        .order_by(
+            latest.c.scraped_currency, latest.c.price_minor, latest.c.marketplace_id
+        )
     )
-    return result.scalars().one()
+    return result.all()
+
+
+def _scraped_product_row(
+    product_data: ScrapedProductCreate, seen_at: datetime.datetime
+) -> dict:
+    return {
+        "request_id": product_data.request_id,
+        "marketplace_id": product_data.marketplace_id,
+        "product_id": product_data.product_id,
+        "scraped_product_title": product_data.scraped_product_title,
+        "scraped_price": product_data.scraped_price,
+        "price_minor": product_data.price_minor,
+        "scraped_currency": product_data.scraped_currency,
+        "product_url": (
+            str(product_data.product_url)
+            if product_data.product_url is not None
+            else None
+        ),
+        "scraped_at": product_data.scraped_at,
+        "status": product_data.status,
+        "scraped_description": product_data.scraped_description,
+        "error_message": product_data.error_message,
+        "page": product_data.page,
+        "position": product_data.position,
+        "snapshot_key": product_data.snapshot_key,
+        "content_hash": product_data.content_hash,
+        "version": 1,
+        "previous_id": None,
+        "last_seen_at": seen_at,
+        "last_request_id": product_data.request_id,
+    }
 
 
 async def save_scraped_product(db: AsyncSession, product_data: ScrapedProductCreate):
     new_product = scrapedproduct.ScrapedProduct(
-        request_id=product_data.request_id,
-        marketplace_id=product_data.marketplace_id,
-        product_id=product_data.product_id,
-        scraped_product_title=product_data.scraped_product_title,
-        scraped_price=product_data.scraped_price,
-        scraped_currency=product_data.scraped_currency,
-        product_url=str(product_data.product_url),
-        scraped_at=product_data.scraped_at,
-        status=product_data.status,
-        scraped_description=product_data.scraped_description,
-        error_message=product_data.error_message,
+        **_scraped_product_row(product_data, datetime.datetime.now())
     )
     db.add(new_product)
     await db.commit()
@@ -71,10 +159,305 @@ async def save_scraped_product(db: AsyncSession, product_data: ScrapedProductCre
     return new_product
 
 
-async def get_scraped_products_by_request_id(db: AsyncSession, request_id: int):
+async def _copy_scraped_products(db: AsyncSession, rows: list[dict]):
+    columns = list(rows[0])
+    connection = await db.connection()
+    raw = await connection.get_raw_connection()
+    await raw.driver_connection.copy_records_to_table(
+        scrapedproduct.ScrapedProduct.__tablename__,
+        columns=columns,
+        records=[
+            tuple(
+                (
+                    json.dumps(row[column], ensure_ascii=False)
+                    if column == "scraped_description" and row[column] is not None
+                    else row[column]
+                )
+                for column in columns
+            )
+            for row in rows
+        ],
+    )
+
+
+async def _reserve_ids(db: AsyncSession, count: int) -> list[int]:
+    # COPY cannot return generated keys, so ids are taken from the sequence
+    # up front.
     result = await db.execute(
-        select(scrapedproduct.ScrapedProduct).where(
-            scrapedproduct.ScrapedProduct.request_id == request_id
+        text(
+            "SELECT nextval(pg_get_serial_sequence('scraped_products', 'id')) "
+            "FROM generate_series(1, :count)"
+        ),
+        {"count": count},
+    )
+    return list(result.scalars().all())
+
+
+async def _current_versions(db: AsyncSession, keys: list[str]) -> dict:
+    scraped = scrapedproduct.ScrapedProduct
+    current = {}
+    for start in range(0, len(keys), 1000):
+        result = await db.execute(
+            select(
+                scraped.id, scraped.snapshot_key, scraped.content_hash, scraped.version
+            )
+            .distinct(scraped.snapshot_key)
+            .where(scraped.snapshot_key.in_(keys[start : start + 1000]))
+            .order_by(scraped.snapshot_key, scraped.id.desc())
+        )
+        current.update((row.snapshot_key, row) for row in result.all())
+    return current
+
+
+async def save_scraped_products(
+    db: AsyncSession,
+    products_data: list[ScrapedProductCreate],
+    commit: bool = True,
+) -> list[int]:
+    if not products_data:
+        return []
+    seen_at = datetime.datetime.now()
+    rows = [
+        _scraped_product_row(product_data, seen_at) for product_data in products_data
+    ]
+    keys = list({row["snapshot_key"] for row in rows if row["snapshot_key"]})
+    current = await _current_versions(db, keys) if keys else {}
+
+    # Two writers racing on the same listing can both add a version; that only
+    # costs a duplicate row, the next write compares against the newest one.
+    new_rows, seen_rows, written_keys = [], [], set()
+    for row in rows:
+        key = row["snapshot_key"]
+        if key is not None:
+            if key in written_keys:
+                continue
+            written_keys.add(key)
+            head = current.get(key)
+            if head is not None and head.content_hash == row["content_hash"]:
+                seen_rows.append(
+                    {
+                        "id": head.id,
+                        "last_seen_at": seen_at,
+                        "last_request_id": row["request_id"],
+                        "page": row["page"],
+                        "position": row["position"],
+                    }
+                )
+                continue
+            if head is not None:
+                row["version"] = head.version + 1
+                row["previous_id"] = head.id
+        new_rows.append(row)
+
+    if seen_rows:
+        # In id order, the same order sequence_changes locks rows in.
+        seen_rows.sort(key=lambda row: row["id"])
+        await db.execute(update(scrapedproduct.ScrapedProduct), seen_rows)
+    if len(new_rows) >= config.BULK_COPY_THRESHOLD:
+        ids = await _reserve_ids(db, len(new_rows))
+        for row, row_id in zip(new_rows, ids):
+            row["id"] = row_id
+        await _copy_scraped_products(db, new_rows)
+    elif new_rows:
+        result = await db.execute(
+            insert(scrapedproduct.ScrapedProduct).returning(
+                scrapedproduct.ScrapedProduct.id, sort_by_parameter_order=True
+            ),
+            new_rows,
+        )
+        ids = list(result.scalars().all())
+    else:
+        ids = []
+    sightings = [
+        {
+            "request_id": row["request_id"],
+            "snapshot_id": row_id,
+            "page": row["page"],
+            "position": row["position"],
+        }
+        for row, row_id in zip(new_rows, ids)
+    ] + [
+        {
+            "request_id": row["last_request_id"],
+            "snapshot_id": row["id"],
+            "page": row["page"],
+            "position": row["position"],
+        }
+        for row in seen_rows
+    ]
+    # A listing seen again by a later flush of the same request keeps its
+    # first sighting.
+    await db.execute(
+        pg_insert(scrapesighting.ScrapeSighting).on_conflict_do_nothing(), sightings
+    )
+    await crud_price_history.record_prices(db, rows)
+    if commit:
+        await db.commit()
+    return ids
+
+
+async def get_scraped_products_by_request_id(
+    db: AsyncSession,
+    request_id: int,
+    after: int = 0,
+    limit: int | None = None,
+) -> tuple[list[dict], list[dict]]:
+    scraped = scrapedproduct.ScrapedProduct
+    sighting = scrapesighting.ScrapeSighting
+    # A snapshot's own page and position are its latest sighting's, so the
+    # request's are read from the sighting. Sightings of snapshots retention
+    # has moved to the archive are returned separately.
+    columns = [
+        column
+        for column in scraped.__table__.columns
+        if column.name not in ("id", "page", "position")
+    ]
+    query = (
+        select(
+            sighting.snapshot_id.label("id"),
+            scraped.id.label("stored_id"),
+            *columns,
+            sighting.page,
+            sighting.position,
         )
+        .outerjoin(scraped, scraped.id == sighting.snapshot_id)
+        .where(sighting.request_id == request_id)
+        .where(sighting.snapshot_id > after)
+        .order_by(sighting.snapshot_id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
+    rows, archived = [], []
+    for row in result.mappings().all():
+        row = dict(row)
+        if row.pop("stored_id") is None:
+            archived.append(
+                {"id": row["id"], "page": row["page"], "position": row["position"]}
+            )
+        else:
+            rows.append(row)
+    return rows, archived
+
+
+async def get_last_success_times(
+    db: AsyncSession, product_ids: list[int]
+) -> dict[int, datetime.datetime]:
+    result = await db.execute(
+        select(
+            scrapedproduct.ScrapedProduct.product_id,
+            func.max(scrapedproduct.ScrapedProduct.last_seen_at),
+        )
+        .where(scrapedproduct.ScrapedProduct.product_id.in_(product_ids))
+        .where(scrapedproduct.ScrapedProduct.status == "success")
+        .where(scrapedproduct.ScrapedProduct.last_seen_at.is_not(None))
+        .group_by(scrapedproduct.ScrapedProduct.product_id)
+    )
+    return dict(result.all())
+
+
+async def sequence_changes(db: AsyncSession) -> int:
+    # Feed positions are handed out to committed rows only, by one session at
+    # a time, so a reader that sees position n already sees every lower one.
+    # An id cursor would skip rows whose insert commits after a higher id.
+    await db.execute(
+        text("SELECT pg_advisory_xact_lock(hashtext('scraped_products_change_seq'))")
+    )
+    result = await db.execute(
+        text(
+            "UPDATE scraped_products sp SET change_seq = pending.seq FROM ("
+            "SELECT id, nextval('scraped_products_change_seq') AS seq FROM ("
+            "SELECT id FROM scraped_products "
+            "WHERE change_seq IS NULL AND snapshot_key IS NOT NULL ORDER BY id"
+            ") unsequenced) pending WHERE sp.id = pending.id"
+        )
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def get_changes(
+    db: AsyncSession,
+    since: int,
+    limit: int,
+    product_id: int | None = None,
+    marketplace_ids: list[int] | None = None,
+):
+    scraped = scrapedproduct.ScrapedProduct
+    previous = aliased(scraped)
+    query = (
+        select(
+            scraped,
+            previous.scraped_product_title.label("previous_title"),
+            previous.scraped_price.label("previous_price"),
+            previous.price_minor.label("previous_price_minor"),
+        )
+        .outerjoin(previous, previous.id == scraped.previous_id)
+        .where(scraped.change_seq > since)
+        .where(
+            or_(
+                scraped.previous_id.is_(None),
+                previous.price_minor.is_distinct_from(scraped.price_minor),
+                previous.scraped_product_title.is_distinct_from(
+                    scraped.scraped_product_title
+                ),
+            )
+        )
+        .order_by(scraped.change_seq)
+        .limit(limit)
+    )
+    if product_id is not None:
+        query = query.where(scraped.product_id == product_id)
+    if marketplace_ids is not None:
+        query = query.where(scraped.marketplace_id.in_(marketplace_ids))
+    result = await db.execute(query)
+    return result.all()
+
+
+async def get_expired_rows(
+    db: AsyncSession, cutoff: datetime.datetime, limit: int
+) -> list[dict]:
+    scraped = scrapedproduct.ScrapedProduct
+    # Measured from the last sighting, so listings that are still being
+    # re-scraped unchanged are never archived.
+    result = await db.execute(
+        select(*scraped.__table__.columns)
+        .where(func.coalesce(scraped.last_seen_at, scraped.scraped_at) < cutoff)
+        .order_by(scraped.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    return [dict(row) for row in result.mappings().all()]
+
+
+async def delete_scraped_products(db: AsyncSession, ids: list[int]):
+    await db.execute(
+        delete(scrapedproduct.ScrapedProduct).where(
+            scrapedproduct.ScrapedProduct.id.in_(ids)
+        )
+    )
+
+
+async def stream_scraped_products(
+    db: AsyncSession,
+    since: datetime.date | None = None,
+    until: datetime.date | None = None,
+    marketplace_ids: list[int] | None = None,
+    product_id: int | None = None,
+):
+    scraped = scrapedproduct.ScrapedProduct
+    query = select(*scraped.__table__.columns).order_by(scraped.id)
+    if since is not None:
+        query = query.where(scraped.scraped_at >= since)
+    if until is not None:
+        query = query.where(scraped.scraped_at <= until)
+    if marketplace_ids is not None:
+        query = query.where(scraped.marketplace_id.in_(marketplace_ids))
+    if product_id is not None:
+        query = query.where(scraped.product_id == product_id)
+    # Server-side cursor: only one batch of rows is held in memory at a time.
+    result = await db.stream(
+        query.execution_options(yield_per=config.EXPORT_BATCH_SIZE)
     )
-    return result.scalars().all()
+    async for partition in result.mappings().partitions():
+        yield [dict(row) for row in partition]
@@ -0,0 +1,145 @@
+import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import func, insert, update
+from models.scrapebatch import ScrapeBatch
+from models.scrapetask import ScrapeTask
+from models import scraperequest
+
+
+async def create_batch(
+    db: AsyncSession,
+    total_products: int,
+    total_marketplaces: int,
+    status: str = "pending",
+) -> ScrapeBatch:
+    batch = ScrapeBatch(
+        status=status,
+        total_products=total_products,
+        total_marketplaces=total_marketplaces,
+        total_tasks=total_products * total_marketplaces,
+        done_tasks=0,
+        failed_tasks=0,
+    )
+    db.add(batch)
+    await db.commit()
+    await db.refresh(batch)
+    return batch
+
+
+async def create_batch_requests(
+    db: AsyncSession, batch_id: int, queries: list[str], status: str = "pending"
+) -> list[int]:
+    # executemany is sent in pages of rows, so a large batch stays under the
+    # bind parameter limit, and ids come back in the order of the queries.
+    result = await db.execute(
+        insert(scraperequest.ScrapeRequest).returning(
+            scraperequest.ScrapeRequest.id, sort_by_parameter_order=True
+        ),
+        [
+            {
+                "product_name_searched": query,
+                "requested_at": datetime.date.today(),
+                "status": status,
+                "batch_id": batch_id,
+            }
+            for query in queries
+        ],
+    )
+    request_ids = list(result.scalars().all())
+    await db.commit()
+    return request_ids
+
+
+async def get_batch(db: AsyncSession, batch_id: int) -> ScrapeBatch | None:
+    result = await db.execute(select(ScrapeBatch).where(ScrapeBatch.id == batch_id))
+    return result.scalar_one_or_none()
+
+
+async def update_batch_progress(
+    db: AsyncSession, batch_id: int, done: int, failed: int, commit: bool = True
+):
+    await db.execute(
+        update(ScrapeBatch)
+        .where(ScrapeBatch.id == batch_id)
+        .values(
+            done_tasks=ScrapeBatch.done_tasks + done,
+            failed_tasks=ScrapeBatch.failed_tasks + failed,
+        )
+    )
+    if commit:
+        await db.commit()
+
+
+async def update_batch_status(
+    db: AsyncSession,
+    batch_id: int,
+    status: str,
+    finished: bool = False,
+    commit: bool = True,
+):
+    values = {"status": status}
+    if finished:
+        values["finished_at"] = datetime.datetime.now()
+    await db.execute(
+        update(ScrapeBatch).where(ScrapeBatch.id == batch_id).values(**values)
+    )
+    if commit:
+        await db.commit()
+
+
+async def finish_requests(
+    db: AsyncSession, request_ids: list[int], status: str, commit: bool = True
+):
+    await db.execute(
+        update(scraperequest.ScrapeRequest)
+        .where(scraperequest.ScrapeRequest.id.in_(request_ids))
+        .values(status=status, finished_at=datetime.datetime.now())
+    )
+    if commit:
+        await db.commit()
+
+
+async def start_batches(db: AsyncSession, request_ids: set[int]):
+    await db.execute(
+        update(ScrapeBatch)
+        .where(
+            ScrapeBatch.id.in_(
+                select(scraperequest.ScrapeRequest.batch_id).where(
+                    scraperequest.ScrapeRequest.id.in_(request_ids)
+                )
+            )
+        )
+        .where(ScrapeBatch.status == "pending")
+        .values(status="running")
+    )
+
+
+# In queue mode the batch row is brought up to date from its tasks whenever
+# one of its requests finishes.
+async def sync_batch_from_tasks(db: AsyncSession, batch_id: int):
+    counts = await get_batch_task_stats(db, batch_id)
+    pending = counts.get("queued", 0) + counts.get("leased", 0)
+    values = {
+        "done_tasks": counts.get("done", 0),
+        "failed_tasks": counts.get("dead", 0),
+        "status": "running" if pending else "completed",
+    }
+    if not pending:
+        values["finished_at"] = datetime.datetime.now()
+    await db.execute(
+        update(ScrapeBatch).where(ScrapeBatch.id == batch_id).values(**values)
+    )
+
+
+async def get_batch_task_stats(db: AsyncSession, batch_id: int) -> dict:
+    result = await db.execute(
+        select(ScrapeTask.status, func.count())
+        .join(
+            scraperequest.ScrapeRequest,
+            scraperequest.ScrapeRequest.id == ScrapeTask.request_id,
+        )
+        .where(scraperequest.ScrapeRequest.batch_id == batch_id)
+        .group_by(ScrapeTask.status)
+    )
+    return dict(result.all())
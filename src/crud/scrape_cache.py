@@ -0,0 +1,37 @@
+import datetime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert
+from models.scrapecache import ScrapeCacheEntry
+
+
+async def get_cached_result(db: AsyncSession, marketplace_id: int, query: str):
+    result = await db.execute(
+        select(ScrapeCacheEntry)
+        .where(ScrapeCacheEntry.marketplace_id == marketplace_id)
+        .where(ScrapeCacheEntry.query == query)
+        .where(ScrapeCacheEntry.expires_at > datetime.datetime.now())
+    )
+    return result.scalar_one_or_none()
+
+
+async def save_cached_result(
+    db: AsyncSession,
+    marketplace_id: int,
+    query: str,
+    payload: dict,
+    expires_at: datetime.datetime,
+):
+    statement = insert(ScrapeCacheEntry).values(
+        marketplace_id=marketplace_id,
+        query=query,
+        result=payload,
+        expires_at=expires_at,
+    )
+    await db.execute(
+        statement.on_conflict_do_update(
+            index_elements=["marketplace_id", "query"],
+            set_={"result": payload, "expires_at": expires_at},
+        )
+    )
+    await db.commit()
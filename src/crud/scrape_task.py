@@ -0,0 +1,214 @@
+import datetime
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import and_, func, insert, or_, update
+from models.scrapetask import ScrapeTask
+from models import scraperequest
+from crud import scrape_batch as crud_scrape_batch
+import config
+
+
+async def enqueue_tasks(
+    db: AsyncSession,
+    request_id: int,
+    marketplace_ids: list[int],
+    query: str,
+    product_id: Optional[int] = None,
+    force_refresh: bool = False,
+):
+    await db.execute(
+        insert(ScrapeTask),
+        [
+            {
+                "request_id": request_id,
+                "marketplace_id": marketplace_id,
+                "product_id": product_id,
+                "query": query,
+                "force_refresh": force_refresh,
+                "status": "queued",
+                "attempts": 0,
+                "max_attempts": config.QUEUE_MAX_ATTEMPTS,
+            }
+            for marketplace_id in marketplace_ids
+        ],
+    )
+    await db.commit()
+
+
+async def enqueue_batch_tasks(
+    db: AsyncSession,
+    items: list[tuple[int, Optional[int], str]],
+    marketplace_ids: list[int],
+    force_refresh: bool = False,
+):
+    await db.execute(
+        insert(ScrapeTask),
+        [
+            {
+                "request_id": request_id,
+                "marketplace_id": marketplace_id,
+                "product_id": product_id,
+                "query": query,
+                "force_refresh": force_refresh,
+                "status": "queued",
+                "attempts": 0,
+                "max_attempts": config.QUEUE_MAX_ATTEMPTS,
+            }
+            for request_id, product_id, query in items
+            for marketplace_id in marketplace_ids
+        ],
+    )
+    await db.commit()
+
+
+async def lease_tasks(
+    db: AsyncSession, worker_id: str, limit: int, lease_seconds: int
+) -> list[ScrapeTask]:
+    now = func.now()
+    leasable = (
+        select(ScrapeTask.id)
+        .where(ScrapeTask.attempts < ScrapeTask.max_attempts)
+        .where(
+            or_(
+                and_(ScrapeTask.status == "queued", ScrapeTask.available_at <= now),
+                and_(ScrapeTask.status == "leased", ScrapeTask.lease_expires_at < now),
+            )
+        )
+        .order_by(ScrapeTask.available_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result = await db.execute(
+        update(ScrapeTask)
+        .where(ScrapeTask.id.in_(leasable.scalar_subquery()))
+        .values(
+            status="leased",
+            attempts=ScrapeTask.attempts + 1,
+            leased_by=worker_id,
+            lease_expires_at=now + datetime.timedelta(seconds=lease_seconds),
+        )
+        .returning(ScrapeTask)
+        .execution_options(synchronize_session=False)
+    )
+    tasks = list(result.scalars().all())
+    if tasks:
+        await db.execute(
+            update(scraperequest.ScrapeRequest)
+            .where(
+                scraperequest.ScrapeRequest.id.in_({task.request_id for task in tasks})
+            )
+            .where(scraperequest.ScrapeRequest.status == "pending")
+            .values(status="running")
+        )
+        await crud_scrape_batch.start_batches(db, {task.request_id for task in tasks})
+    await db.commit()
+    return tasks
+
+
+async def renew_lease(
+    db: AsyncSession, task_id: int, worker_id: str, lease_seconds: int
+) -> bool:
+    result = await db.execute(
+        update(ScrapeTask)
+        .where(ScrapeTask.id == task_id)
+        .where(ScrapeTask.status == "leased")
+        .where(ScrapeTask.leased_by == worker_id)
+        .values(lease_expires_at=func.now() + datetime.timedelta(seconds=lease_seconds))
+    )
+    await db.commit()
+    return result.rowcount == 1
+
+
+# Completing or failing a task only counts while the caller still holds its
+# lease. Once the lease expired and another worker took the task over, the
+# update matches nothing and everything the caller wrote in the same
+# transaction (such as its result rows) is rolled back.
+async def _finish_leased(db: AsyncSession, task_id: int, worker_id: str, **values):
+    result = await db.execute(
+        update(ScrapeTask)
+        .where(ScrapeTask.id == task_id)
+        .where(ScrapeTask.status == "leased")
+        .where(ScrapeTask.leased_by == worker_id)
+        .values(**values)
+    )
+    if result.rowcount != 1:
+        await db.rollback()
+        return False
+    await db.commit()
+    return True
+
+
+async def complete_task(db: AsyncSession, task_id: int, worker_id: str) -> bool:
+    return await _finish_leased(
+        db, task_id, worker_id, status="done", lease_expires_at=None
+    )
+
+
+async def fail_task(
+    db: AsyncSession, task: ScrapeTask, worker_id: str, error: str
+) -> bool:
+    if task.attempts >= task.max_attempts:
+        values = {"status": "dead"}
+    else:
+        backoff = min(
+            config.QUEUE_BACKOFF_BASE_SECONDS * 2 ** (task.attempts - 1),
+            config.QUEUE_BACKOFF_MAX_SECONDS,
+        )
+        values = {
+            "status": "queued",
+            "available_at": func.now() + datetime.timedelta(seconds=backoff),
+        }
+    return await _finish_leased(
+        db,
+        task.id,
+        worker_id,
+        last_error=error,
+        lease_expires_at=None,
+        leased_by=None,
+        **values,
+    )
+
+
+async def reap_expired_leases(db: AsyncSession) -> list[int]:
+    result = await db.execute(
+        update(ScrapeTask)
+        .where(ScrapeTask.status == "leased")
+        .where(ScrapeTask.lease_expires_at < func.now())
+        .where(ScrapeTask.attempts >= ScrapeTask.max_attempts)
+        .values(status="dead", last_error="Lease expired on final attempt")
+        .returning(ScrapeTask.request_id)
+    )
+    request_ids = sorted(set(result.scalars().all()))
+    await db.commit()
+    return request_ids
+
+
+async def finish_request_if_done(db: AsyncSession, request_id: int) -> bool:
+    result = await db.execute(
+        select(ScrapeTask.status, func.count())
+        .where(ScrapeTask.request_id == request_id)
+        .group_by(ScrapeTask.status)
+    )
+    counts = dict(result.all())
+    if counts.get("queued") or counts.get("leased"):
+        return False
+    status = "failed" if counts.get("dead") and not counts.get("done") else "completed"
+    result = await db.execute(
+        update(scraperequest.ScrapeRequest)
+        .where(scraperequest.ScrapeRequest.id == request_id)
+        .values(status=status, finished_at=datetime.datetime.now())
+        .returning(scraperequest.ScrapeRequest.batch_id)
+    )
+    batch_id = result.scalar_one_or_none()
+    if batch_id is not None:
+        await crud_scrape_batch.sync_batch_from_tasks(db, batch_id)
+    await db.commit()
+    return True
+
+
+async def get_queue_stats(db: AsyncSession) -> dict:
+    result = await db.execute(
+        select(ScrapeTask.status, func.count()).group_by(ScrapeTask.status)
+    )
+    return dict(result.all())
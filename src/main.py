@@ -1,8 +1,42 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from routes import marketplace, scrape, product
+from service import extract
+from service.browser import pool as browser_pool
+from service.http import http_client
+from service.batch import batch_manager
+from service.changes import change_sequencer
+from service.jobs import job_manager
+from service.retention import retention_job
+from service.scheduler import refresh_scheduler
+import config
 
 
-app = FastAPI(docs_url="/docs")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    extract.start_pool()
+    await http_client.start()
+    await browser_pool.start()
+    if config.SCHEDULER_ENABLED:
+        refresh_scheduler.start()
+    if config.RETENTION_ENABLED:
+        retention_job.start()
+    if config.CHANGE_FEED_ENABLED:
+        change_sequencer.start()
+    try:
+        yield
+    finally:
+        await change_sequencer.stop()
+        await refresh_scheduler.stop()
+        await retention_job.stop()
+        await job_manager.shutdown()
+        await batch_manager.shutdown()
+        await browser_pool.stop()
+        await http_client.stop()
+        extract.stop_pool()
+
+
+app = FastAPI(docs_url="/docs", lifespan=lifespan)
 
 
 app.include_router(marketplace.router, prefix="/marketplace", tags=["Marketplace"])
@@ -1,4 +1,4 @@
-from sqlalchemy import JSON, Date, String, Boolean, DateTime, null
+from sqlalchemy import JSON, Date, Float, Integer, String, Boolean, DateTime, null
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import date, datetime
 from database import Base
@@ -18,5 +18,20 @@ class Marketplace(Base):
     link_selector: Mapped[str] = mapped_column(String, nullable=True)
     is_active: Mapped[bool] = mapped_column(Boolean, default=True)
     description_selector: Mapped[str] = mapped_column(String, nullable=True)
+    ready_strategy: Mapped[str] = mapped_column(String, default="selector")
+    ready_max_wait_ms: Mapped[int] = mapped_column(Integer, default=10000)
+    ready_quiet_ms: Mapped[int] = mapped_column(Integer, default=500)
+    allow_url_patterns: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    block_url_patterns: Mapped[list | None] = mapped_column(JSON, nullable=True)
+    render_mode: Mapped[str] = mapped_column(String, default="auto")
+    max_results: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    next_page_selector: Mapped[str | None] = mapped_column(String, nullable=True)
+    max_pages: Mapped[int] = mapped_column(Integer, default=1)
+    cache_ttl_seconds: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    rate_limit_per_second: Mapped[float | None] = mapped_column(Float, nullable=True)
+    rate_limit_burst: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    max_concurrency: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    price_locale: Mapped[str | None] = mapped_column(String, nullable=True)
+    currency: Mapped[str | None] = mapped_column(String, nullable=True)
     created_at: Mapped[date] = mapped_column(Date, default=date.today())
     updated_at: Mapped[date] = mapped_column(Date, default=date.today())
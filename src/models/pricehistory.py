@@ -0,0 +1,36 @@
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Integer, String
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import date, datetime
+from database import Base
+
+
+# Partitioned by month on observed_at, so the partition key has to be part of
+# the primary key. Partitions are created on demand by crud.price_history.
+class PriceHistory(Base):
+    __tablename__ = "price_history"
+    __table_args__ = {"postgresql_partition_by": "RANGE (observed_at)"}
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    observed_at: Mapped[datetime] = mapped_column(DateTime, primary_key=True)
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), index=True)
+    marketplace_id: Mapped[int] = mapped_column(ForeignKey("marketplaces.id"))
+    request_id: Mapped[int] = mapped_column(Integer)
+    price_minor: Mapped[int] = mapped_column(BigInteger)
+    currency: Mapped[str | None] = mapped_column(String, nullable=True)
+
+
+class PriceDailyRollup(Base):
+    __tablename__ = "price_daily_rollups"
+
+    product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), primary_key=True)
+    marketplace_id: Mapped[int] = mapped_column(
+        ForeignKey("marketplaces.id"), primary_key=True
+    )
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    min_price_minor: Mapped[int] = mapped_column(BigInteger)
+    max_price_minor: Mapped[int] = mapped_column(BigInteger)
+    sum_price_minor: Mapped[int] = mapped_column(BigInteger)
+    samples: Mapped[int] = mapped_column(Integer)
+    last_price_minor: Mapped[int] = mapped_column(BigInteger)
+    last_observed_at: Mapped[datetime] = mapped_column(DateTime)
+    currency: Mapped[str | None] = mapped_column(String, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import JSON, Date, String, Boolean, DateTime, null
+from sqlalchemy import JSON, Date, Integer, String, Boolean, DateTime, null
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import date, datetime
 from database import Base
@@ -9,3 +9,7 @@ class Product(Base):
     id: Mapped[int] = mapped_column(index=True, primary_key=True)
     global_query_name: Mapped[str] = mapped_column(String)
     description: Mapped[str] = mapped_column(String)
+    refresh_interval_minutes: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    next_refresh_at: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True, index=True
+    )
@@ -0,0 +1,18 @@
+from sqlalchemy import DateTime, Integer, String, func
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from database import Base
+
+
+class ScrapeBatch(Base):
+    __tablename__ = "scrape_batches"
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    status: Mapped[str] = mapped_column(String, default="pending")
+    total_products: Mapped[int] = mapped_column(Integer)
+    total_marketplaces: Mapped[int] = mapped_column(Integer)
+    total_tasks: Mapped[int] = mapped_column(Integer)
+    done_tasks: Mapped[int] = mapped_column(Integer, default=0)
+    failed_tasks: Mapped[int] = mapped_column(Integer, default=0)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
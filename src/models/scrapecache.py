@@ -0,0 +1,15 @@
+from sqlalchemy import JSON, DateTime, Integer, String, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from database import Base
+
+
+class ScrapeCacheEntry(Base):
+    __tablename__ = "scrape_cache"
+    __table_args__ = (UniqueConstraint("marketplace_id", "query"),)
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    marketplace_id: Mapped[int] = mapped_column(ForeignKey("marketplaces.id"))
+    query: Mapped[str] = mapped_column(String)
+    result: Mapped[dict] = mapped_column(JSON)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, index=True)
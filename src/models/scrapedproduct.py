@@ -1,4 +1,15 @@
-from sqlalchemy import JSON, Column, Date, Integer, String, DateTime, ForeignKey
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Column,
+    Date,
+    Integer,
+    String,
+    DateTime,
+    ForeignKey,
+    Index,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import date, datetime
 from database import Base
@@ -6,17 +17,50 @@ from database import Base
 
 class ScrapedProduct(Base):
     __tablename__ = "scraped_products"
+    __table_args__ = (
+        Index(
+            "ix_scraped_products_product_id_price_minor", "product_id", "price_minor"
+        ),
+        Index(
+            "ix_scraped_products_product_marketplace_last_request",
+            "product_id",
+            "marketplace_id",
+            text("last_request_id DESC"),
+        ),
+        Index("ix_scraped_products_snapshot_key_id", "snapshot_key", "id"),
+        Index("ix_scraped_products_request_id_id", "request_id", "id"),
+        Index("ix_scraped_products_change_seq", "change_seq", unique=True),
+        Index(
+            "ix_scraped_products_unsequenced",
+            "id",
+            postgresql_where=text("change_seq IS NULL AND snapshot_key IS NOT NULL"),
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     request_id: Mapped[int] = mapped_column(ForeignKey("scrape_requests.id"))
     marketplace_id: Mapped[int] = mapped_column(ForeignKey("marketplaces.id"))
     product_id: Mapped[int] = mapped_column(ForeignKey("products.id"), nullable=True)
-    scraped_product_title: Mapped[str] = mapped_column(String)
-    scraped_price: Mapped[str] = mapped_column(String)
+    scraped_product_title: Mapped[str | None] = mapped_column(String, nullable=True)
+    scraped_price: Mapped[str | None] = mapped_column(String, nullable=True)
     scraped_currency: Mapped[str | None] = mapped_column(String, nullable=True)
+    price_minor: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
     scraped_description: Mapped[JSON | None] = mapped_column(JSON, nullable=True)
-    product_url: Mapped[str] = mapped_column(String)
+    product_url: Mapped[str | None] = mapped_column(String, nullable=True)
     scraped_at: Mapped[date] = mapped_column(Date, default=date.today())
     status: Mapped[str] = mapped_column(String)
     error_message: Mapped[str | None] = mapped_column(String, nullable=True)
-
+    page: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    position: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Unchanged re-scrapes of a listing only move last_seen_at, last_request_id
+    # and the latest page and position; every request's own sighting is kept in
+    # scrape_sightings. A change is written as a new version of the row.
+    snapshot_key: Mapped[str | None] = mapped_column(String, nullable=True)
+    content_hash: Mapped[str | None] = mapped_column(String, nullable=True)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1")
+    previous_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    last_seen_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    last_request_id: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    # Position in the change feed, assigned after commit by
+    # crud.scrape.sequence_changes.
+    change_seq: Mapped[int | None] = mapped_column(BigInteger, nullable=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Date, Integer, String, DateTime
+from sqlalchemy import Column, Date, Integer, String, DateTime, ForeignKey, Index
 from datetime import date, datetime
 
 from sqlalchemy.orm import Mapped, mapped_column
@@ -7,6 +7,15 @@ from database import Base
 
 class ScrapeRequest(Base):
     __tablename__ = "scrape_requests"
+    __table_args__ = (
+        Index("ix_scrape_requests_requested_at_id", "requested_at", "id"),
+    )
+
     id: Mapped[int] = mapped_column(primary_key=True, index=True)
     product_name_searched: Mapped[str] = mapped_column(String)
     requested_at: Mapped[date] = mapped_column(Date, default=date.today())
+    status: Mapped[str] = mapped_column(String, default="pending")
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    batch_id: Mapped[int | None] = mapped_column(
+        ForeignKey("scrape_batches.id"), nullable=True, index=True
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import ForeignKey, Integer
+from sqlalchemy.orm import Mapped, mapped_column
+from database import Base
+
+
+# One row per request that saw a stored snapshot, so a request keeps its own
+# results and positions after later scrapes re-see the listing unchanged.
+# snapshot_id has no foreign key: retention moves old snapshots to the archive.
+class ScrapeSighting(Base):
+    __tablename__ = "scrape_sightings"
+
+    request_id: Mapped[int] = mapped_column(
+        ForeignKey("scrape_requests.id"), primary_key=True
+    )
+    snapshot_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    page: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    position: Mapped[int | None] = mapped_column(Integer, nullable=True)
@@ -0,0 +1,30 @@
+from sqlalchemy import Boolean, DateTime, Index, Integer, String, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime
+from database import Base
+
+
+class ScrapeTask(Base):
+    __tablename__ = "scrape_tasks"
+    __table_args__ = (
+        Index("ix_scrape_tasks_status_available_at", "status", "available_at"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    request_id: Mapped[int] = mapped_column(
+        ForeignKey("scrape_requests.id"), index=True
+    )
+    marketplace_id: Mapped[int] = mapped_column(ForeignKey("marketplaces.id"))
+    product_id: Mapped[int | None] = mapped_column(
+        ForeignKey("products.id"), nullable=True
+    )
+    query: Mapped[str] = mapped_column(String)
+    force_refresh: Mapped[bool] = mapped_column(Boolean, default=False)
+    status: Mapped[str] = mapped_column(String, default="queued")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    max_attempts: Mapped[int] = mapped_column(Integer, default=3)
+    available_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    lease_expires_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    leased_by: Mapped[str | None] = mapped_column(String, nullable=True)
+    last_error: Mapped[str | None] = mapped_column(String, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
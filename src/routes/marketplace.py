@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
 from crud import marketplace as crud_marketplace
 from schemas import MarketplaceCreate, MarketplaceUpdate, MarketplaceOut
+from routes.pagination import PageParams, load_page, page_params, page_response
 
 router = APIRouter()
 
@@ -14,9 +15,16 @@ async def create_marketplace(
     return await crud_marketplace.create_marketplace(db, marketplace)
 
 
-@router.get("/", response_model=list[MarketplaceOut])
-async def read_marketplaces(db: AsyncSession = Depends(get_db)):
-    return await crud_marketplace.get_marketplaces(db)
+@router.get("/")
+async def read_marketplaces(
+    page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_db)
+):
+    result = await load_page(crud_marketplace.get_marketplaces_page(db, *page))
+    if page.fields:
+        return page_response(result)
+    return page_response(
+        result, [MarketplaceOut.model_validate(mp) for mp in result.items]
+    )
 
 
 @router.get("/{marketplace_id}", response_model=MarketplaceOut)
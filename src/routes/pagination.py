@@ -0,0 +1,41 @@
+from typing import NamedTuple, Optional
+from fastapi import HTTPException, Query
+from crud.pagination import Page, parse_fields
+import config
+
+
+class PageParams(NamedTuple):
+    cursor: Optional[str]
+    limit: int
+    fields: Optional[list[str]]
+
+
+def page_params(
+    cursor: Optional[str] = Query(
+        default=None, description="Курсор наступної сторінки (next_cursor)"
+    ),
+    limit: int = Query(
+        default=config.PAGE_DEFAULT_LIMIT,
+        gt=0,
+        le=config.PAGE_MAX_LIMIT,
+        description="Кількість записів на сторінці",
+    ),
+    fields: Optional[str] = Query(
+        default=None, description="Список полів через кому, напр. id,name"
+    ),
+) -> PageParams:
+    return PageParams(cursor, limit, parse_fields(fields))
+
+
+async def load_page(fetch) -> Page:
+    try:
+        return await fetch
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
+
+def page_response(page: Page, items: Optional[list] = None) -> dict:
+    return {
+        "items": page.items if items is None else items,
+        "next_cursor": page.next_cursor,
+    }
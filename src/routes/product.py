@@ -1,11 +1,17 @@
-import re
-from fastapi import APIRouter, Depends, HTTPException
+import datetime
+from typing import List, Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from database import get_db
+from crud import price_history as crud_price_history
 from crud import product as crud_product
-from crud import marketplace as crud_marketplace
 from crud import scrape as crud_scrape
+from routes.pagination import PageParams, load_page, page_params, page_response
 from schemas import (
+    PriceComparisonItem,
+    PriceComparisonResponse,
+    PriceHistoryPoint,
+    PriceHistoryResponse,
     ProductCreate,
     ProductUpdate,
 )
@@ -19,8 +25,10 @@ async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_
 
 
 @router.get("/get-products")
-async def read_products(db: AsyncSession = Depends(get_db)):
-    return await crud_product.get_products(db)
+async def read_products(
+    page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_db)
+):
+    return page_response(await load_page(crud_product.get_products(db, *page)))
 
 
 @router.get("/get-product")
@@ -31,49 +39,84 @@ async def read_product(product_id: int, db: AsyncSession = Depends(get_db)):
     return product
 
 
-@router.get("/compare")
+@router.get("/compare", response_model=PriceComparisonResponse)
 async def compare_product_price(
     product_id: int,
-    marketplace_id1: int,
-    marketplace_id2: int,
+    marketplace_ids: Optional[List[int]] = Query(
+        default=None,
+        description="Список id маркетплейсів для порівняння; всі, якщо не вказано",
+    ),
     db: AsyncSession = Depends(get_db),
 ):
-    try:
-        product = await crud_product.get_product(db, product_id)
-        if product is None:
-            raise HTTPException(404, "Product not found")
-        marketplace1 = await crud_marketplace.get_marketplace(db, marketplace_id1)
-        marketplace2 = await crud_marketplace.get_marketplace(db, marketplace_id2)
-        if marketplace2 is None or marketplace1 is None:
-            raise HTTPException(404, "Marketplace not found")
-        scraped_product1 = await crud_scrape.find_product_by_marketplace(
-            product.id, marketplace1.id, db
-        )
-        scraped_product2 = await crud_scrape.find_product_by_marketplace(
-            product.id, marketplace2.id, db
+    rows = await crud_scrape.get_latest_prices(db, product_id, marketplace_ids)
+    if not rows and await crud_product.get_product(db, product_id) is None:
+        raise HTTPException(404, "Product not found")
+
+    results = [
+        PriceComparisonItem(
+            rank=rank,
+            marketplace_id=snapshot.marketplace_id,
+            marketplace_name=marketplace_name,
+            product_title=snapshot.scraped_product_title,
+            price=snapshot.scraped_price,
+            price_minor=snapshot.price_minor,
+            currency=snapshot.scraped_currency,
+            url=snapshot.product_url,
+            scraped_at=snapshot.scraped_at,
         )
-        price1 = re.sub(r"[^\d]", "", scraped_product1.scraped_price)
-        value1 = int(price1)
-        price2 = re.sub(r"[^\d]", "", scraped_product2.scraped_price)
-        value2 = int(price2)
-        if value2 > value1:
-            return {
-                "product": scraped_product2,
-                "result": f"Marketplace {marketplace2.name} has the lowest price!",
-            }
-        if value1 > value2:
-            return {
-                "product": scraped_product2,
-                "result": f"Marketplace {marketplace1.name} has the lowest price!",
-            }
-        if value1 == value2:
-            return {
-                "product": scraped_product2,
-                "result": f"Marketplace {marketplace1.name} and {marketplace2.name} has the same price!",
-            }
-
-    except Exception as e:
-        raise HTTPException(500, str(e))
+        for snapshot, marketplace_name, rank in rows
+    ]
+    currencies = list(dict.fromkeys(item.currency for item in results if item.currency))
+    cheapest = [item.marketplace_name for item in results if item.rank == 1]
+    if not results:
+        result = "No prices found for this product"
+    elif len(currencies) > 1:
+        result = "Prices are in different currencies and are ranked per currency"
+    elif len(cheapest) > 1:
+        result = f"Marketplaces {', '.join(cheapest)} have the same lowest price!"
+    else:
+        result = f"Marketplace {cheapest[0]} has the lowest price!"
+    return PriceComparisonResponse(
+        product_id=product_id, currencies=currencies, results=results, result=result
+    )
+
+
+@router.get("/{product_id}/history", response_model=PriceHistoryResponse)
+async def read_price_history(
+    product_id: int,
+    resolution: Literal["day", "week", "month"] = Query(
+        default="day", description="Крок агрегації історії цін"
+    ),
+    days: int = Query(default=90, gt=0, le=1830, description="Глибина історії в днях"),
+    marketplace_ids: Optional[List[int]] = Query(
+        default=None, description="Список id маркетплейсів; всі, якщо не вказано"
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    since = datetime.date.today() - datetime.timedelta(days=days - 1)
+    rows = await crud_price_history.get_price_history(
+        db, product_id, since, resolution, marketplace_ids
+    )
+    if not rows and await crud_product.get_product(db, product_id) is None:
+        raise HTTPException(404, "Product not found")
+    return PriceHistoryResponse(
+        product_id=product_id,
+        resolution=resolution,
+        since=since,
+        points=[
+            PriceHistoryPoint(
+                marketplace_id=row.marketplace_id,
+                period=row.period,
+                currency=row.currency,
+                min_price_minor=row.min_price_minor,
+                max_price_minor=row.max_price_minor,
+                avg_price_minor=round(row.sum_price_minor / row.samples),
+                last_price_minor=row.last_price_minor,
+                samples=row.samples,
+            )
+            for row in rows
+        ],
+    )
 
 
 @router.put("/update-product")
@@ -1,33 +1,95 @@
+import asyncio
+import json
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from database import get_db
+from database import AsyncSessionLocal, get_db
 from schemas import (
     ScrapeRequestCreate,
     ScrapeProductResponse,
     ScrapeResultItem,
-    ScrapedProductCreate,
+    ScrapeJobResponse,
+    ScrapeBatchCreate,
+    ScrapeBatchResponse,
+    ScrapeChange,
+    ScrapeChangesResponse,
 )
 from crud import scrape as crud_scrape
 from crud import marketplace as crud_marketplace
 from crud import product as crud_product
-from service import scrape
-from datetime import date, datetime
-from typing import List, Optional
+from crud import scrape_task as crud_scrape_task
+from crud import scrape_batch as crud_scrape_batch
+from crud.pagination import decode_cursor, page_rows
+from routes.pagination import PageParams, page_params, page_response
+from service import (
+    archive,
+    scrape,
+    readiness,
+    blocking,
+    runner,
+    limits,
+    breaker,
+    export,
+    fanout,
+)
+from service.batch import batch_manager, start_batch
+from service.changes import change_sequencer
+from service.cache import scrape_cache
+from service.deadline import Deadline, DeadlineExceeded
+from service.jobs import job_manager
+from service.retention import retention_job
+from service.scheduler import refresh_scheduler
+from service.browser import pool as browser_pool
+from datetime import date
+import config
+from typing import List, Literal, Optional
 
 router = APIRouter()
 
 
 @router.get("/get-all-requests")
-async def get_all(db: AsyncSession = Depends(get_db)):
+async def get_all(
+    page: PageParams = Depends(page_params), db: AsyncSession = Depends(get_db)
+):
     try:
-        result = await crud_scrape.get_all_scrape_requests(db)
-        if result is None:
-            raise HTTPException(404, "Not found any writes")
-        return result
+        result = await crud_scrape.get_all_scrape_requests(db, *page)
+        return page_response(result)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(500, str(e))
 
 
+@router.get("/stats")
+async def get_stats(db: AsyncSession = Depends(get_db)):
+    return {
+        "queue": await crud_scrape_task.get_queue_stats(db),
+        "browser_pool": browser_pool.stats(),
+        "readiness": readiness.stats(),
+        "request_blocking": blocking.stats(),
+        "render_modes": scrape.render_mode_stats(),
+        "cache": scrape_cache.stats(),
+        "jobs": job_manager.stats(),
+        "batches": batch_manager.stats(),
+        "scheduler": refresh_scheduler.stats(),
+        "retention": retention_job.stats(),
+        "change_feed": change_sequencer.stats(),
+        "global_slots": fanout.stats(),
+        "limits": limits.stats(),
+        "breakers": breaker.stats(),
+    }
+
+
+@router.get("/limits")
+async def get_limits():
+    return limits.stats()
+
+
+@router.get("/breakers")
+async def get_breakers():
+    return breaker.stats()
+
+
 @router.get("/get-request")
 async def get_request(id: int, db: AsyncSession = Depends(get_db)):
     try:
@@ -40,176 +102,448 @@ async def get_request(id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/get-request-by-date")
-async def get_requests_by_date(date: date, db: AsyncSession = Depends(get_db)):
+async def get_requests_by_date(
+    date: date,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_db),
+):
     try:
-        result = await crud_scrape.get_requests_by_date(date, db)
-        if result is None:
-            raise HTTPException(404, "Not found")
-
-        return result
+        result = await crud_scrape.get_requests_by_date(date, db, *page)
+        return page_response(result)
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(500, str(e))
 
 
+async def _request_rows(
+    db: AsyncSession, request, after: int = 0, limit: Optional[int] = None
+) -> list[dict]:
+    rows, archived = await crud_scrape.get_scraped_products_by_request_id(
+        db, request.id, after, limit
+    )
+    if not retention_job.may_have_archived(request.requested_at):
+        return rows
+    # Part of an older request can be in the archive: snapshots it sighted,
+    # and rows archived before sightings were recorded, which are found by
+    # their request ids.
+    sightings = {row["id"]: row for row in archived}
+    merged = {
+        row["id"]: row
+        for row in await archive.load_rows(
+            request_id=request.id, after=after, limit=limit
+        )
+    }
+    if sightings:
+        for row in await archive.load_rows(ids=list(sightings)):
+            sighting = sightings[row["id"]]
+            merged[row["id"]] = {
+                **row,
+                "page": sighting["page"],
+                "position": sighting["position"],
+            }
+    merged.update((row["id"], row) for row in rows)
+    rows = sorted(merged.values(), key=lambda row: row["id"])
+    return rows if limit is None else rows[:limit]
+
+
 @router.get("/get-products-by-request-id")
-async def get_products_by_request_id(id: int, db: AsyncSession = Depends(get_db)):
+async def get_products_by_request_id(
+    id: int,
+    page: PageParams = Depends(page_params),
+    db: AsyncSession = Depends(get_db),
+):
+    request = await crud_scrape.get_scrape_request(db, id)
+    if request is None:
+        raise HTTPException(404, "Request not found")
     try:
-        request = await crud_scrape.get_scrape_request(db, id)
-        if request is None:
-            raise HTTPException(404, "Request not found")
-        result = await crud_scrape.get_scraped_products_by_request_id(db, id)
-        if result is None:
-            raise HTTPException(404, "Not found any products by this request")
-        return result
+        rows = await _request_rows(
+            db, request, decode_cursor(page.cursor), page.limit + 1
+        )
+        return page_response(page_rows(rows, *page))
+    except ValueError as e:
+        raise HTTPException(400, str(e))
     except Exception as e:
         raise HTTPException(500, str(e))
 
 
-@router.post("/", response_model=ScrapeProductResponse)
-async def scrape_by_query_name(
-    request: ScrapeRequestCreate,
-    db: AsyncSession = Depends(get_db),
-    marketplace_ids: Optional[List[int]] = Query(
-        default=None, description="Список id маркетплейсів для скрейпінгу"
-    ),
-):
-    new_request = await crud_scrape.create_scrape_request(db, request)
-
+async def _load_marketplaces(db: AsyncSession, marketplace_ids: Optional[List[int]]):
     if marketplace_ids:
-        marketplaces = []
-        for mp_id in marketplace_ids:
-            marketplace = await crud_marketplace.get_marketplace(db, mp_id)
-            if marketplace:
-                marketplaces.append(marketplace)
+        marketplaces = await crud_marketplace.get_marketplaces_by_ids(
+            db, marketplace_ids
+        )
+        # Results are returned in the order the caller listed marketplaces.
+        marketplaces = sorted(
+            marketplaces, key=lambda mp: marketplace_ids.index(mp.id)
+        )
     else:
         marketplaces = await crud_marketplace.get_marketplaces(db)
 
     if not marketplaces:
         raise HTTPException(status_code=404, detail="Маркетплейси не знайдені")
+    return marketplaces
 
-    results = []
 
-    for marketplace in marketplaces:
-        scrape_result = await scrape.scrape_product(
-            marketplace, request.product_name_searched
-        )
+def _queued(as_job: bool) -> bool:
+    return as_job or config.SCRAPE_EXECUTION == "queue"
+
 
-        product_data = ScrapedProductCreate(
-            request_id=new_request.id,
-            marketplace_id=marketplace.id,
-            product_id=None,
-            scraped_product_title=scrape_result.get("product_title"),
-            scraped_price=scrape_result.get("price"),
-            scraped_currency=scrape_result.get("currency"),
-            scraped_description=scrape_result.get("description"),
-
-            product_url=scrape_result.get("url"),
-            scraped_at=scrape_result["scraped_at"],
-            status=scrape_result["status"],
-            error_message=scrape_result.get("error_message"),
-            marketplace_name=marketplace.name,
+def _check_deadline(deadline_ms: Optional[int], as_job: bool):
+    if deadline_ms and _queued(as_job):
+        raise HTTPException(
+            422, "deadline_ms не підтримується для фонових задач і черги"
         )
 
-        await crud_scrape.save_scraped_product(db, product_data)
 
-        results.append(
-            ScrapeResultItem(
-                marketplace_name=marketplace.name,
-                status=scrape_result["status"],
-                product_title=scrape_result.get("product_title"),
-                price=scrape_result.get("price"),
+async def _run_or_submit(
+    db: AsyncSession,
+    new_request,
+    marketplaces,
+    product_id: Optional[int],
+    force_refresh: bool,
+    as_job: bool,
+    deadline: Deadline | None = None,
+):
+    product_name = new_request.product_name_searched
+    if config.SCRAPE_EXECUTION == "queue":
+        await crud_scrape_task.enqueue_tasks(
+            db,
+            new_request.id,
+            [mp.id for mp in marketplaces],
+            product_name,
+            product_id,
+            force_refresh,
+        )
+        as_job = True
+    elif as_job:
+        job_manager.submit(
+            new_request.id, marketplaces, product_name, product_id, force_refresh
+        )
 
-                description=scrape_result.get("description"),
-                url=scrape_result.get("url"),
-                scraped_at=scrape_result["scraped_at"],
-                error_message=scrape_result.get("error_message"),
-            )
+    if as_job:
+        return ScrapeJobResponse(
+            job_id=new_request.id,
+            status=new_request.status,
+            product_name_searched=product_name,
+            status_url=f"/scrape/jobs/{new_request.id}",
+            events_url=f"/scrape/jobs/{new_request.id}/events",
         )
 
-    return ScrapeProductResponse(
-        scrape_request_id=new_request.id,
-        product_name_searched=request.product_name_searched,
-        results=results,
-        summary={
-            "total_marketplaces_processed": len(results),
-            "successful_scrapes": sum(1 for r in results if r.status == "success"),
-            "failed_scrapes": sum(1 for r in results if r.status != "success"),
-        },
-        scraped_at=date.today(),
+    try:
+        response = await runner.scrape_and_save(
+            db,
+            new_request.id,
+            marketplaces,
+            product_name,
+            product_id,
+            force_refresh=force_refresh,
+            deadline=deadline,
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(504, str(e))
+    except Exception:
+        await db.rollback()
+        await crud_scrape.update_scrape_request_status(
+            db, new_request.id, "failed", finished=True
+        )
+        raise
+    return response
+
+
+@router.post("/", response_model=ScrapeProductResponse | ScrapeJobResponse)
+async def scrape_by_query_name(
+    request: ScrapeRequestCreate,
+    db: AsyncSession = Depends(get_db),
+    marketplace_ids: Optional[List[int]] = Query(
+        default=None, description="Список id маркетплейсів для скрейпінгу"
+    ),
+    force_refresh: bool = Query(
+        default=False, description="Ігнорувати кеш результатів скрейпінгу"
+    ),
+    as_job: bool = Query(
+        default=False, description="Повернути id задачі одразу, скрейпити у фоні"
+    ),
+    deadline_ms: Optional[int] = Query(
+        default=None,
+        gt=0,
+        description="Максимальний час відповіді в мс; маркетплейси, що не встигли, "
+        "позначаються як timed_out",
+    ),
+):
+    _check_deadline(deadline_ms, as_job)
+    deadline = Deadline(deadline_ms) if deadline_ms else None
+    # Marketplaces are checked first, so a 404 leaves no request behind.
+    marketplaces = await _load_marketplaces(db, marketplace_ids)
+    new_request = await crud_scrape.create_scrape_request(
+        db, request, status="pending" if _queued(as_job) else "running"
     )
 
+    return await _run_or_submit(
+        db, new_request, marketplaces, None, force_refresh, as_job, deadline
+    )
 
-@router.post("/get-by-product-id", response_model=ScrapeProductResponse)
+
+@router.post(
+    "/get-by-product-id", response_model=ScrapeProductResponse | ScrapeJobResponse
+)
 async def scrape_product_endpoint(
     db: AsyncSession = Depends(get_db),
     marketplace_ids: Optional[List[int]] = Query(
         default=None, description="Список id маркетплейсів для скрейпінгу"
     ),
     product_id: int = Query(default=None, description="Продукт"),
+    force_refresh: bool = Query(
+        default=False, description="Ігнорувати кеш результатів скрейпінгу"
+    ),
+    as_job: bool = Query(
+        default=False, description="Повернути id задачі одразу, скрейпити у фоні"
+    ),
+    deadline_ms: Optional[int] = Query(
+        default=None,
+        gt=0,
+        description="Максимальний час відповіді в мс; маркетплейси, що не встигли, "
+        "позначаються як timed_out",
+    ),
 ):
+    _check_deadline(deadline_ms, as_job)
+    deadline = Deadline(deadline_ms) if deadline_ms else None
     product = await crud_product.get_product(db, product_id)
     if product is None:
         raise HTTPException(404, "Product not found")
     request = ScrapeRequestCreate(product_name_searched=product.global_query_name)
-    new_request = await crud_scrape.create_scrape_request(db, request)
-
-    if marketplace_ids:
-        marketplaces = []
-        for mp_id in marketplace_ids:
-            marketplace = await crud_marketplace.get_marketplace(db, mp_id)
-            if marketplace:
-                marketplaces.append(marketplace)
-    else:
-        marketplaces = await crud_marketplace.get_marketplaces(db)
+    marketplaces = await _load_marketplaces(db, marketplace_ids)
+    new_request = await crud_scrape.create_scrape_request(
+        db, request, status="pending" if _queued(as_job) else "running"
+    )
 
-    if not marketplaces:
-        raise HTTPException(status_code=404, detail="Маркетплейси не знайдені")
+    return await _run_or_submit(
+        db, new_request, marketplaces, product.id, force_refresh, as_job, deadline
+    )
 
-    results = []
 
-    for marketplace in marketplaces:
-        scrape_result = await scrape.scrape_product(
-            marketplace, request.product_name_searched
+@router.post("/batch", response_model=ScrapeBatchResponse)
+async def scrape_batch(batch: ScrapeBatchCreate, db: AsyncSession = Depends(get_db)):
+    items: list[tuple[Optional[int], str]] = []
+    if batch.product_ids:
+        products = await crud_product.get_products_by_ids(db, batch.product_ids)
+        items.extend((product.id, product.global_query_name) for product in products)
+    items.extend((None, query) for query in batch.queries or [])
+    if not items:
+        raise HTTPException(404, "Продукти не знайдені")
+    marketplaces = await _load_marketplaces(db, batch.marketplace_ids)
+    if len(items) * len(marketplaces) > config.BATCH_MAX_TASKS:
+        raise HTTPException(
+            422, f"Забагато задач у пакеті, максимум {config.BATCH_MAX_TASKS}"
         )
 
-        product_data = ScrapedProductCreate(
-            request_id=new_request.id,
-            marketplace_id=marketplace.id,
-            product_id=product.id,
-            scraped_product_title=scrape_result.get("product_title"),
-            scraped_price=scrape_result.get("price"),
-            scraped_currency=scrape_result.get("currency"),
-            scraped_description=scrape_result.get("description"),
-            product_url=scrape_result.get("url"),
-            scraped_at=scrape_result["scraped_at"],
-            status=scrape_result["status"],
-            error_message=scrape_result.get("error_message"),
-            marketplace_name=marketplace.name,
-        )
+    new_batch = await start_batch(db, items, marketplaces, batch.force_refresh)
+
+    return ScrapeBatchResponse(
+        batch_id=new_batch.id,
+        status=new_batch.status,
+        total_products=new_batch.total_products,
+        total_marketplaces=new_batch.total_marketplaces,
+        total_tasks=new_batch.total_tasks,
+        status_url=f"/scrape/batch/{new_batch.id}",
+    )
+
 
-        await crud_scrape.save_scraped_product(db, product_data)
-
-        results.append(
-            ScrapeResultItem(
-                marketplace_name=marketplace.name,
-                status=scrape_result["status"],
-                product_title=scrape_result.get("product_title"),
-                price=scrape_result.get("price"),
-                description=scrape_result.get("description"),
-                url=scrape_result.get("url"),
-                scraped_at=scrape_result["scraped_at"],
-                error_message=scrape_result.get("error_message"),
-            )
+@router.get("/batch/{batch_id}", response_model=ScrapeBatchResponse)
+async def get_batch(batch_id: int, db: AsyncSession = Depends(get_db)):
+    batch = await crud_scrape_batch.get_batch(db, batch_id)
+    if batch is None:
+        raise HTTPException(404, "Batch not found")
+    response = ScrapeBatchResponse(
+        batch_id=batch.id,
+        status=batch.status,
+        total_products=batch.total_products,
+        total_marketplaces=batch.total_marketplaces,
+        total_tasks=batch.total_tasks,
+        done_tasks=batch.done_tasks,
+        failed_tasks=batch.failed_tasks,
+        status_url=f"/scrape/batch/{batch.id}",
+    )
+    progress = batch_manager.progress(batch_id)
+    if progress is not None:
+        response.status = progress["status"]
+        response.done_tasks = progress["done_tasks"]
+        response.failed_tasks = progress["failed_tasks"]
+        response.running_tasks = progress["running_tasks"]
+    elif config.SCRAPE_EXECUTION == "queue":
+        counts = await crud_scrape_batch.get_batch_task_stats(db, batch_id)
+        response.done_tasks = counts.get("done", 0)
+        response.failed_tasks = counts.get("dead", 0)
+        response.running_tasks = counts.get("leased", 0)
+        pending = counts.get("queued", 0) + counts.get("leased", 0)
+        response.status = "running" if pending else "completed"
+    return response
+
+
+def _changed_fields(row) -> list[str]:
+    snapshot = row.ScrapedProduct
+    if snapshot.previous_id is None:
+        return ["new"]
+    changed = []
+    if snapshot.price_minor != row.previous_price_minor:
+        changed.append("price")
+    if snapshot.scraped_product_title != row.previous_title:
+        changed.append("title")
+    return changed
+
+
+@router.get("/changes", response_model=ScrapeChangesResponse)
+async def get_changes(
+    since: int = Query(
+        default=0, ge=0, description="Курсор: next_since з попередньої відповіді"
+    ),
+    limit: int = Query(
+        default=500, gt=0, le=5000, description="Максимальна кількість змін"
+    ),
+    product_id: Optional[int] = Query(default=None, description="Фільтр за товаром"),
+    marketplace_ids: Optional[List[int]] = Query(
+        default=None, description="Список id маркетплейсів"
+    ),
+    db: AsyncSession = Depends(get_db),
+):
+    rows = await crud_scrape.get_changes(db, since, limit, product_id, marketplace_ids)
+    changes = [
+        ScrapeChange(
+            id=row.ScrapedProduct.id,
+            change_seq=row.ScrapedProduct.change_seq,
+            previous_id=row.ScrapedProduct.previous_id,
+            version=row.ScrapedProduct.version,
+            changed=_changed_fields(row),
+            product_id=row.ScrapedProduct.product_id,
+            marketplace_id=row.ScrapedProduct.marketplace_id,
+            url=row.ScrapedProduct.product_url,
+            title=row.ScrapedProduct.scraped_product_title,
+            previous_title=row.previous_title,
+            price=row.ScrapedProduct.scraped_price,
+            previous_price=row.previous_price,
+            price_minor=row.ScrapedProduct.price_minor,
+            previous_price_minor=row.previous_price_minor,
+            currency=row.ScrapedProduct.scraped_currency,
+            scraped_at=row.ScrapedProduct.scraped_at,
         )
+        for row in rows
+    ]
+    return ScrapeChangesResponse(
+        changes=changes, next_since=changes[-1].change_seq if changes else since
+    )
 
-    return ScrapeProductResponse(
-        scrape_request_id=new_request.id,
-        product_name_searched=request.product_name_searched,
-        results=results,
-        summary={
-            "total_marketplaces_processed": len(results),
-            "successful_scrapes": sum(1 for r in results if r.status == "success"),
-            "failed_scrapes": sum(1 for r in results if r.status != "success"),
+
+@router.get("/export")
+async def export_scraped_products(
+    fmt: Literal["csv", "ndjson", "parquet"] = Query(
+        default="ndjson", alias="format", description="Формат експорту"
+    ),
+    since: Optional[date] = Query(default=None, description="Дата скрейпінгу від"),
+    until: Optional[date] = Query(default=None, description="Дата скрейпінгу до"),
+    marketplace_ids: Optional[List[int]] = Query(
+        default=None, description="Список id маркетплейсів"
+    ),
+    product_id: Optional[int] = Query(default=None, description="Фільтр за товаром"),
+    include_archive: bool = Query(
+        default=True, description="Додати рядки з архіву, старші за термін зберігання"
+    ),
+):
+    filters = {
+        "since": since,
+        "until": until,
+        "marketplace_ids": marketplace_ids,
+        "product_id": product_id,
+    }
+
+    # The request's own session is closed before a streaming body is sent,
+    # so the export opens its own for the server-side cursor.
+    async def rows():
+        if include_archive:
+            async for batch in archive.iter_rows(
+                **filters, batch_size=config.EXPORT_BATCH_SIZE
+            ):
+                yield batch
+        async with AsyncSessionLocal() as session:
+            async for batch in crud_scrape.stream_scraped_products(session, **filters):
+                yield batch
+
+    return StreamingResponse(
+        export.encode(fmt, rows()),
+        media_type=export.MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{export.filename(fmt)}"'
         },
-        scraped_at=date.today(),
     )
+
+
+@router.get("/jobs/{job_id}")
+async def get_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    request = await crud_scrape.get_scrape_request(db, job_id)
+    if request is None:
+        raise HTTPException(404, "Job not found")
+    results = await _request_rows(db, request)
+    return {
+        "job_id": request.id,
+        "status": request.status,
+        "product_name_searched": request.product_name_searched,
+        "requested_at": request.requested_at,
+        "finished_at": request.finished_at,
+        "results": results,
+    }
+
+
+def _sse(event: str, data: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: int, db: AsyncSession = Depends(get_db)):
+    request = await crud_scrape.get_scrape_request(db, job_id)
+    if request is None:
+        raise HTTPException(404, "Job not found")
+
+    events = job_manager.events(job_id)
+    if events is not None:
+
+        async def live():
+            async for event, data in events.subscribe():
+                yield _sse(event, data)
+
+        return StreamingResponse(live(), media_type="text/event-stream")
+
+    marketplace_names = {
+        mp.id: mp.name for mp in await crud_marketplace.get_marketplaces(db)
+    }
+
+    async def stored():
+        # Unchanged listings keep their old row, so a request's rows do not
+        # arrive in id order.
+        sent: set[int] = set()
+        while True:
+            async with AsyncSessionLocal() as session:
+                request = await crud_scrape.get_scrape_request(session, job_id)
+                rows = await _request_rows(session, request)
+            for row in rows:
+                if row["id"] in sent:
+                    continue
+                sent.add(row["id"])
+                item = ScrapeResultItem(
+                    marketplace_name=marketplace_names.get(row["marketplace_id"], ""),
+                    status=row["status"],
+                    page=row["page"],
+                    position=row["position"],
+                    product_title=row["scraped_product_title"],
+                    price=row["scraped_price"],
+                    price_minor=row["price_minor"],
+                    currency=row["scraped_currency"],
+                    description=row["scraped_description"],
+                    url=row["product_url"] or None,
+                    scraped_at=row["scraped_at"],
+                    error_message=row["error_message"],
+                )
+                yield _sse("result", item.model_dump_json())
+            if request.status not in ("pending", "running"):
+                yield _sse("status", json.dumps({"status": request.status}))
+                return
+            await asyncio.sleep(config.WORKER_POLL_SECONDS)
+
+    return StreamingResponse(stored(), media_type="text/event-stream")
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, HttpUrl
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import date, datetime
 
 from sqlalchemy import JSON
@@ -13,6 +13,24 @@ class MarketplaceBase(BaseModel):
     price_selector: str
     link_selector: str
     description_selector: str
+    # Not nullable in the database, so an explicit null is rejected here.
+    ready_strategy: Literal["selector", "networkidle", "mutation", "timeout"] = (
+        "selector"
+    )
+    ready_max_wait_ms: int = 10000
+    ready_quiet_ms: int = 500
+    allow_url_patterns: Optional[List[str]] = None
+    block_url_patterns: Optional[List[str]] = None
+    render_mode: Literal["static", "browser", "auto"] = "auto"
+    max_results: Optional[int] = None
+    next_page_selector: Optional[str] = None
+    max_pages: int = 1
+    cache_ttl_seconds: Optional[int] = None
+    rate_limit_per_second: Optional[float] = None
+    rate_limit_burst: Optional[int] = None
+    max_concurrency: Optional[int] = None
+    price_locale: Optional[str] = None
+    currency: Optional[str] = None
 
 
 class MarketplaceCreate(MarketplaceBase):
@@ -36,6 +54,7 @@ class MarketplaceOut(MarketplaceBase):
 class ScrapedProductBase(BaseModel):
     scraped_product_title: Optional[str] = None
     scraped_price: Optional[str] = None
+    price_minor: Optional[int] = None
     scraped_currency: Optional[str] = None
     scraped_description: Optional[dict] = None
     product_url: Optional[HttpUrl] = None
@@ -43,12 +62,16 @@ class ScrapedProductBase(BaseModel):
     status: str
     error_message: Optional[str] = None
     marketplace_name: str
+    page: Optional[int] = None
+    position: Optional[int] = None
 
 
 class ScrapedProductCreate(ScrapedProductBase):
     request_id: int
     marketplace_id: int
     product_id: Optional[int] = None
+    snapshot_key: Optional[str] = None
+    content_hash: Optional[str] = None
 
 
 class ScrapedProductResponse(ScrapedProductBase):
@@ -67,6 +90,8 @@ class ScrapeRequestCreate(ScrapeRequestBase):
 class ScrapeRequestResponse(ScrapeRequestBase):
     id: int
     requested_at: date
+    status: Optional[str] = None
+    finished_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
@@ -75,8 +100,12 @@ class ScrapeRequestResponse(ScrapeRequestBase):
 class ScrapeResultItem(BaseModel):
     marketplace_name: str
     status: str
+    page: Optional[int] = None
+    position: Optional[int] = None
     product_title: Optional[str] = None
     price: Optional[str] = None
+    price_minor: Optional[int] = None
+    currency: Optional[str] = None
     description: Optional[dict] = None
     url: Optional[HttpUrl] = None
     scraped_at: date
@@ -91,9 +120,98 @@ class ScrapeProductResponse(BaseModel):
     scraped_at: date
 
 
+class ScrapeJobResponse(BaseModel):
+    job_id: int
+    status: str
+    product_name_searched: str
+    status_url: str
+    events_url: str
+
+
+class ScrapeBatchCreate(BaseModel):
+    product_ids: Optional[List[int]] = None
+    queries: Optional[List[str]] = None
+    marketplace_ids: Optional[List[int]] = None
+    force_refresh: bool = False
+
+
+class ScrapeBatchResponse(BaseModel):
+    batch_id: int
+    status: str
+    total_products: int
+    total_marketplaces: int
+    total_tasks: int
+    done_tasks: int = 0
+    failed_tasks: int = 0
+    running_tasks: int = 0
+    status_url: str
+
+
+class PriceComparisonItem(BaseModel):
+    rank: int
+    marketplace_id: int
+    marketplace_name: str
+    product_title: Optional[str] = None
+    price: Optional[str] = None
+    price_minor: int
+    currency: Optional[str] = None
+    url: Optional[str] = None
+    scraped_at: date
+
+
+class PriceComparisonResponse(BaseModel):
+    product_id: int
+    currencies: List[str]
+    results: List[PriceComparisonItem]
+    result: str
+
+
+class PriceHistoryPoint(BaseModel):
+    marketplace_id: int
+    period: date
+    currency: Optional[str] = None
+    min_price_minor: int
+    max_price_minor: int
+    avg_price_minor: int
+    last_price_minor: int
+    samples: int
+
+
+class PriceHistoryResponse(BaseModel):
+    product_id: int
+    resolution: str
+    since: date
+    points: List[PriceHistoryPoint]
+
+
+class ScrapeChange(BaseModel):
+    id: int
+    change_seq: int
+    previous_id: Optional[int] = None
+    version: int
+    changed: List[str]
+    product_id: Optional[int] = None
+    marketplace_id: int
+    url: Optional[str] = None
+    title: Optional[str] = None
+    previous_title: Optional[str] = None
+    price: Optional[str] = None
+    previous_price: Optional[str] = None
+    price_minor: Optional[int] = None
+    previous_price_minor: Optional[int] = None
+    currency: Optional[str] = None
+    scraped_at: date
+
+
+class ScrapeChangesResponse(BaseModel):
+    changes: List[ScrapeChange]
+    next_since: int
+
+
 class ProductBase(BaseModel):
     global_query_name: str
     description: str
+    refresh_interval_minutes: Optional[int] = None
 
 
 class ProductCreate(ProductBase):
@@ -106,6 +224,7 @@ class ProductUpdate(ProductBase):
 
 class Product(ProductBase):
     id: int
+    next_refresh_at: Optional[datetime] = None
 
     class Config:
         orm_mode = True
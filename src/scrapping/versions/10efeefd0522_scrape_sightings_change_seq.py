@@ -0,0 +1,75 @@
+"""scrape sightings and change feed sequence
+
+Revision ID: 10efeefd0522
+Revises: b7059d02f008
+Create Date: 2026-10-18 22:41:07.318529
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '10efeefd0522'
+down_revision: Union[str, None] = 'b7059d02f008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 5000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scrape_sightings',
+    sa.Column('request_id', sa.Integer(), nullable=False),
+    sa.Column('snapshot_id', sa.Integer(), nullable=False),
+    sa.Column('page', sa.Integer(), nullable=True),
+    sa.Column('position', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['request_id'], ['scrape_requests.id'], ),
+    sa.PrimaryKeyConstraint('request_id', 'snapshot_id')
+    )
+    op.add_column('scraped_products', sa.Column('change_seq', sa.BigInteger(), nullable=True))
+    op.execute(sa.schema.CreateSequence(sa.Sequence('scraped_products_change_seq')))
+
+    # Until now only the first and the latest request of a snapshot were
+    # kept, so those are the sightings that can be recovered. Both backfills
+    # commit per batch.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT max(id) FROM scraped_products")).scalar() or 0
+        insert_sightings = sa.text(
+            "INSERT INTO scrape_sightings (request_id, snapshot_id, page, position) "
+            "SELECT request_id, id, page, position FROM scraped_products "
+            "WHERE id > :start AND id <= :end "
+            "UNION ALL SELECT last_request_id, id, page, position FROM scraped_products "
+            "WHERE id > :start AND id <= :end "
+            "AND last_request_id IS NOT NULL AND last_request_id <> request_id "
+            "ON CONFLICT DO NOTHING"
+        )
+        sequence_batch = sa.text(
+            "UPDATE scraped_products sp SET change_seq = pending.seq FROM ("
+            "SELECT id, nextval('scraped_products_change_seq') AS seq FROM ("
+            "SELECT id FROM scraped_products "
+            "WHERE id > :start AND id <= :end AND snapshot_key IS NOT NULL ORDER BY id"
+            ") batch) pending WHERE sp.id = pending.id"
+        )
+        for start in range(0, max_id, BACKFILL_BATCH):
+            bounds = {"start": start, "end": start + BACKFILL_BATCH}
+            bind.execute(insert_sightings, bounds)
+            bind.execute(sequence_batch, bounds)
+
+    op.create_index('ix_scraped_products_change_seq', 'scraped_products', ['change_seq'], unique=True)
+    op.create_index('ix_scraped_products_unsequenced', 'scraped_products', ['id'], unique=False, postgresql_where=sa.text('change_seq IS NULL AND snapshot_key IS NOT NULL'))
+    op.drop_index('ix_scraped_products_last_request_id_id', table_name='scraped_products')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_scraped_products_last_request_id_id', 'scraped_products', ['last_request_id', 'id'], unique=False)
+    op.drop_index('ix_scraped_products_unsequenced', table_name='scraped_products', postgresql_where=sa.text('change_seq IS NULL AND snapshot_key IS NOT NULL'))
+    op.drop_index('ix_scraped_products_change_seq', table_name='scraped_products')
+    op.execute(sa.schema.DropSequence(sa.Sequence('scraped_products_change_seq')))
+    op.drop_column('scraped_products', 'change_seq')
+    op.drop_table('scrape_sightings')
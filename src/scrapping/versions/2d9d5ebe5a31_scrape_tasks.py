@@ -0,0 +1,53 @@
+"""scrape tasks
+
+Revision ID: 2d9d5ebe5a31
+Revises: 9ecde8d9bd6a
+Create Date: 2026-10-18 14:47:26.019337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d9d5ebe5a31'
+down_revision: Union[str, None] = '9ecde8d9bd6a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scrape_tasks',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('request_id', sa.Integer(), nullable=False),
+    sa.Column('marketplace_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=True),
+    sa.Column('query', sa.String(), nullable=False),
+    sa.Column('force_refresh', sa.Boolean(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('available_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('lease_expires_at', sa.DateTime(), nullable=True),
+    sa.Column('leased_by', sa.String(), nullable=True),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['marketplace_id'], ['marketplaces.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.ForeignKeyConstraint(['request_id'], ['scrape_requests.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scrape_tasks_id'), 'scrape_tasks', ['id'], unique=False)
+    op.create_index(op.f('ix_scrape_tasks_request_id'), 'scrape_tasks', ['request_id'], unique=False)
+    op.create_index('ix_scrape_tasks_status_available_at', 'scrape_tasks', ['status', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scrape_tasks_status_available_at', table_name='scrape_tasks')
+    op.drop_index(op.f('ix_scrape_tasks_request_id'), table_name='scrape_tasks')
+    op.drop_index(op.f('ix_scrape_tasks_id'), table_name='scrape_tasks')
+    op.drop_table('scrape_tasks')
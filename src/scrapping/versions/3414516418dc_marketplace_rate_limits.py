@@ -0,0 +1,32 @@
+"""marketplace rate limits
+
+Revision ID: 3414516418dc
+Revises: 2d9d5ebe5a31
+Create Date: 2026-10-18 16:02:37.514208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3414516418dc'
+down_revision: Union[str, None] = '2d9d5ebe5a31'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('marketplaces', sa.Column('rate_limit_per_second', sa.Float(), nullable=True))
+    op.add_column('marketplaces', sa.Column('rate_limit_burst', sa.Integer(), nullable=True))
+    op.add_column('marketplaces', sa.Column('max_concurrency', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('marketplaces', 'max_concurrency')
+    op.drop_column('marketplaces', 'rate_limit_burst')
+    op.drop_column('marketplaces', 'rate_limit_per_second')
@@ -0,0 +1,32 @@
+"""product refresh schedule
+
+Revision ID: 4351423dd020
+Revises: d362d795e48f
+Create Date: 2026-10-18 17:20:44.860172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4351423dd020'
+down_revision: Union[str, None] = 'd362d795e48f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('refresh_interval_minutes', sa.Integer(), nullable=True))
+    op.add_column('products', sa.Column('next_refresh_at', sa.DateTime(), nullable=True))
+    op.create_index(op.f('ix_products_next_refresh_at'), 'products', ['next_refresh_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_products_next_refresh_at'), table_name='products')
+    op.drop_column('products', 'next_refresh_at')
+    op.drop_column('products', 'refresh_interval_minutes')
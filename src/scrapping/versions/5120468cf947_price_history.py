@@ -0,0 +1,100 @@
+"""price history and daily rollups
+
+Revision ID: 5120468cf947
+Revises: bb14a8795179
+Create Date: 2026-10-18 19:34:08.215736
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5120468cf947'
+down_revision: Union[str, None] = 'bb14a8795179'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Frozen copy of the partition helpers in crud.price_history at this revision.
+def _next_month(month: datetime.date) -> datetime.date:
+    return (month + datetime.timedelta(days=32)).replace(day=1)
+
+
+def partition_ddl(month: datetime.date) -> str:
+    return (
+        f"CREATE TABLE IF NOT EXISTS price_history_{month:%Y_%m} "
+        f"PARTITION OF price_history "
+        f"FOR VALUES FROM ('{month}') TO ('{_next_month(month)}')"
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('price_history',
+    sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('observed_at', sa.DateTime(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('marketplace_id', sa.Integer(), nullable=False),
+    sa.Column('request_id', sa.Integer(), nullable=False),
+    sa.Column('price_minor', sa.BigInteger(), nullable=False),
+    sa.Column('currency', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['marketplace_id'], ['marketplaces.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('id', 'observed_at'),
+    postgresql_partition_by='RANGE (observed_at)'
+    )
+    op.create_index(op.f('ix_price_history_product_id'), 'price_history', ['product_id'], unique=False)
+    op.create_table('price_daily_rollups',
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('marketplace_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('min_price_minor', sa.BigInteger(), nullable=False),
+    sa.Column('max_price_minor', sa.BigInteger(), nullable=False),
+    sa.Column('sum_price_minor', sa.BigInteger(), nullable=False),
+    sa.Column('samples', sa.Integer(), nullable=False),
+    sa.Column('last_price_minor', sa.BigInteger(), nullable=False),
+    sa.Column('last_observed_at', sa.DateTime(), nullable=False),
+    sa.Column('currency', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['marketplace_id'], ['marketplaces.id'], ),
+    sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+    sa.PrimaryKeyConstraint('product_id', 'marketplace_id', 'day')
+    )
+
+    # Seed the history from the rows scraped so far: one observation per
+    # scrape and marketplace, timed by when the scrape request finished.
+    bind = op.get_bind()
+    months = bind.execute(sa.text(
+        "SELECT DISTINCT date_trunc('month', COALESCE(sr.finished_at, sp.scraped_at::timestamp))::date "
+        "FROM scraped_products sp JOIN scrape_requests sr ON sr.id = sp.request_id "
+        "UNION SELECT date_trunc('month', now())::date"
+    )).scalars().all()
+    for month in months:
+        op.execute(partition_ddl(month))
+    op.execute(
+        "INSERT INTO price_history (observed_at, product_id, marketplace_id, request_id, price_minor, currency) "
+        "SELECT DISTINCT ON (sp.request_id, sp.marketplace_id) "
+        "COALESCE(sr.finished_at, sp.scraped_at::timestamp), sp.product_id, sp.marketplace_id, "
+        "sp.request_id, sp.price_minor, sp.scraped_currency "
+        "FROM scraped_products sp JOIN scrape_requests sr ON sr.id = sp.request_id "
+        "WHERE sp.product_id IS NOT NULL AND sp.status = 'success' AND sp.price_minor IS NOT NULL "
+        "ORDER BY sp.request_id, sp.marketplace_id, sp.id"
+    )
+    op.execute(
+        "INSERT INTO price_daily_rollups (product_id, marketplace_id, day, min_price_minor, max_price_minor, "
+        "sum_price_minor, samples, last_price_minor, last_observed_at, currency) "
+        "SELECT product_id, marketplace_id, observed_at::date, min(price_minor), max(price_minor), "
+        "sum(price_minor), count(*), (array_agg(price_minor ORDER BY observed_at DESC))[1], "
+        "max(observed_at), (array_agg(currency ORDER BY observed_at DESC))[1] "
+        "FROM price_history GROUP BY product_id, marketplace_id, observed_at::date"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('price_daily_rollups')
+    op.drop_index(op.f('ix_price_history_product_id'), table_name='price_history')
+    op.drop_table('price_history')
@@ -0,0 +1,131 @@
+"""scraped product versions
+
+Revision ID: 788b9cc5fbd3
+Revises: 5120468cf947
+Create Date: 2026-10-18 20:12:45.660381
+
+"""
+import hashlib
+import json
+from typing import Optional, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '788b9cc5fbd3'
+down_revision: Union[str, None] = '5120468cf947'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 5000
+
+
+# Frozen copy of service.snapshots at this revision. The keys written here
+# have to keep matching what the app computed when the rows were stored.
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _digest(value) -> str:
+    encoded = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+def snapshot_key(
+    product_id: Optional[int], query: str, marketplace_id: int, url: Optional[str]
+) -> Optional[str]:
+    if not url:
+        return None
+    owner = product_id if product_id is not None else normalize_query(query)
+    return _digest([owner, marketplace_id, str(url)])
+
+
+def content_hash(
+    title: Optional[str],
+    price: Optional[str],
+    price_minor: Optional[int],
+    currency: Optional[str],
+    description: Optional[dict],
+) -> str:
+    return _digest([title, price, price_minor, currency, description])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scraped_products', sa.Column('page', sa.Integer(), nullable=True))
+    op.add_column('scraped_products', sa.Column('position', sa.Integer(), nullable=True))
+    op.add_column('scraped_products', sa.Column('snapshot_key', sa.String(), nullable=True))
+    op.add_column('scraped_products', sa.Column('content_hash', sa.String(), nullable=True))
+    op.add_column('scraped_products', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('scraped_products', sa.Column('previous_id', sa.Integer(), nullable=True))
+    op.add_column('scraped_products', sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+    op.add_column('scraped_products', sa.Column('last_request_id', sa.Integer(), nullable=True))
+
+    # Both backfills walk the table in id ranges. The autocommit block first
+    # commits the new columns, then every statement commits on its own, so a
+    # batch only holds its row locks until it is written.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        max_id = bind.execute(sa.text("SELECT max(id) FROM scraped_products")).scalar() or 0
+        update_seen = sa.text(
+            "UPDATE scraped_products sp SET last_request_id = sp.request_id, "
+            "last_seen_at = COALESCE(sr.finished_at, sp.scraped_at::timestamp) "
+            "FROM scrape_requests sr WHERE sr.id = sp.request_id "
+            "AND sp.id > :start AND sp.id <= :end"
+        )
+        for start in range(0, max_id, BACKFILL_BATCH):
+            bind.execute(update_seen, {"start": start, "end": start + BACKFILL_BATCH})
+
+        # Hash the existing successful rows so the first new scrape of a
+        # listing is already compared against its latest stored snapshot.
+        select_batch = sa.text(
+            "SELECT sp.id, sp.product_id, sr.product_name_searched, sp.marketplace_id, sp.product_url, "
+            "sp.scraped_product_title, sp.scraped_price, sp.price_minor, sp.scraped_currency, "
+            "sp.scraped_description "
+            "FROM scraped_products sp JOIN scrape_requests sr ON sr.id = sp.request_id "
+            "WHERE sp.id > :last_id AND sp.status = 'success' "
+            "ORDER BY sp.id LIMIT :batch"
+        ).columns(scraped_description=sa.JSON)
+        update_row = sa.text(
+            "UPDATE scraped_products SET snapshot_key = :snapshot_key, content_hash = :content_hash "
+            "WHERE id = :id"
+        )
+        last_id = 0
+        while True:
+            rows = bind.execute(select_batch, {"last_id": last_id, "batch": BACKFILL_BATCH}).all()
+            if not rows:
+                break
+            bind.execute(update_row, [
+                {
+                    "id": row.id,
+                    "snapshot_key": snapshot_key(row.product_id, row.product_name_searched, row.marketplace_id, row.product_url),
+                    "content_hash": content_hash(row.scraped_product_title, row.scraped_price, row.price_minor, row.scraped_currency, row.scraped_description),
+                }
+                for row in rows
+            ])
+            last_id = rows[-1].id
+
+    op.drop_index('ix_scraped_products_product_marketplace_scraped_at', table_name='scraped_products')
+    op.create_index('ix_scraped_products_product_marketplace_last_request', 'scraped_products', ['product_id', 'marketplace_id', sa.text('last_request_id DESC')], unique=False)
+    op.create_index('ix_scraped_products_snapshot_key_id', 'scraped_products', ['snapshot_key', 'id'], unique=False)
+    op.create_index(op.f('ix_scraped_products_request_id'), 'scraped_products', ['request_id'], unique=False)
+    op.create_index(op.f('ix_scraped_products_last_request_id'), 'scraped_products', ['last_request_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_scraped_products_last_request_id'), table_name='scraped_products')
+    op.drop_index(op.f('ix_scraped_products_request_id'), table_name='scraped_products')
+    op.drop_index('ix_scraped_products_snapshot_key_id', table_name='scraped_products')
+    op.drop_index('ix_scraped_products_product_marketplace_last_request', table_name='scraped_products')
+    op.create_index('ix_scraped_products_product_marketplace_scraped_at', 'scraped_products', ['product_id', 'marketplace_id', sa.text('scraped_at DESC')], unique=False)
+    op.drop_column('scraped_products', 'last_request_id')
+    op.drop_column('scraped_products', 'last_seen_at')
+    op.drop_column('scraped_products', 'previous_id')
+    op.drop_column('scraped_products', 'version')
+    op.drop_column('scraped_products', 'content_hash')
+    op.drop_column('scraped_products', 'snapshot_key')
+    op.drop_column('scraped_products', 'position')
+    op.drop_column('scraped_products', 'page')
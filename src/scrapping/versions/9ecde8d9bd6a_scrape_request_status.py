@@ -0,0 +1,30 @@
+"""scrape request status
+
+Revision ID: 9ecde8d9bd6a
+Revises: b6cfde47158c
+Create Date: 2026-10-18 14:09:51.381904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9ecde8d9bd6a'
+down_revision: Union[str, None] = 'b6cfde47158c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scrape_requests', sa.Column('status', sa.String(), server_default='completed', nullable=False))
+    op.add_column('scrape_requests', sa.Column('finished_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scrape_requests', 'finished_at')
+    op.drop_column('scrape_requests', 'status')
@@ -0,0 +1,28 @@
+"""marketplace render mode
+
+Revision ID: a4766a5f817f
+Revises: cca137d7de78
+Create Date: 2026-10-18 11:05:52.930417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4766a5f817f'
+down_revision: Union[str, None] = 'cca137d7de78'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('marketplaces', sa.Column('render_mode', sa.String(), server_default='auto', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('marketplaces', 'render_mode')
@@ -0,0 +1,28 @@
+"""marketplace max results
+
+Revision ID: a587e054ab6c
+Revises: a4766a5f817f
+Create Date: 2026-10-18 12:20:13.604871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a587e054ab6c'
+down_revision: Union[str, None] = 'a4766a5f817f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('marketplaces', sa.Column('max_results', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('marketplaces', 'max_results')
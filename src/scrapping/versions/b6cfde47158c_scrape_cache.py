@@ -0,0 +1,43 @@
+"""scrape cache
+
+Revision ID: b6cfde47158c
+Revises: f682ad66799a
+Create Date: 2026-10-18 13:34:18.760215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6cfde47158c'
+down_revision: Union[str, None] = 'f682ad66799a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('marketplaces', sa.Column('cache_ttl_seconds', sa.Integer(), nullable=True))
+    op.create_table('scrape_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('marketplace_id', sa.Integer(), nullable=False),
+    sa.Column('query', sa.String(), nullable=False),
+    sa.Column('result', sa.JSON(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['marketplace_id'], ['marketplaces.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('marketplace_id', 'query')
+    )
+    op.create_index(op.f('ix_scrape_cache_id'), 'scrape_cache', ['id'], unique=False)
+    op.create_index(op.f('ix_scrape_cache_expires_at'), 'scrape_cache', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_scrape_cache_expires_at'), table_name='scrape_cache')
+    op.drop_index(op.f('ix_scrape_cache_id'), table_name='scrape_cache')
+    op.drop_table('scrape_cache')
+    op.drop_column('marketplaces', 'cache_ttl_seconds')
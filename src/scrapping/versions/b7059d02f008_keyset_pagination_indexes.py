@@ -0,0 +1,35 @@
+"""keyset pagination indexes
+
+Revision ID: b7059d02f008
+Revises: 788b9cc5fbd3
+Create Date: 2026-10-18 21:03:19.477210
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7059d02f008'
+down_revision: Union[str, None] = '788b9cc5fbd3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_scrape_requests_requested_at_id', 'scrape_requests', ['requested_at', 'id'], unique=False)
+    op.create_index('ix_scraped_products_request_id_id', 'scraped_products', ['request_id', 'id'], unique=False)
+    op.create_index('ix_scraped_products_last_request_id_id', 'scraped_products', ['last_request_id', 'id'], unique=False)
+    op.drop_index('ix_scraped_products_request_id', table_name='scraped_products')
+    op.drop_index('ix_scraped_products_last_request_id', table_name='scraped_products')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_scraped_products_last_request_id', 'scraped_products', ['last_request_id'], unique=False)
+    op.create_index('ix_scraped_products_request_id', 'scraped_products', ['request_id'], unique=False)
+    op.drop_index('ix_scraped_products_last_request_id_id', table_name='scraped_products')
+    op.drop_index('ix_scraped_products_request_id_id', table_name='scraped_products')
+    op.drop_index('ix_scrape_requests_requested_at_id', table_name='scrape_requests')
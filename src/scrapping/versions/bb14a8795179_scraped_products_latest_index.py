@@ -0,0 +1,28 @@
+"""scraped products latest snapshot index
+
+Revision ID: bb14a8795179
+Revises: e7a6f3829bf8
+Create Date: 2026-10-18 19:06:51.902147
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'bb14a8795179'
+down_revision: Union[str, None] = 'e7a6f3829bf8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_scraped_products_product_marketplace_scraped_at', 'scraped_products', ['product_id', 'marketplace_id', sa.text('scraped_at DESC')], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scraped_products_product_marketplace_scraped_at', table_name='scraped_products')
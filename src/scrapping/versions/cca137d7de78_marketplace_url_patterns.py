@@ -0,0 +1,30 @@
+"""marketplace url patterns
+
+Revision ID: cca137d7de78
+Revises: f7b7ed8c7373
+Create Date: 2026-10-18 10:41:37.502291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'cca137d7de78'
+down_revision: Union[str, None] = 'f7b7ed8c7373'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('marketplaces', sa.Column('allow_url_patterns', sa.JSON(), nullable=True))
+    op.add_column('marketplaces', sa.Column('block_url_patterns', sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('marketplaces', 'block_url_patterns')
+    op.drop_column('marketplaces', 'allow_url_patterns')
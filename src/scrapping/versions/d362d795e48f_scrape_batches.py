@@ -0,0 +1,47 @@
+"""scrape batches
+
+Revision ID: d362d795e48f
+Revises: 3414516418dc
+Create Date: 2026-10-18 16:41:09.228614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd362d795e48f'
+down_revision: Union[str, None] = '3414516418dc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scrape_batches',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('total_products', sa.Integer(), nullable=False),
+    sa.Column('total_marketplaces', sa.Integer(), nullable=False),
+    sa.Column('total_tasks', sa.Integer(), nullable=False),
+    sa.Column('done_tasks', sa.Integer(), nullable=False),
+    sa.Column('failed_tasks', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_scrape_batches_id'), 'scrape_batches', ['id'], unique=False)
+    op.add_column('scrape_requests', sa.Column('batch_id', sa.Integer(), nullable=True))
+    op.create_index(op.f('ix_scrape_requests_batch_id'), 'scrape_requests', ['batch_id'], unique=False)
+    op.create_foreign_key(None, 'scrape_requests', 'scrape_batches', ['batch_id'], ['id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('scrape_requests_batch_id_fkey', 'scrape_requests', type_='foreignkey')
+    op.drop_index(op.f('ix_scrape_requests_batch_id'), table_name='scrape_requests')
+    op.drop_column('scrape_requests', 'batch_id')
+    op.drop_index(op.f('ix_scrape_batches_id'), table_name='scrape_batches')
+    op.drop_table('scrape_batches')
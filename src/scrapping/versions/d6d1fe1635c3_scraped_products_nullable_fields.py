@@ -0,0 +1,48 @@
+"""scraped products nullable fields
+
+Revision ID: d6d1fe1635c3
+Revises: 4351423dd020
+Create Date: 2026-10-18 17:58:12.604391
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6d1fe1635c3'
+down_revision: Union[str, None] = '4351423dd020'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('scraped_products', 'scraped_product_title',
+               existing_type=sa.VARCHAR(),
+               nullable=True)
+    op.alter_column('scraped_products', 'scraped_price',
+               existing_type=sa.VARCHAR(),
+               nullable=True)
+    op.alter_column('scraped_products', 'product_url',
+               existing_type=sa.VARCHAR(),
+               nullable=True)
+    op.execute("UPDATE scraped_products SET product_url = NULL WHERE product_url = 'None'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("UPDATE scraped_products SET product_url = 'None' WHERE product_url IS NULL")
+    op.execute("UPDATE scraped_products SET scraped_price = '' WHERE scraped_price IS NULL")
+    op.execute("UPDATE scraped_products SET scraped_product_title = '' WHERE scraped_product_title IS NULL")
+    op.alter_column('scraped_products', 'product_url',
+               existing_type=sa.VARCHAR(),
+               nullable=False)
+    op.alter_column('scraped_products', 'scraped_price',
+               existing_type=sa.VARCHAR(),
+               nullable=False)
+    op.alter_column('scraped_products', 'scraped_product_title',
+               existing_type=sa.VARCHAR(),
+               nullable=False)
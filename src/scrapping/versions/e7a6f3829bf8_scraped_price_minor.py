@@ -0,0 +1,192 @@
+"""scraped price minor units
+
+Revision ID: e7a6f3829bf8
+Revises: d6d1fe1635c3
+Create Date: 2026-10-18 18:41:27.318504
+
+"""
+import re
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple, Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a6f3829bf8'
+down_revision: Union[str, None] = 'd6d1fe1635c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BACKFILL_BATCH = 5000
+
+
+# Frozen copy of service.prices at this revision, so later changes to the
+# app's parser never change what this migration wrote.
+# Decimal and grouping separators per marketplace locale. Unknown or missing
+# locales fall back to guessing from the string itself.
+LOCALES = {
+    "uk_UA": (",", " "),
+    "ru_RU": (",", " "),
+    "pl_PL": (",", " "),
+    "cs_CZ": (",", " "),
+    "fr_FR": (",", " "),
+    "de_DE": (",", "."),
+    "it_IT": (",", "."),
+    "es_ES": (",", "."),
+    "nl_NL": (",", "."),
+    "en_US": (".", ","),
+    "en_GB": (".", ","),
+    "de_CH": (".", "'"),
+}
+
+_CURRENCY_SYMBOLS = [
+    ("грн", "UAH"),
+    ("₴", "UAH"),
+    ("uah", "UAH"),
+    ("zł", "PLN"),
+    ("pln", "PLN"),
+    ("kč", "CZK"),
+    ("czk", "CZK"),
+    ("руб", "RUB"),
+    ("₽", "RUB"),
+    ("rub", "RUB"),
+    ("us$", "USD"),
+    ("usd", "USD"),
+    ("$", "USD"),
+    ("eur", "EUR"),
+    ("€", "EUR"),
+    ("gbp", "GBP"),
+    ("£", "GBP"),
+    ("chf", "CHF"),
+    ("jpy", "JPY"),
+    ("¥", "JPY"),
+]
+
+_MINOR_DIGITS = {"JPY": 0, "KRW": 0, "HUF": 0}
+
+# Digits may be grouped by a separator followed by exactly three digits, so
+# "2 599 1 999 ₴" (old and new price side by side) stops after "2 599".
+_NUMBER = re.compile(r"(?:\d{1,3}(?:[\s.,'’]\d{3})+|\d+)(?:[.,]\d+)?")
+_SPACES = re.compile(r"[\s  ]")
+
+
+class ParsedPrice(NamedTuple):
+    minor: int | None
+    currency: str | None
+
+
+def detect_currency(raw: str) -> str | None:
+    lowered = raw.lower()
+    for symbol, code in _CURRENCY_SYMBOLS:
+        if symbol in lowered:
+            return code
+    return None
+
+
+def _guess_decimal_separator(number: str) -> str | None:
+    last_dot, last_comma = number.rfind("."), number.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        return "." if last_dot > last_comma else ","
+    separator = "." if last_dot >= 0 else "," if last_comma >= 0 else None
+    if separator is None or number.count(separator) > 1:
+        return None
+    # "12,50" or "9.9" are decimals, "1,299" or "12.000" are grouped thousands.
+    return separator if len(number) - number.rfind(separator) - 1 in (1, 2) else None
+
+
+def parse_amount(raw: str, locale: str | None = None) -> Decimal | None:
+    match = _NUMBER.search(raw)
+    if match is None:
+        return None
+    number = _SPACES.sub("", match.group()).rstrip(".,'’")
+    if locale in LOCALES:
+        decimal_separator, group_separator = LOCALES[locale]
+        foreign = any(
+            c in number for c in ".," if c not in (decimal_separator, group_separator)
+        )
+        if decimal_separator not in number:
+            decimal_separator = _guess_decimal_separator(number) if foreign else None
+        elif number.count(decimal_separator) > 1:
+            decimal_separator = None
+    else:
+        decimal_separator = _guess_decimal_separator(number)
+
+    if decimal_separator is None:
+        integer, fraction = number, ""
+    else:
+        integer, _, fraction = number.rpartition(decimal_separator)
+    integer = re.sub(r"\D", "", integer)
+    fraction = re.sub(r"\D", "", fraction)
+    if not integer and not fraction:
+        return None
+    try:
+        return Decimal(f"{integer or 0}.{fraction or 0}")
+    except InvalidOperation:
+        return None
+
+
+def to_minor(amount: Decimal, currency: str | None) -> int:
+    digits = _MINOR_DIGITS.get(currency or "", 2)
+    return int((amount * 10**digits).to_integral_value())
+
+
+def parse_price(
+    raw: str | None,
+    locale: str | None = None,
+    default_currency: str | None = None,
+) -> ParsedPrice:
+    if not raw:
+        return ParsedPrice(None, default_currency)
+    currency = detect_currency(raw) or default_currency
+    amount = parse_amount(raw, locale)
+    if amount is None:
+        return ParsedPrice(None, currency)
+    return ParsedPrice(to_minor(amount, currency), currency)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('marketplaces', sa.Column('price_locale', sa.String(), nullable=True))
+    op.add_column('marketplaces', sa.Column('currency', sa.String(), nullable=True))
+    op.add_column('scraped_products', sa.Column('price_minor', sa.BigInteger(), nullable=True))
+
+    # Backfill in id order. The autocommit block first commits the new
+    # columns, then every statement commits on its own, so each batch only
+    # holds its row locks until it is written.
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        select_batch = sa.text(
+            "SELECT sp.id, sp.scraped_price, m.price_locale, m.currency "
+            "FROM scraped_products sp JOIN marketplaces m ON m.id = sp.marketplace_id "
+            "WHERE sp.id > :last_id AND sp.scraped_price IS NOT NULL "
+            "ORDER BY sp.id LIMIT :batch"
+        )
+        update_row = sa.text(
+            "UPDATE scraped_products SET price_minor = :price_minor, "
+            "scraped_currency = COALESCE(scraped_currency, :currency) WHERE id = :id"
+        )
+        last_id = 0
+        while True:
+            rows = bind.execute(select_batch, {"last_id": last_id, "batch": BACKFILL_BATCH}).all()
+            if not rows:
+                break
+            updates = []
+            for row_id, raw, locale, currency in rows:
+                price = parse_price(raw, locale, currency)
+                if price.minor is not None or price.currency is not None:
+                    updates.append({"id": row_id, "price_minor": price.minor, "currency": price.currency})
+            if updates:
+                bind.execute(update_row, updates)
+            last_id = rows[-1][0]
+
+    op.create_index('ix_scraped_products_product_id_price_minor', 'scraped_products', ['product_id', 'price_minor'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_scraped_products_product_id_price_minor', table_name='scraped_products')
+    op.drop_column('scraped_products', 'price_minor')
+    op.drop_column('marketplaces', 'currency')
+    op.drop_column('marketplaces', 'price_locale')
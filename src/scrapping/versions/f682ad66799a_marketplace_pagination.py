@@ -0,0 +1,30 @@
+"""marketplace pagination
+
+Revision ID: f682ad66799a
+Revises: a587e054ab6c
+Create Date: 2026-10-18 12:58:40.227156
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f682ad66799a'
+down_revision: Union[str, None] = 'a587e054ab6c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('marketplaces', sa.Column('next_page_selector', sa.String(), nullable=True))
+    op.add_column('marketplaces', sa.Column('max_pages', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('marketplaces', 'max_pages')
+    op.drop_column('marketplaces', 'next_page_selector')
@@ -0,0 +1,32 @@
+"""marketplace readiness
+
+Revision ID: f7b7ed8c7373
+Revises: ded5df6e4aa8
+Create Date: 2026-10-18 10:12:04.118532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7b7ed8c7373'
+down_revision: Union[str, None] = 'ded5df6e4aa8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('marketplaces', sa.Column('ready_strategy', sa.String(), server_default='selector', nullable=False))
+    op.add_column('marketplaces', sa.Column('ready_max_wait_ms', sa.Integer(), server_default='10000', nullable=False))
+    op.add_column('marketplaces', sa.Column('ready_quiet_ms', sa.Integer(), server_default='500', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('marketplaces', 'ready_quiet_ms')
+    op.drop_column('marketplaces', 'ready_max_wait_ms')
+    op.drop_column('marketplaces', 'ready_strategy')
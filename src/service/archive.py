@@ -0,0 +1,228 @@
+import asyncio
+import datetime
+import heapq
+import json
+import os
+from collections import defaultdict
+from typing import AsyncIterator, Iterator, Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import config
+
+SCRAPED_PRODUCTS_SCHEMA = pa.schema(
+    [
+        ("id", pa.int64()),
+        ("request_id", pa.int64()),
+        ("marketplace_id", pa.int64()),
+        ("product_id", pa.int64()),
+        ("scraped_product_title", pa.string()),
+        ("scraped_price", pa.string()),
+        ("price_minor", pa.int64()),
+        ("scraped_currency", pa.string()),
+        ("scraped_description", pa.string()),
+        ("product_url", pa.string()),
+        ("scraped_at", pa.date32()),
+        ("status", pa.string()),
+        ("error_message", pa.string()),
+        ("page", pa.int32()),
+        ("position", pa.int32()),
+        ("snapshot_key", pa.string()),
+        ("content_hash", pa.string()),
+        ("version", pa.int32()),
+        ("previous_id", pa.int64()),
+        ("last_seen_at", pa.timestamp("us")),
+        ("last_request_id", pa.int64()),
+    ]
+)
+
+
+def _root() -> str:
+    return os.path.join(config.ARCHIVE_DIR, "scraped_products")
+
+
+def _month(day: datetime.date) -> str:
+    return f"{day:%Y-%m}"
+
+
+def write_rows(rows: list[dict]) -> list[str]:
+    # Laid out as month=YYYY-MM/marketplace=<id>/ so readers can skip whole
+    # directories.
+    groups = defaultdict(list)
+    for row in rows:
+        groups[(_month(row["scraped_at"]), row["marketplace_id"])].append(
+            {
+                **row,
+                "scraped_description": (
+                    json.dumps(row["scraped_description"], ensure_ascii=False)
+                    if row["scraped_description"] is not None
+                    else None
+                ),
+            }
+        )
+    paths = []
+    for (month, marketplace_id), group in groups.items():
+        directory = os.path.join(
+            _root(), f"month={month}", f"marketplace={marketplace_id}"
+        )
+        os.makedirs(directory, exist_ok=True)
+        name = f"part-{group[0]['id']}-{group[-1]['id']}.parquet"
+        path = os.path.join(directory, name)
+        # Dot-prefixed files are ignored by dataset discovery.
+        temporary = os.path.join(directory, f".{name}.tmp")
+        table = pa.Table.from_pylist(group, schema=SCRAPED_PRODUCTS_SCHEMA)
+        pq.write_table(table, temporary, compression="zstd")
+        os.replace(temporary, path)
+        paths.append(path)
+    return paths
+
+
+def months() -> list[str]:
+    if not os.path.isdir(_root()):
+        return []
+    return sorted(
+        name.removeprefix("month=")
+        for name in os.listdir(_root())
+        if name.startswith("month=")
+    )
+
+
+def _id_range(path: str) -> tuple[int, int]:
+    first, last = (
+        os.path.basename(path).removeprefix("part-").removesuffix(".parquet")
+    ).split("-")
+    return int(first), int(last)
+
+
+def _filter(
+    ids: Optional[list[int]],
+    request_id: Optional[int],
+    product_id: Optional[int],
+    marketplace_ids: Optional[list[int]],
+    since: Optional[datetime.date],
+    until: Optional[datetime.date],
+    after: int,
+):
+    conditions = []
+    if after:
+        conditions.append(ds.field("id") > after)
+    if ids is not None:
+        conditions.append(ds.field("id").isin(ids))
+    if request_id is not None:
+        conditions.append(
+            (ds.field("request_id") == request_id)
+            | (ds.field("last_request_id") == request_id)
+        )
+    if product_id is not None:
+        conditions.append(ds.field("product_id") == product_id)
+    if marketplace_ids is not None:
+        conditions.append(ds.field("marketplace").isin(marketplace_ids))
+    if since is not None:
+        conditions.append(ds.field("month") >= _month(since))
+        conditions.append(ds.field("scraped_at") >= since)
+    if until is not None:
+        conditions.append(ds.field("month") <= _month(until))
+        conditions.append(ds.field("scraped_at") <= until)
+    expression = None
+    for condition in conditions:
+        expression = condition if expression is None else expression & condition
+    return expression
+
+
+def read_rows(
+    ids: Optional[list[int]] = None,
+    request_id: Optional[int] = None,
+    product_id: Optional[int] = None,
+    marketplace_ids: Optional[list[int]] = None,
+    since: Optional[datetime.date] = None,
+    until: Optional[datetime.date] = None,
+    after: int = 0,
+    limit: Optional[int] = None,
+    batch_size: int = 10000,
+) -> Iterator[list[dict]]:
+    if not months():
+        return
+    dataset = ds.dataset(
+        _root(),
+        format="parquet",
+        partitioning=ds.partitioning(
+            pa.schema([("month", pa.string()), ("marketplace", pa.int64())]),
+            flavor="hive",
+        ),
+        exclude_invalid_files=True,
+    )
+    expression = _filter(
+        ids, request_id, product_id, marketplace_ids, since, until, after
+    )
+    fragments = sorted(
+        (
+            (_id_range(fragment.path), fragment)
+            for fragment in dataset.get_fragments(filter=expression)
+            if _id_range(fragment.path)[1] > after
+        ),
+        key=lambda item: item[0],
+    )
+    # Retention is at-least-once: a crash between writing a file and deleting
+    # its rows archives them again on the next run, into a file whose id range
+    # overlaps the first one. Files are read in id order and ids are only
+    # remembered while ranges overlap, which is one retention batch at most.
+    # With a limit, a file's rows are in id order, so a file is read until
+    # its ids pass the limit-th smallest id found so far, and the read stops
+    # at the first file that starts past it. More than limit rows can be
+    # yielded; load_rows trims them.
+    seen: set[int] = set()
+    smallest: list[int] = []
+    horizon = 0
+    for (first, last), fragment in fragments:
+        if limit is not None and len(smallest) == limit and first > -smallest[0]:
+            return
+        if first > horizon:
+            seen.clear()
+        horizon = max(horizon, last)
+        past_limit = False
+        for batch in fragment.to_batches(
+            schema=dataset.schema,
+            columns=SCRAPED_PRODUCTS_SCHEMA.names,
+            filter=expression,
+            batch_size=batch_size,
+        ):
+            rows = []
+            for row in batch.to_pylist():
+                if row["id"] in seen:
+                    continue
+                if limit is not None:
+                    if len(smallest) < limit:
+                        heapq.heappush(smallest, -row["id"])
+                    elif row["id"] < -smallest[0]:
+                        heapq.heapreplace(smallest, -row["id"])
+                    else:
+                        past_limit = True
+                        break
+                seen.add(row["id"])
+                if row["scraped_description"] is not None:
+                    row["scraped_description"] = json.loads(row["scraped_description"])
+                rows.append(row)
+            if rows:
+                yield rows
+            if past_limit:
+                break
+
+
+async def iter_rows(**filters) -> AsyncIterator[list[dict]]:
+    batches = read_rows(**filters)
+    while True:
+        rows = await asyncio.to_thread(next, batches, None)
+        if rows is None:
+            return
+        yield rows
+
+
+async def load_rows(**filters) -> list[dict]:
+    rows = []
+    async for batch in iter_rows(**filters):
+        rows.extend(batch)
+    if filters.get("limit") is not None:
+        rows = sorted(rows, key=lambda row: row["id"])[: filters["limit"]]
+    return rows
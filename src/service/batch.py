@@ -0,0 +1,275 @@
+import asyncio
+from collections import deque
+from contextlib import AsyncExitStack
+from typing import NamedTuple, Optional
+
+from playwright.async_api import BrowserContext
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from crud import scrape as crud_scrape
+from crud import scrape_batch as crud_scrape_batch
+from crud import scrape_task as crud_scrape_task
+from database import AsyncSessionLocal
+from models import marketplace
+from models.scrapebatch import ScrapeBatch
+from schemas import ScrapedProductCreate
+from service import runner, scrape
+from service.browser import pool as browser_pool
+from service.fanout import background
+
+
+class BatchItem(NamedTuple):
+    request_id: int
+    product_id: Optional[int]
+    query: str
+
+
+class _ReusableContext:
+    def __init__(self, max_uses: int):
+        self.max_uses = max_uses
+        self._stack: AsyncExitStack | None = None
+        self._context: BrowserContext | None = None
+        self._uses = 0
+
+    async def get(self) -> BrowserContext:
+        if self._context is None or self._uses >= self.max_uses:
+            await self.close()
+            stack = AsyncExitStack()
+            self._context = await stack.enter_async_context(browser_pool.context())
+            self._stack = stack
+            self._uses = 0
+        self._uses += 1
+        return self._context
+
+    async def close(self):
+        stack, self._stack, self._context = self._stack, None, None
+        if stack is not None:
+            await stack.aclose()
+
+
+class BatchManager:
+    def __init__(
+        self,
+        lane_workers: int = config.BATCH_LANE_WORKERS,
+        write_size: int = config.BULK_WRITE_SIZE,
+    ):
+        self.lane_workers = lane_workers
+        self.write_size = write_size
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._progress: dict[int, dict] = {}
+        # Lanes keep their browser context between scrapes, so only a quarter
+        # of the pool may be held that way; the rest stays free for other
+        # scrapes.
+        self._reuse_slots = asyncio.Semaphore(
+            max(1, browser_pool.size * browser_pool.contexts_per_browser // 4)
+        )
+
+    def submit(
+        self,
+        batch_id: int,
+        items: list[BatchItem],
+        marketplaces: list[marketplace.Marketplace],
+        force_refresh: bool = False,
+        is_background: bool = False,
+    ):
+        self._progress[batch_id] = {
+            "batch_id": batch_id,
+            "status": "pending",
+            "total_tasks": len(items) * len(marketplaces),
+            "done_tasks": 0,
+            "failed_tasks": 0,
+            "running_tasks": 0,
+            "by_marketplace": {
+                mp.id: {"done": 0, "failed": 0, "remaining": len(items)}
+                for mp in marketplaces
+            },
+        }
+        task = asyncio.create_task(
+            self._run(batch_id, items, marketplaces, force_refresh, is_background)
+        )
+        self._tasks[batch_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(batch_id, None))
+
+    def progress(self, batch_id: int) -> dict | None:
+        return self._progress.get(batch_id)
+
+    def _forget_progress(self, batch_id: int):
+        asyncio.get_running_loop().call_later(
+            config.SCRAPE_JOB_EVENTS_RETENTION_SECONDS,
+            self._progress.pop,
+            batch_id,
+            None,
+        )
+
+    async def _run(
+        self,
+        batch_id: int,
+        items: list[BatchItem],
+        marketplaces: list[marketplace.Marketplace],
+        force_refresh: bool,
+        is_background: bool,
+    ):
+        background.set(is_background)
+        progress = self._progress[batch_id]
+        remaining = {item.request_id: len(marketplaces) for item in items}
+        rows: list[ScrapedProductCreate] = []
+        finished: list[int] = []
+        unflushed = {"done": 0, "failed": 0}
+        write_lock = asyncio.Lock()
+
+        async def flush():
+            async with write_lock:
+                batch_rows, rows[:] = list(rows), []
+                batch_finished, finished[:] = list(finished), []
+                done, failed = unflushed["done"], unflushed["failed"]
+                unflushed["done"] = unflushed["failed"] = 0
+                async with AsyncSessionLocal() as db:
+                    await crud_scrape.save_scraped_products(
+                        db, batch_rows, commit=False
+                    )
+                    if done or failed:
+                        await crud_scrape_batch.update_batch_progress(
+                            db, batch_id, done, failed, commit=False
+                        )
+                    if batch_finished:
+                        await crud_scrape_batch.finish_requests(
+                            db, batch_finished, "completed", commit=False
+                        )
+                    await db.commit()
+
+        def record(mp: marketplace.Marketplace, item: BatchItem, result: dict):
+            rows.extend(
+                runner.product_data(
+                    item.request_id, mp, item.product_id, item.query, result, row
+                )
+                for row in result["items"] or [{}]
+            )
+            outcome = "done" if result["status"] == "success" else "failed"
+            unflushed[outcome] += 1
+            progress[f"{outcome}_tasks"] += 1
+            progress["by_marketplace"][mp.id][outcome] += 1
+            remaining[item.request_id] -= 1
+            if remaining[item.request_id] == 0:
+                finished.append(item.request_id)
+
+        async def lane(mp: marketplace.Marketplace, queue: deque[BatchItem]):
+            # Background batches take a context per scrape, so they queue
+            # behind interactive scrapes for every one of them.
+            reusing = not is_background and not self._reuse_slots.locked()
+            if reusing:
+                await self._reuse_slots.acquire()
+            context = _ReusableContext(config.BATCH_CONTEXT_REUSE) if reusing else None
+            try:
+                while queue:
+                    item = queue.popleft()
+                    progress["by_marketplace"][mp.id]["remaining"] -= 1
+                    progress["running_tasks"] += 1
+                    try:
+                        result = await scrape.scrape_marketplace(
+                            mp,
+                            item.query,
+                            force_refresh=force_refresh,
+                            browser_context=context.get if context else None,
+                        )
+                    finally:
+                        progress["running_tasks"] -= 1
+                    if result["status"] != "success" and context is not None:
+                        await context.close()
+                    record(mp, item, result)
+                    if len(rows) >= self.write_size:
+                        await flush()
+            finally:
+                if context is not None:
+                    await context.close()
+                if reusing:
+                    self._reuse_slots.release()
+
+        # One lane per marketplace, each with its own workers and queue, so
+        # every site is worked on at once and a slow site only delays itself.
+        lanes: list[tuple[marketplace.Marketplace, deque[BatchItem]]] = []
+        for mp in marketplaces:
+            queue = deque(items)
+            lanes.extend((mp, queue) for _ in range(min(self.lane_workers, len(items))))
+
+        status = "completed"
+        try:
+            async with AsyncSessionLocal() as db:
+                await crud_scrape_batch.update_batch_status(db, batch_id, "running")
+            progress["status"] = "running"
+            workers = [asyncio.create_task(lane(mp, queue)) for mp, queue in lanes]
+            try:
+                await asyncio.gather(*workers)
+            except BaseException:
+                for worker in workers:
+                    worker.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                raise
+            finally:
+                await flush()
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        except Exception as e:
+            status = "failed"
+            progress["error_message"] = f"{type(e).__name__}: {str(e)}"
+        finally:
+            progress["status"] = status
+            # Requests the batch never got to end with the batch's status
+            # rather than staying pending.
+            unfinished = [
+                request_id for request_id, left in remaining.items() if left > 0
+            ]
+            async with AsyncSessionLocal() as db:
+                if unfinished:
+                    await crud_scrape_batch.finish_requests(
+                        db, unfinished, status, commit=False
+                    )
+                await crud_scrape_batch.update_batch_status(
+                    db, batch_id, status, finished=True
+                )
+            self._forget_progress(batch_id)
+
+    def running(self, batch_id: int) -> bool:
+        return batch_id in self._tasks
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._tasks),
+            "tracked": len(self._progress),
+        }
+
+    async def shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+batch_manager = BatchManager()
+
+
+async def start_batch(
+    db: AsyncSession,
+    items: list[tuple[Optional[int], str]],
+    marketplaces: list[marketplace.Marketplace],
+    force_refresh: bool = False,
+    is_background: bool = False,
+) -> ScrapeBatch:
+    new_batch = await crud_scrape_batch.create_batch(db, len(items), len(marketplaces))
+    request_ids = await crud_scrape_batch.create_batch_requests(
+        db, new_batch.id, [query for _, query in items]
+    )
+    batch_items = [
+        BatchItem(request_id, product_id, query)
+        for request_id, (product_id, query) in zip(request_ids, items)
+    ]
+    if config.SCRAPE_EXECUTION == "queue":
+        await crud_scrape_task.enqueue_batch_tasks(
+            db, batch_items, [mp.id for mp in marketplaces], force_refresh
+        )
+    else:
+        batch_manager.submit(
+            new_batch.id, batch_items, marketplaces, force_refresh, is_background
+        )
+    return new_batch
@@ -0,0 +1,91 @@
+import fnmatch
+import re
+from functools import lru_cache
+
+from playwright.async_api import Page, Response, Route
+
+import config
+from models import marketplace
+
+
+# Rough transfer sizes used to estimate what an aborted request would have cost.
+_ESTIMATED_BYTES = {
+    "image": 60_000,
+    "media": 500_000,
+    "font": 40_000,
+    "stylesheet": 30_000,
+    "script": 50_000,
+    "xhr": 5_000,
+    "fetch": 5_000,
+}
+_DEFAULT_ESTIMATED_BYTES = 10_000
+
+_stats: dict[int, dict] = {}
+
+
+@lru_cache(maxsize=256)
+def _compile(patterns: tuple[str, ...]) -> re.Pattern | None:
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(p) for p in patterns))
+
+
+def _marketplace_stats(marketplace_id: int) -> dict:
+    stats = _stats.get(marketplace_id)
+    if stats is None:
+        stats = {
+            "requests_allowed": 0,
+            "requests_blocked": 0,
+            "blocked_by_type": {},
+            "bytes_loaded": 0,
+            "estimated_bytes_saved": 0,
+        }
+        _stats[marketplace_id] = stats
+    return stats
+
+
+def should_block(
+    url: str,
+    resource_type: str,
+    allow: re.Pattern | None,
+    deny: re.Pattern | None,
+) -> bool:
+    if allow is not None and allow.match(url):
+        return False
+    if deny is not None and deny.match(url):
+        return True
+    return resource_type in config.BLOCKED_RESOURCE_TYPES
+
+
+async def install_request_filter(page: Page, marketplace: marketplace.Marketplace):
+    allow = _compile(tuple(marketplace.allow_url_patterns or ()))
+    deny = _compile(
+        tuple(config.BLOCKED_URL_PATTERNS) + tuple(marketplace.block_url_patterns or ())
+    )
+    stats = _marketplace_stats(marketplace.id)
+
+    async def handle(route: Route):
+        request = route.request
+        if should_block(request.url, request.resource_type, allow, deny):
+            stats["requests_blocked"] += 1
+            by_type = stats["blocked_by_type"]
+            by_type[request.resource_type] = by_type.get(request.resource_type, 0) + 1
+            stats["estimated_bytes_saved"] += _ESTIMATED_BYTES.get(
+                request.resource_type, _DEFAULT_ESTIMATED_BYTES
+            )
+            await route.abort("blockedbyclient")
+        else:
+            stats["requests_allowed"] += 1
+            await route.continue_()
+
+    def count_response(response: Response):
+        length = response.headers.get("content-length")
+        if length and length.isdigit():
+            stats["bytes_loaded"] += int(length)
+
+    page.on("response", count_response)
+    await page.route("**/*", handle)
+
+
+def stats() -> dict:
+    return _stats
@@ -0,0 +1,95 @@
+import time
+from collections import deque
+
+import config
+from models import marketplace
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        window: int = config.BREAKER_WINDOW,
+        failure_threshold: int = config.BREAKER_FAILURE_THRESHOLD,
+        open_seconds: float = config.BREAKER_OPEN_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probing = False
+        self.last_error: str | None = None
+        self.times_opened = 0
+        self.skipped = 0
+
+    def retry_after(self) -> float:
+        return max(0.0, self._opened_at + self.open_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        if self.state == OPEN and self.retry_after() == 0:
+            self.state = HALF_OPEN
+        if self.state == CLOSED:
+            return True
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.skipped += 1
+        return False
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self.times_opened += 1
+
+    def record(self, success: bool, error: str | None = None):
+        if not success:
+            self.last_error = error
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if success:
+                self.state = CLOSED
+                self._outcomes.clear()
+            else:
+                self._open()
+            return
+        self._outcomes.append(success)
+        if self._outcomes.count(False) >= self.failure_threshold:
+            self._outcomes.clear()
+            self._open()
+
+    def abandon(self):
+        self._probing = False
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "recent_failures": self._outcomes.count(False),
+            "recent_outcomes": len(self._outcomes),
+            "retry_after_seconds": (
+                round(self.retry_after()) if self.state == OPEN else None
+            ),
+            "times_opened": self.times_opened,
+            "skipped": self.skipped,
+            "last_error": self.last_error,
+        }
+
+
+_breakers: dict[int, CircuitBreaker] = {}
+
+
+def breaker_for(marketplace: marketplace.Marketplace) -> CircuitBreaker:
+    breaker = _breakers.get(marketplace.id)
+    if breaker is None:
+        breaker = CircuitBreaker()
+        _breakers[marketplace.id] = breaker
+    return breaker
+
+
+def stats() -> dict:
+    return {
+        marketplace_id: breaker.stats() for marketplace_id, breaker in _breakers.items()
+    }
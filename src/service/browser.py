@@ -0,0 +1,175 @@
+import asyncio
+import os
+from contextlib import asynccontextmanager
+
+import psutil
+from playwright.async_api import Browser, async_playwright
+
+import config
+from service.fanout import PrioritySemaphore, background
+
+
+class _BrowserSlot:
+    def __init__(self, browser: Browser):
+        self.browser = browser
+        self.pages_served = 0
+        self.active = 0
+        self.retiring = False
+        # Serializes relaunches of this slot's browser.
+        self.lock = asyncio.Lock()
+
+
+class BrowserPool:
+    def __init__(
+        self,
+        size: int = config.BROWSER_POOL_SIZE,
+        contexts_per_browser: int = config.BROWSER_CONTEXTS_PER_BROWSER,
+        max_pages: int = config.BROWSER_MAX_PAGES,
+        max_memory_mb: int = config.BROWSER_MAX_MEMORY_MB,
+        headless: bool = config.BROWSER_HEADLESS,
+    ):
+        self.size = size
+        self.contexts_per_browser = contexts_per_browser
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.headless = headless
+        self._playwright = None
+        self._slots: list[_BrowserSlot] = []
+        # Interactive scrapes are served first, and background work always
+        # leaves them at least one context.
+        capacity = size * contexts_per_browser
+        self._semaphore = PrioritySemaphore(capacity, max(1, capacity - 1))
+        self._condition = asyncio.Condition()
+        self.recycled = 0
+
+    @property
+    def started(self) -> bool:
+        return self._playwright is not None
+
+    async def start(self):
+        if self.started:
+            return
+        self._playwright = await async_playwright().start()
+        for _ in range(self.size):
+            self._slots.append(_BrowserSlot(await self._launch()))
+
+    async def stop(self):
+        if not self.started:
+            return
+        for slot in self._slots:
+            await self._close_browser(slot.browser)
+        self._slots.clear()
+        await self._playwright.stop()
+        self._playwright = None
+
+    @asynccontextmanager
+    async def context(self, **context_options):
+        if not self.started:
+            await self.start()
+        async with self._semaphore.slot(background.get()):
+            slot = await self._acquire_slot()
+            context = None
+            try:
+                context = await slot.browser.new_context(**context_options)
+                context.on("page", lambda _: self._count_page(slot))
+                yield context
+            finally:
+                if context is not None:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                await self._release_slot(slot)
+
+    def _count_page(self, slot: _BrowserSlot):
+        slot.pages_served += 1
+
+    def stats(self) -> dict:
+        return {
+            "browsers": len(self._slots),
+            "active_contexts": sum(slot.active for slot in self._slots),
+            "pages_served": [slot.pages_served for slot in self._slots],
+            "recycled": self.recycled,
+            "memory_mb": round(self._chromium_memory_mb(), 1),
+        }
+
+    async def _launch(self) -> Browser:
+        return await self._playwright.chromium.launch(headless=self.headless)
+
+    async def _close_browser(self, browser: Browser):
+        try:
+            await browser.close()
+        except Exception:
+            pass
+
+    # Launches happen outside the pool condition, so acquires and releases on
+    # other slots never wait for Chromium to start. The pool never holds more
+    # than `size` browsers: while every slot is being recycled, acquires wait.
+    async def _acquire_slot(self) -> _BrowserSlot:
+        async with self._condition:
+            await self._condition.wait_for(
+                lambda: any(not slot.retiring for slot in self._slots)
+            )
+            slot = min(
+                (slot for slot in self._slots if not slot.retiring),
+                key=lambda s: s.active,
+            )
+            slot.active += 1
+        try:
+            async with slot.lock:
+                if not slot.browser.is_connected():
+                    await self._close_browser(slot.browser)
+                    slot.browser = await self._launch()
+                    slot.pages_served = 0
+        except BaseException:
+            await self._release_slot(slot)
+            raise
+        return slot
+
+    async def _release_slot(self, slot: _BrowserSlot):
+        async with self._condition:
+            slot.active -= 1
+            if not slot.retiring and self._should_recycle(slot):
+                slot.retiring = True
+            if not slot.retiring or slot.active > 0:
+                return
+        await self._recycle(slot)
+
+    def _should_recycle(self, slot: _BrowserSlot) -> bool:
+        if slot.pages_served >= self.max_pages:
+            return True
+        if self._chromium_memory_mb() < self.max_memory_mb:
+            return False
+        oldest = max(self._slots, key=lambda s: s.pages_served)
+        return oldest is slot
+
+    async def _recycle(self, slot: _BrowserSlot):
+        try:
+            async with slot.lock:
+                await self._close_browser(slot.browser)
+                slot.browser = await self._launch()
+                slot.pages_served = 0
+                self.recycled += 1
+        finally:
+            # A failed launch leaves a closed browser behind; the next acquire
+            # of this slot launches it again.
+            async with self._condition:
+                slot.retiring = False
+                self._condition.notify_all()
+
+    def _chromium_memory_mb(self) -> float:
+        try:
+            children = psutil.Process(os.getpid()).children(recursive=True)
+        except psutil.Error:
+            return 0.0
+        total = 0
+        for child in children:
+            try:
+                if "chrom" in child.name().lower():
+                    total += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return total / (1024 * 1024)
+
+
+pool = BrowserPool()
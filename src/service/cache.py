@@ -0,0 +1,178 @@
+import asyncio
+import datetime
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+import config
+from crud import scrape_cache as crud_scrape_cache
+from database import AsyncSessionLocal
+from models import marketplace
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.lower().split())
+
+
+def _ttl_seconds(marketplace: marketplace.Marketplace) -> int:
+    if marketplace.cache_ttl_seconds is not None:
+        return marketplace.cache_ttl_seconds
+    return config.SCRAPE_CACHE_TTL_SECONDS
+
+
+def _to_payload(result: dict) -> dict:
+    return {
+        "items": result["items"],
+        "render_mode": result.get("render_mode"),
+        "scraped_at": result["scraped_at"].isoformat(),
+    }
+
+
+def _from_payload(marketplace_id: int, payload: dict) -> dict:
+    return {
+        "marketplace_id": marketplace_id,
+        "items": [dict(item) for item in payload["items"]],
+        "scraped_at": datetime.date.fromisoformat(payload["scraped_at"]),
+        "status": "success",
+        "error_message": None,
+        "render_mode": payload.get("render_mode"),
+        "cached": True,
+        "failed_pages": 0,
+    }
+
+
+class ScrapeCache:
+    def __init__(
+        self,
+        max_entries: int = config.SCRAPE_CACHE_MAX_ENTRIES,
+        persist: bool = config.SCRAPE_CACHE_PERSIST,
+    ):
+        self.max_entries = max_entries
+        self.persist = persist
+        self._entries: OrderedDict[tuple[int, str], tuple[float, dict]] = OrderedDict()
+        self._inflight: dict[tuple[int, str], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.persistent_hits = 0
+
+    def _get_memory(self, key: tuple[int, str]) -> dict | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, payload = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return payload
+
+    def _put_memory(self, key: tuple[int, str], payload: dict, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, payload)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _get_persistent(self, key: tuple[int, str]) -> tuple[dict, int] | None:
+        try:
+            async with AsyncSessionLocal() as db:
+                entry = await crud_scrape_cache.get_cached_result(db, *key)
+        except Exception:
+            return None
+        if entry is None:
+            return None
+        remaining = (entry.expires_at - datetime.datetime.now()).total_seconds()
+        return entry.result, int(remaining)
+
+    async def _put_persistent(self, key: tuple[int, str], payload: dict, ttl: int):
+        expires_at = datetime.datetime.now() + datetime.timedelta(seconds=ttl)
+        try:
+            async with AsyncSessionLocal() as db:
+                await crud_scrape_cache.save_cached_result(
+                    db, *key, payload, expires_at
+                )
+        except Exception:
+            pass
+
+    async def get_or_scrape(
+        self,
+        marketplace: marketplace.Marketplace,
+        query: str,
+        scrape: Callable[[], Awaitable[dict]],
+        force_refresh: bool = False,
+    ) -> dict:
+        ttl = _ttl_seconds(marketplace)
+        if ttl <= 0:
+            return await scrape()
+
+        key = (marketplace.id, normalize_query(query))
+        # When the leader's result can't be shared, the first waiter to wake
+        # becomes the next leader and the rest wait on it in turn, so a
+        # failing site still sees one scrape at a time.
+        while not force_refresh:
+            payload = self._get_memory(key)
+            if payload is not None:
+                self.hits += 1
+                return _from_payload(marketplace.id, payload)
+
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            self.coalesced += 1
+            payload = await asyncio.shield(inflight)
+            if payload is not None:
+                return _from_payload(marketplace.id, payload)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            if self.persist and not force_refresh:
+                persisted = await self._get_persistent(key)
+                if persisted is not None:
+                    payload, remaining = persisted
+                    self.persistent_hits += 1
+                    self._put_memory(key, payload, remaining)
+                    future.set_result(payload)
+                    return _from_payload(marketplace.id, payload)
+
+            self.misses += 1
+            result = await scrape()
+            payload = None
+            # Only complete successes are cached or handed to coalesced
+            # callers. A crawl that lost pages, or a failure caused by the
+            # leader's own deadline, makes the others scrape for themselves.
+            if (
+                result["status"] == "success"
+                and result["items"]
+                and not result.get("failed_pages")
+            ):
+                payload = _to_payload(result)
+                self._put_memory(key, payload, ttl)
+            future.set_result(payload)
+            if payload is not None and self.persist:
+                await self._put_persistent(key, payload, ttl)
+            return result
+        except BaseException:
+            if not future.done():
+                future.set_result(None)
+            raise
+        finally:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses + self.coalesced + self.persistent_hits
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "persistent_hits": self.persistent_hits,
+            "coalesced": self.coalesced,
+            "misses": self.misses,
+            "hit_ratio": round(
+                (lookups - self.misses) / lookups if lookups else 0.0, 3
+            ),
+            "inflight": len(self._inflight),
+        }
+
+
+scrape_cache = ScrapeCache()
@@ -0,0 +1,58 @@
+import asyncio
+import datetime
+import logging
+
+import config
+from crud import scrape as crud_scrape
+from database import AsyncSessionLocal
+
+logger = logging.getLogger("scrape.changes")
+
+
+# Change feed positions are assigned here, in the background, so reading
+# /scrape/changes stays a plain SELECT however many clients poll it.
+class ChangeSequencer:
+    def __init__(self, interval_seconds: float = config.CHANGE_FEED_INTERVAL_SECONDS):
+        self.interval_seconds = interval_seconds
+        self._task: asyncio.Task | None = None
+        self.runs = 0
+        self.sequenced = 0
+        self.last_run_at: datetime.datetime | None = None
+
+    async def run_once(self) -> int:
+        self.runs += 1
+        self.last_run_at = datetime.datetime.now()
+        async with AsyncSessionLocal() as db:
+            sequenced = await crud_scrape.sequence_changes(db)
+        self.sequenced += sequenced
+        return sequenced
+
+    async def run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("change sequencing failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "runs": self.runs,
+            "sequenced": self.sequenced,
+            "last_run_at": self.last_run_at,
+        }
+
+
+change_sequencer = ChangeSequencer()
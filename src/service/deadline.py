@@ -0,0 +1,74 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import httpx
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+import config
+
+STAGES = ("navigation", "readiness", "extraction", "write")
+
+_SHARES = {
+    "navigation": config.DEADLINE_NAVIGATION_SHARE,
+    "readiness": config.DEADLINE_READINESS_SHARE,
+    "extraction": config.DEADLINE_EXTRACTION_SHARE,
+    "write": config.DEADLINE_WRITE_SHARE,
+}
+
+
+_TIMEOUTS = (TimeoutError, PlaywrightTimeoutError, httpx.TimeoutException)
+
+
+# A timeout that only happened because the client's deadline shortened the
+# stage. It says nothing about the marketplace, so it must not count against
+# its circuit breaker or concurrency limit.
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    def __init__(self, total_ms: int):
+        self.total_ms = total_ms
+        self.expires_at = time.monotonic() + total_ms / 1000
+
+    def remaining_ms(self) -> float:
+        return max(0.0, (self.expires_at - time.monotonic()) * 1000)
+
+    def _reserved_after_ms(self, stage: str) -> float:
+        later = STAGES[STAGES.index(stage) + 1 :]
+        return sum(_SHARES[s] for s in later) * self.total_ms
+
+    # Time a stage may use: its usual timeout, but never so much that the
+    # stages after it lose their share of the total budget.
+    def stage_ms(self, stage: str, default_ms: float) -> float:
+        available = self.remaining_ms() - self._reserved_after_ms(stage)
+        return max(min(default_ms, available), config.DEADLINE_MIN_STAGE_MS)
+
+    def scrape_seconds(self) -> float:
+        return (
+            max(0.0, self.remaining_ms() - self._reserved_after_ms("extraction")) / 1000
+        )
+
+
+current: ContextVar[Deadline | None] = ContextVar("scrape_deadline", default=None)
+
+
+def stage_ms(stage: str, default_ms: float) -> float:
+    deadline = current.get()
+    if deadline is None:
+        return default_ms
+    return deadline.stage_ms(stage, default_ms)
+
+
+@contextmanager
+def stage_budget(stage: str, default_ms: float):
+    budget = stage_ms(stage, default_ms)
+    try:
+        yield budget
+    except _TIMEOUTS as e:
+        if budget < default_ms:
+            raise DeadlineExceeded(
+                f"{stage} cut to {budget:.0f} ms by the request deadline"
+            ) from e
+        raise
@@ -0,0 +1,138 @@
+import asyncio
+import csv
+import datetime
+import io
+import json
+from typing import AsyncIterator
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from service.archive import SCRAPED_PRODUCTS_SCHEMA
+
+COLUMNS = SCRAPED_PRODUCTS_SCHEMA.names
+
+MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+
+def _description(value) -> str | None:
+    return json.dumps(value, ensure_ascii=False) if value is not None else None
+
+
+class CsvEncoder:
+    def __init__(self):
+        self._header = True
+
+    def encode(self, rows: list[dict]) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if self._header:
+            writer.writerow(COLUMNS)
+            self._header = False
+        for row in rows:
+            writer.writerow(
+                [
+                    (
+                        _description(row[column])
+                        if column == "scraped_description"
+                        else row[column]
+                    )
+                    for column in COLUMNS
+                ]
+            )
+        return buffer.getvalue().encode()
+
+    def finish(self) -> bytes:
+        return self.encode([]) if self._header else b""
+
+
+class NdjsonEncoder:
+    def encode(self, rows: list[dict]) -> bytes:
+        return "".join(
+            json.dumps(
+                {column: row[column] for column in COLUMNS},
+                ensure_ascii=False,
+                default=str,
+            )
+            + "\n"
+            for row in rows
+        ).encode()
+
+    def finish(self) -> bytes:
+        return b""
+
+
+# Collects what the Parquet writer emits so it can be sent and dropped
+# right away, while still reporting the absolute offsets the footer needs.
+class _ChunkSink(io.RawIOBase):
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        chunk = bytes(data)
+        self._chunks.append(chunk)
+        self._position += len(chunk)
+        return len(chunk)
+
+    def tell(self) -> int:
+        return self._position
+
+    def take(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+class ParquetEncoder:
+    def __init__(self):
+        self._sink = _ChunkSink()
+        self._writer = pq.ParquetWriter(
+            self._sink, SCRAPED_PRODUCTS_SCHEMA, compression="zstd"
+        )
+
+    def encode(self, rows: list[dict]) -> bytes:
+        if rows:
+            self._writer.write_table(
+                pa.Table.from_pylist(
+                    [
+                        {
+                            **row,
+                            "scraped_description": _description(
+                                row["scraped_description"]
+                            ),
+                        }
+                        for row in rows
+                    ],
+                    schema=SCRAPED_PRODUCTS_SCHEMA,
+                )
+            )
+        return self._sink.take()
+
+    def finish(self) -> bytes:
+        self._writer.close()
+        return self._sink.take()
+
+
+ENCODERS = {"csv": CsvEncoder, "ndjson": NdjsonEncoder, "parquet": ParquetEncoder}
+
+
+def filename(fmt: str) -> str:
+    return f"scraped_products_{datetime.date.today():%Y%m%d}.{fmt}"
+
+
+async def encode(fmt: str, batches: AsyncIterator[list[dict]]) -> AsyncIterator[bytes]:
+    encoder = ENCODERS[fmt]()
+    async for rows in batches:
+        data = await asyncio.to_thread(encoder.encode, rows)
+        if data:
+            yield data
+    data = await asyncio.to_thread(encoder.finish)
+    if data:
+        yield data
@@ -0,0 +1,194 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from functools import lru_cache
+from typing import NamedTuple
+
+from bs4 import BeautifulSoup
+from selectolax.lexbor import LexborHTMLParser
+
+import config
+from models import marketplace
+
+
+class ExtractionPlan(NamedTuple):
+    product: str
+    title: str | None
+    price: str | None
+    link: str | None
+    description: str | None
+    next_page: str | None
+    limit: int
+
+
+class ExtractedPage(NamedTuple):
+    items: list[dict]
+    next_url: str | None
+
+
+def _class_selector(class_name: str | None) -> str | None:
+    if not class_name:
+        return None
+    return "." + ".".join(class_name.split())
+
+
+@lru_cache(maxsize=256)
+def _compile(
+    product_selector: str,
+    title_selector: str | None,
+    price_selector: str | None,
+    link_selector: str | None,
+    description_selector: str | None,
+    next_page_selector: str | None,
+    limit: int,
+) -> ExtractionPlan:
+    return ExtractionPlan(
+        product=product_selector,
+        title=_class_selector(title_selector),
+        price=_class_selector(price_selector),
+        link=_class_selector(link_selector),
+        description=_class_selector(description_selector),
+        next_page=next_page_selector or None,
+        limit=limit,
+    )
+
+
+def plan_for(marketplace: marketplace.Marketplace) -> ExtractionPlan:
+    return _compile(
+        marketplace.product_selector,
+        marketplace.title_selector,
+        marketplace.price_selector,
+        marketplace.link_selector,
+        marketplace.description_selector,
+        marketplace.next_page_selector,
+        marketplace.max_results or config.SCRAPE_MAX_RESULTS,
+    )
+
+
+def _card_selectolax(card, plan: ExtractionPlan) -> dict:
+    def first(selector):
+        return card.css_first(selector) if selector else None
+
+    title_element = first(plan.title)
+    price_element = first(plan.price)
+    link_element = first(plan.link)
+    desc_element = first(plan.description)
+
+    url = title_element.attributes.get("href") if title_element else None
+    if url is None and link_element is not None:
+        url = link_element.attributes.get("href")
+
+    description = None
+    if desc_element is not None:
+        description = {}
+        for dl in card.css("dl"):
+            dt = dl.css_first("dt")
+            dd = dl.css_first("dd")
+            if dt and dd:
+                description[dt.text(strip=True)] = dd.text(strip=True)
+
+    return {
+        "product_title": title_element.text(strip=True) if title_element else None,
+        "price": price_element.text(strip=True) if price_element else None,
+        "url": url,
+        "description": description,
+    }
+
+
+def _extract_selectolax(html: str | bytes, plan: ExtractionPlan) -> ExtractedPage:
+    tree = LexborHTMLParser(html)
+    cards = tree.css(plan.product)
+    next_link = tree.css_first(plan.next_page) if plan.next_page else None
+    return ExtractedPage(
+        items=[_card_selectolax(card, plan) for card in cards[: plan.limit]],
+        next_url=next_link.attributes.get("href") if next_link else None,
+    )
+
+
+def _card_bs4(card, plan: ExtractionPlan) -> dict:
+    def first(selector):
+        return card.select_one(selector) if selector else None
+
+    title_element = first(plan.title)
+    price_element = first(plan.price)
+    link_element = first(plan.link)
+    desc_element = first(plan.description)
+
+    url = title_element.get("href") if title_element else None
+    if url is None and link_element is not None:
+        url = link_element.get("href")
+
+    description = None
+    if desc_element is not None:
+        description = {}
+        for dl in card.find_all("dl"):
+            dt = dl.find("dt")
+            dd = dl.find("dd")
+            if dt and dd:
+                description[dt.get_text(strip=True)] = dd.get_text(strip=True)
+
+    return {
+        "product_title": title_element.get_text(strip=True) if title_element else None,
+        "price": price_element.get_text(strip=True) if price_element else None,
+        "url": url,
+        "description": description,
+    }
+
+
+def _extract_bs4(html: str | bytes, plan: ExtractionPlan) -> ExtractedPage:
+    soup = BeautifulSoup(html, "html.parser")
+    cards = soup.select(plan.product, limit=plan.limit)
+    next_link = soup.select_one(plan.next_page) if plan.next_page else None
+    return ExtractedPage(
+        items=[_card_bs4(card, plan) for card in cards],
+        next_url=next_link.get("href") if next_link else None,
+    )
+
+
+BACKENDS = {
+    "selectolax": _extract_selectolax,
+    "bs4": _extract_bs4,
+}
+
+
+def extract(
+    html: str | bytes, plan: ExtractionPlan, backend: str = config.EXTRACTOR_BACKEND
+) -> ExtractedPage:
+    return BACKENDS[backend](html, plan)
+
+
+_executor: ProcessPoolExecutor | None = None
+
+
+def _ready() -> bool:
+    return True
+
+
+# Workers come from a forkserver rather than a fork of this process, which by
+# now may hold the event loop and Playwright's threads. They are all started
+# here, at startup, instead of lazily on the first large page.
+def start_pool(workers: int = config.EXTRACT_PROCESS_WORKERS):
+    global _executor
+    if _executor is None and workers > 0:
+        _executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("forkserver"),
+        )
+        wait([_executor.submit(_ready) for _ in range(workers)])
+
+
+def stop_pool():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(cancel_futures=True)
+        _executor = None
+
+
+async def extract_async(
+    html: str | bytes, plan: ExtractionPlan, backend: str = config.EXTRACTOR_BACKEND
+) -> ExtractedPage:
+    payload = html.encode("utf-8") if isinstance(html, str) else html
+    if _executor is None or len(payload) < config.EXTRACT_INLINE_MAX_BYTES:
+        return extract(payload, plan, backend)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, extract, payload, plan, backend)
@@ -0,0 +1,158 @@
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Iterable, TypeVar
+
+import config
+from models import marketplace
+from service.limits import limiter_for
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+background: ContextVar[bool] = ContextVar("scrape_background", default=False)
+
+
+# Interactive waiters are always served before background ones, and background
+# work may never hold more than `background_limit` slots.
+class PrioritySemaphore:
+    def __init__(self, value: int, background_limit: int):
+        self._value = value
+        self._background_limit = background_limit
+        self._background = 0
+        self._waiters: list[tuple[bool, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    def _can_take(self, is_background: bool) -> bool:
+        if self._value <= 0:
+            return False
+        return not is_background or self._background < self._background_limit
+
+    def _take(self, is_background: bool):
+        self._value -= 1
+        if is_background:
+            self._background += 1
+
+    def _wake(self):
+        while self._waiters:
+            is_background, _, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._can_take(is_background):
+                break
+            heapq.heappop(self._waiters)
+            self._take(is_background)
+            future.set_result(None)
+
+    async def acquire(self, is_background: bool = False):
+        if not self._waiters and self._can_take(is_background):
+            self._take(is_background)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (is_background, next(self._order), future))
+        # An interactive caller may go straight ahead of background waiters
+        # that are held back by their own limit.
+        self._wake()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(is_background)
+            raise
+
+    def release(self, is_background: bool = False):
+        self._value += 1
+        if is_background:
+            self._background -= 1
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, is_background: bool = False):
+        await self.acquire(is_background)
+        try:
+            yield
+        finally:
+            self.release(is_background)
+
+    def stats(self) -> dict:
+        return {
+            "free": self._value,
+            "background_running": self._background,
+            "waiting": sum(1 for *_, future in self._waiters if not future.done()),
+        }
+
+
+_global_semaphore = PrioritySemaphore(
+    config.SCRAPE_MAX_CONCURRENCY, config.BACKGROUND_MAX_CONCURRENCY
+)
+
+
+async def run_bounded(
+    marketplace: marketplace.Marketplace,
+    worker: Callable[[], Awaitable[R]],
+    succeeded: Callable[[R], bool | None] | None = None,
+) -> R:
+    is_background = background.get()
+    limiter = limiter_for(marketplace).concurrency
+    await limiter.acquire(is_background)
+    try:
+        async with _global_semaphore.slot(is_background):
+            started = time.monotonic()
+            result = await worker()
+            latency = time.monotonic() - started
+    except asyncio.CancelledError:
+        await limiter.release()
+        raise
+    except Exception:
+        await limiter.release(error=True)
+        raise
+    ok = True if succeeded is None else succeeded(result)
+    if ok is None:
+        # The outcome says nothing about the marketplace, e.g. the caller's
+        # own deadline cut it short: no latency sample and no decrease.
+        await limiter.release()
+    else:
+        await limiter.release(latency=latency if ok else None, error=not ok)
+    return result
+
+
+# Workers are expected to wrap the expensive part of their work in run_bounded,
+# so cheap paths such as cache hits do not hold a concurrency slot. Workers
+# still running after `timeout` seconds are cancelled and reported as
+# TimeoutError.
+async def fan_out(
+    marketplaces: Iterable[T],
+    worker: Callable[[T], Awaitable[R]],
+    timeout: float | None = None,
+) -> list[R | BaseException]:
+    tasks = [asyncio.ensure_future(worker(marketplace)) for marketplace in marketplaces]
+    if not tasks:
+        return []
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+    except asyncio.CancelledError:
+        for task in tasks:
+            task.cancel()
+        raise
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+    outcomes = []
+    for task in tasks:
+        if task in pending:
+            outcomes.append(TimeoutError(f"Deadline exceeded after {timeout:.1f} s"))
+        elif task.cancelled():
+            outcomes.append(asyncio.CancelledError())
+        else:
+            outcomes.append(task.exception() or task.result())
+    return outcomes
+
+
+def stats() -> dict:
+    return _global_semaphore.stats()
@@ -0,0 +1,52 @@
+import httpx
+
+import config
+from service.deadline import stage_budget
+
+
+class HttpClient:
+    def __init__(self):
+        self._client: httpx.AsyncClient | None = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = self._build()
+        return self._client
+
+    def _build(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=True,
+            follow_redirects=True,
+            timeout=config.HTTP_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=config.HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=config.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            headers={
+                "User-Agent": config.HTTP_USER_AGENT,
+                "Accept": "text/html,application/xhtml+xml,*/*;q=0.8",
+                "Accept-Language": "uk-UA,uk;q=0.9,en;q=0.8",
+            },
+        )
+
+    async def start(self):
+        if self._client is None:
+            self._client = self._build()
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def get_html(self, url: str) -> bytes:
+        with stage_budget("navigation", config.HTTP_TIMEOUT_SECONDS * 1000) as budget:
+            response = await self.client.get(url, timeout=budget / 1000)
+        response.raise_for_status()
+        encoding = (response.charset_encoding or "utf-8").lower().replace("_", "-")
+        if encoding in ("utf-8", "utf8", "ascii", "us-ascii"):
+            return response.content
+        return response.text.encode("utf-8")
+
+
+http_client = HttpClient()
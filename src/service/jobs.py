@@ -0,0 +1,157 @@
+import asyncio
+import json
+from typing import AsyncIterator, Optional
+
+import config
+from crud import scrape as crud_scrape
+from database import AsyncSessionLocal
+from models import marketplace
+from schemas import ScrapeResultItem
+from service import runner
+
+_DONE = object()
+
+
+class JobEvents:
+    def __init__(self):
+        self.history: list[tuple[str, str]] = []
+        self._subscribers: set[asyncio.Queue] = set()
+        self.closed = False
+
+    def publish(self, event: str, data: str):
+        self.history.append((event, data))
+        for queue in self._subscribers:
+            queue.put_nowait((event, data))
+
+    def close(self):
+        self.closed = True
+        for queue in self._subscribers:
+            queue.put_nowait(_DONE)
+
+    async def subscribe(self) -> AsyncIterator[tuple[str, str]]:
+        queue: asyncio.Queue = asyncio.Queue()
+        replay = list(self.history)
+        if self.closed:
+            for event in replay:
+                yield event
+            return
+        self._subscribers.add(queue)
+        try:
+            for event in replay:
+                yield event
+            while True:
+                event = await queue.get()
+                if event is _DONE:
+                    return
+                yield event
+        finally:
+            self._subscribers.discard(queue)
+
+
+class JobManager:
+    def __init__(self, concurrency: int = config.SCRAPE_JOB_CONCURRENCY):
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._events: dict[int, JobEvents] = {}
+
+    def submit(
+        self,
+        request_id: int,
+        marketplaces: list[marketplace.Marketplace],
+        product_name: str,
+        product_id: Optional[int] = None,
+        force_refresh: bool = False,
+    ):
+        self._events[request_id] = JobEvents()
+        task = asyncio.create_task(
+            self._run(request_id, marketplaces, product_name, product_id, force_refresh)
+        )
+        self._tasks[request_id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(request_id, None))
+
+    def events(self, request_id: int) -> JobEvents | None:
+        return self._events.get(request_id)
+
+    def _forget_events(self, request_id: int):
+        asyncio.get_running_loop().call_later(
+            config.SCRAPE_JOB_EVENTS_RETENTION_SECONDS,
+            self._events.pop,
+            request_id,
+            None,
+        )
+
+    async def _finish(
+        self, db, request_id: int, events: JobEvents, status: str, **details
+    ):
+        await db.rollback()
+        await crud_scrape.update_scrape_request_status(
+            db, request_id, status, finished=True
+        )
+        events.publish("status", json.dumps({"status": status, **details}))
+
+    async def _run(
+        self,
+        request_id: int,
+        marketplaces: list[marketplace.Marketplace],
+        product_name: str,
+        product_id: Optional[int],
+        force_refresh: bool,
+    ):
+        events = self._events[request_id]
+
+        async def publish_items(
+            mp: marketplace.Marketplace, items: list[ScrapeResultItem]
+        ):
+            for item in items:
+                events.publish("result", item.model_dump_json())
+
+        try:
+            async with self._semaphore, AsyncSessionLocal() as db:
+                await crud_scrape.update_scrape_request_status(
+                    db, request_id, "running"
+                )
+                events.publish("status", json.dumps({"status": "running"}))
+                try:
+                    response = await runner.scrape_and_save(
+                        db,
+                        request_id,
+                        marketplaces,
+                        product_name,
+                        product_id,
+                        force_refresh=force_refresh,
+                        on_items=publish_items,
+                    )
+                except asyncio.CancelledError:
+                    await self._finish(db, request_id, events, "cancelled")
+                    raise
+                except Exception as e:
+                    await self._finish(
+                        db,
+                        request_id,
+                        events,
+                        "failed",
+                        error_message=f"{type(e).__name__}: {str(e)}",
+                    )
+                    return
+                events.publish(
+                    "status",
+                    json.dumps({"status": "completed", "summary": response.summary}),
+                )
+        finally:
+            events.close()
+            self._forget_events(request_id)
+
+    def stats(self) -> dict:
+        return {
+            "running": len(self._tasks),
+            "tracked": len(self._events),
+        }
+
+    async def shutdown(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+job_manager = JobManager()
@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+import config
+from models import marketplace
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def configure(self, rate: float, burst: int):
+        self._refill()
+        self.rate = rate
+        self.burst = burst
+        self._tokens = min(self._tokens, float(burst))
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(
+            float(self.burst), self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= 1
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+# Additive increase / multiplicative decrease, in the spirit of TCP congestion
+# control: every success grows the limit by about one slot per window of
+# requests, while an error, timeout or latency spike cuts it by
+# LIMIT_DECREASE_FACTOR. Decreases are spaced by one typical latency so a
+# single burst of failures only counts once.
+class AdaptiveLimiter:
+    def __init__(self, initial: int, minimum: int, maximum: int):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = float(min(max(initial, minimum), maximum))
+        self.in_flight = 0
+        self.latency: float | None = None
+        self.successes = 0
+        self.errors = 0
+        self.latency_spikes = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._interactive_waiting = 0
+        self._condition = asyncio.Condition()
+
+    def configure(self, minimum: int, maximum: int):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.limit = min(max(self.limit, minimum), maximum)
+
+    async def acquire(self, background: bool = False):
+        async with self._condition:
+            if background:
+                await self._condition.wait_for(
+                    lambda: self.in_flight < int(self.limit)
+                    and not self._interactive_waiting
+                )
+            else:
+                self._interactive_waiting += 1
+                try:
+                    await self._condition.wait_for(
+                        lambda: self.in_flight < int(self.limit)
+                    )
+                finally:
+                    self._interactive_waiting -= 1
+                    self._condition.notify_all()
+            self.in_flight += 1
+
+    # Takes a slot only if one is free right now and no interactive scrape is
+    # waiting for it; used to widen work that already holds a slot.
+    def try_acquire(self) -> bool:
+        if self.in_flight >= int(self.limit) or self._interactive_waiting:
+            return False
+        self.in_flight += 1
+        return True
+
+    def _decrease(self):
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency or 0):
+            return
+        self._last_decrease = now
+        self.decreases += 1
+        self.limit = max(self.minimum, self.limit * config.LIMIT_DECREASE_FACTOR)
+
+    def _increase(self):
+        self.limit = min(
+            self.maximum, self.limit + config.LIMIT_INCREASE_STEP / self.limit
+        )
+
+    async def release(self, latency: float | None = None, error: bool = False):
+        async with self._condition:
+            self.in_flight -= 1
+            if error:
+                self.errors += 1
+                self._decrease()
+            elif latency is not None:
+                baseline = self.latency
+                if (
+                    baseline is not None
+                    and latency > baseline * config.LIMIT_LATENCY_SPIKE_FACTOR
+                ):
+                    self.latency_spikes += 1
+                    self._decrease()
+                else:
+                    self.successes += 1
+                    self._increase()
+                alpha = config.LIMIT_LATENCY_EWMA_ALPHA
+                self.latency = (
+                    latency
+                    if baseline is None
+                    else baseline + alpha * (latency - baseline)
+                )
+            self._condition.notify_all()
+
+
+class MarketplaceLimiter:
+    def __init__(self, marketplace: marketplace.Marketplace):
+        rate, burst, maximum = _settings(marketplace)
+        self.bucket = TokenBucket(rate, burst)
+        self.concurrency = AdaptiveLimiter(
+            config.SCRAPE_MAX_CONCURRENCY_PER_MARKETPLACE,
+            config.LIMIT_MIN_CONCURRENCY,
+            maximum,
+        )
+
+    def configure(self, marketplace: marketplace.Marketplace):
+        rate, burst, maximum = _settings(marketplace)
+        if (rate, burst) != (self.bucket.rate, self.bucket.burst):
+            self.bucket.configure(rate, burst)
+        if maximum != self.concurrency.maximum:
+            self.concurrency.configure(config.LIMIT_MIN_CONCURRENCY, maximum)
+
+    def stats(self) -> dict:
+        return {
+            "requests_per_second": self.bucket.rate,
+            "burst": self.bucket.burst,
+            "tokens": round(self.bucket.tokens, 2),
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "max_concurrency": self.concurrency.maximum,
+            "in_flight": self.concurrency.in_flight,
+            "latency_ms": (
+                round(self.concurrency.latency * 1000)
+                if self.concurrency.latency is not None
+                else None
+            ),
+            "successes": self.concurrency.successes,
+            "errors": self.concurrency.errors,
+            "latency_spikes": self.concurrency.latency_spikes,
+            "decreases": self.concurrency.decreases,
+        }
+
+
+_limiters: dict[int, MarketplaceLimiter] = {}
+
+
+def _settings(marketplace: marketplace.Marketplace) -> tuple[float, int, int]:
+    rate = marketplace.rate_limit_per_second
+    burst = marketplace.rate_limit_burst
+    maximum = marketplace.max_concurrency
+    return (
+        config.RATE_LIMIT_PER_SECOND if rate is None else rate,
+        config.RATE_LIMIT_BURST if burst is None else burst,
+        max(
+            config.LIMIT_MIN_CONCURRENCY,
+            config.LIMIT_MAX_CONCURRENCY if maximum is None else maximum,
+        ),
+    )
+
+
+def limiter_for(marketplace: marketplace.Marketplace) -> MarketplaceLimiter:
+    limiter = _limiters.get(marketplace.id)
+    if limiter is None:
+        limiter = MarketplaceLimiter(marketplace)
+        _limiters[marketplace.id] = limiter
+    else:
+        limiter.configure(marketplace)
+    return limiter
+
+
+def stats() -> dict:
+    return {
+        marketplace_id: limiter.stats() for marketplace_id, limiter in _limiters.items()
+    }
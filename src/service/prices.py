@@ -0,0 +1,124 @@
+import re
+from decimal import Decimal, InvalidOperation
+from typing import NamedTuple
+
+# Decimal and grouping separators per marketplace locale. Unknown or missing
+# locales fall back to guessing from the string itself.
+LOCALES = {
+    "uk_UA": (",", " "),
+    "ru_RU": (",", " "),
+    "pl_PL": (",", " "),
+    "cs_CZ": (",", " "),
+    "fr_FR": (",", " "),
+    "de_DE": (",", "."),
+    "it_IT": (",", "."),
+    "es_ES": (",", "."),
+    "nl_NL": (",", "."),
+    "en_US": (".", ","),
+    "en_GB": (".", ","),
+    "de_CH": (".", "'"),
+}
+
+_CURRENCY_SYMBOLS = [
+    ("грн", "UAH"),
+    ("₴", "UAH"),
+    ("uah", "UAH"),
+    ("zł", "PLN"),
+    ("pln", "PLN"),
+    ("kč", "CZK"),
+    ("czk", "CZK"),
+    ("руб", "RUB"),
+    ("₽", "RUB"),
+    ("rub", "RUB"),
+    ("us$", "USD"),
+    ("usd", "USD"),
+    ("$", "USD"),
+    ("eur", "EUR"),
+    ("€", "EUR"),
+    ("gbp", "GBP"),
+    ("£", "GBP"),
+    ("chf", "CHF"),
+    ("jpy", "JPY"),
+    ("¥", "JPY"),
+]
+
+_MINOR_DIGITS = {"JPY": 0, "KRW": 0, "HUF": 0}
+
+# Digits may be grouped by a separator followed by exactly three digits, so
+# "2 599 1 999 ₴" (old and new price side by side) stops after "2 599".
+_NUMBER = re.compile(r"(?:\d{1,3}(?:[\s.,'’]\d{3})+|\d+)(?:[.,]\d+)?")
+_SPACES = re.compile(r"[\s  ]")
+
+
+class ParsedPrice(NamedTuple):
+    minor: int | None
+    currency: str | None
+
+
+def detect_currency(raw: str) -> str | None:
+    lowered = raw.lower()
+    for symbol, code in _CURRENCY_SYMBOLS:
+        if symbol in lowered:
+            return code
+    return None
+
+
+def _guess_decimal_separator(number: str) -> str | None:
+    last_dot, last_comma = number.rfind("."), number.rfind(",")
+    if last_dot >= 0 and last_comma >= 0:
+        return "." if last_dot > last_comma else ","
+    separator = "." if last_dot >= 0 else "," if last_comma >= 0 else None
+    if separator is None or number.count(separator) > 1:
+        return None
+    # "12,50" or "9.9" are decimals, "1,299" or "12.000" are grouped thousands.
+    return separator if len(number) - number.rfind(separator) - 1 in (1, 2) else None
+
+
+def parse_amount(raw: str, locale: str | None = None) -> Decimal | None:
+    match = _NUMBER.search(raw)
+    if match is None:
+        return None
+    number = _SPACES.sub("", match.group()).rstrip(".,'’")
+    if locale in LOCALES:
+        decimal_separator, group_separator = LOCALES[locale]
+        foreign = any(
+            c in number for c in ".," if c not in (decimal_separator, group_separator)
+        )
+        if decimal_separator not in number:
+            decimal_separator = _guess_decimal_separator(number) if foreign else None
+        elif number.count(decimal_separator) > 1:
+            decimal_separator = None
+    else:
+        decimal_separator = _guess_decimal_separator(number)
+
+    if decimal_separator is None:
+        integer, fraction = number, ""
+    else:
+        integer, _, fraction = number.rpartition(decimal_separator)
+    integer = re.sub(r"\D", "", integer)
+    fraction = re.sub(r"\D", "", fraction)
+    if not integer and not fraction:
+        return None
+    try:
+        return Decimal(f"{integer or 0}.{fraction or 0}")
+    except InvalidOperation:
+        return None
+
+
+def to_minor(amount: Decimal, currency: str | None) -> int:
+    digits = _MINOR_DIGITS.get(currency or "", 2)
+    return int((amount * 10**digits).to_integral_value())
+
+
+def parse_price(
+    raw: str | None,
+    locale: str | None = None,
+    default_currency: str | None = None,
+) -> ParsedPrice:
+    if not raw:
+        return ParsedPrice(None, default_currency)
+    currency = detect_currency(raw) or default_currency
+    amount = parse_amount(raw, locale)
+    if amount is None:
+        return ParsedPrice(None, currency)
+    return ParsedPrice(to_minor(amount, currency), currency)
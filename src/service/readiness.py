@@ -0,0 +1,101 @@
+import math
+import time
+from collections import deque
+
+from playwright.async_api import Page
+
+import config
+from models import marketplace
+from service.deadline import stage_budget, stage_ms
+
+
+_QUIET_DOM_SCRIPT = """
+([quietMs, capMs]) => new Promise((resolve) => {
+    let quietTimer;
+    const done = () => {
+        observer.disconnect();
+        clearTimeout(quietTimer);
+        clearTimeout(capTimer);
+        resolve();
+    };
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(done, quietMs);
+    });
+    observer.observe(document, {
+        subtree: true, childList: true, attributes: true, characterData: true,
+    });
+    quietTimer = setTimeout(done, quietMs);
+    const capTimer = setTimeout(done, capMs);
+})
+"""
+
+_observations: dict[int, deque] = {}
+
+
+def _percentile(samples, percent: float) -> float:
+    ordered = sorted(samples)
+    rank = max(0, math.ceil(percent / 100 * len(ordered)) - 1)
+    return ordered[rank]
+
+
+def record_ready_time(marketplace_id: int, elapsed_ms: float):
+    samples = _observations.get(marketplace_id)
+    if samples is None:
+        samples = deque(maxlen=config.READY_SAMPLE_SIZE)
+        _observations[marketplace_id] = samples
+    samples.append(elapsed_ms)
+
+
+def _tuned_budget_ms(marketplace_id: int) -> int | None:
+    samples = _observations.get(marketplace_id)
+    if not samples or len(samples) < config.READY_MIN_SAMPLES:
+        return None
+    tuned = _percentile(samples, config.READY_PERCENTILE) * config.READY_HEADROOM
+    return int(max(config.READY_MIN_WAIT_MS, tuned))
+
+
+def wait_budget_ms(marketplace: marketplace.Marketplace) -> int:
+    cap = marketplace.ready_max_wait_ms or config.READY_MAX_WAIT_MS
+    tuned = _tuned_budget_ms(marketplace.id)
+    return cap if tuned is None else min(cap, tuned)
+
+
+async def wait_until_ready(page: Page, marketplace: marketplace.Marketplace) -> float:
+    with stage_budget("readiness", wait_budget_ms(marketplace)) as budget:
+        strategy = marketplace.ready_strategy or "selector"
+        started = time.perf_counter()
+
+        if strategy == "networkidle":
+            await page.wait_for_load_state("networkidle", timeout=budget)
+        elif strategy == "mutation":
+            quiet = marketplace.ready_quiet_ms or 500
+            await page.evaluate(_QUIET_DOM_SCRIPT, [quiet, budget])
+        elif strategy == "timeout":
+            await page.wait_for_timeout(budget)
+
+        spent = (time.perf_counter() - started) * 1000
+        await page.wait_for_selector(
+            marketplace.product_selector,
+            state="attached",
+            timeout=max(
+                budget - spent, stage_ms("readiness", config.READY_MIN_WAIT_MS)
+            ),
+        )
+
+    elapsed = (time.perf_counter() - started) * 1000
+    if strategy != "timeout":
+        record_ready_time(marketplace.id, elapsed)
+    return elapsed
+
+
+def stats() -> dict:
+    result = {}
+    for marketplace_id, samples in _observations.items():
+        result[marketplace_id] = {
+            "samples": len(samples),
+            "p50_ms": round(_percentile(samples, 50)),
+            "p95_ms": round(_percentile(samples, 95)),
+            "tuned_budget_ms": _tuned_budget_ms(marketplace_id),
+        }
+    return result
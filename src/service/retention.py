@@ -0,0 +1,142 @@
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import signal
+
+import config
+from crud import price_history as crud_price_history
+from crud import scrape as crud_scrape
+from database import AsyncSessionLocal
+from service import archive
+
+logger = logging.getLogger("scrape.retention")
+
+
+class RetentionJob:
+    def __init__(
+        self,
+        days: int = config.RETENTION_DAYS,
+        batch_size: int = config.RETENTION_BATCH_SIZE,
+        interval_seconds: float = config.RETENTION_INTERVAL_SECONDS,
+        price_history_days: int = config.PRICE_HISTORY_RETENTION_DAYS,
+    ):
+        self.days = days
+        self.price_history_days = price_history_days
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self._task: asyncio.Task | None = None
+        self.runs = 0
+        self.archived = 0
+        self.files = 0
+        self.last_run_at: datetime.datetime | None = None
+
+    def may_have_archived(self, day: datetime.date) -> bool:
+        # Rows are archived by their last sighting, which for a request's rows
+        # is never before the request itself.
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=self.days)
+        return day <= cutoff.date()
+
+    async def archive_batch(self, cutoff: datetime.datetime) -> int:
+        async with AsyncSessionLocal() as db:
+            rows = await crud_scrape.get_expired_rows(db, cutoff, self.batch_size)
+            if not rows:
+                await db.commit()
+                return 0
+            paths = await asyncio.to_thread(archive.write_rows, rows)
+            try:
+                await crud_scrape.delete_scraped_products(
+                    db, [row["id"] for row in rows]
+                )
+                await db.commit()
+            except BaseException:
+                # The rows are still in Postgres, so the files must go.
+                for path in paths:
+                    os.remove(path)
+                raise
+        self.archived += len(rows)
+        self.files += len(paths)
+        return len(rows)
+
+    # Each batch is its own transaction, so the table is never locked for
+    # long and an interrupted run simply resumes with the next batch.
+    async def run_once(self) -> int:
+        self.runs += 1
+        self.last_run_at = datetime.datetime.now()
+        cutoff = self.last_run_at - datetime.timedelta(days=self.days)
+        total = 0
+        while True:
+            archived = await self.archive_batch(cutoff)
+            total += archived
+            if archived < self.batch_size:
+                break
+        if total:
+            logger.info("archived %s scraped rows older than %s", total, cutoff)
+        if self.price_history_days > 0:
+            history_cutoff = self.last_run_at - datetime.timedelta(
+                days=self.price_history_days
+            )
+            for name in await crud_price_history.drop_partitions_before(
+                history_cutoff.date()
+            ):
+                logger.info("dropped price history partition %s", name)
+        return total
+
+    async def run(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception:
+                logger.exception("retention run failed")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "retention_days": self.days,
+            "price_history_retention_days": self.price_history_days,
+            "runs": self.runs,
+            "archived_rows": self.archived,
+            "archive_files": self.files,
+            "archived_months": archive.months(),
+            "last_run_at": self.last_run_at,
+        }
+
+
+retention_job = RetentionJob()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Archive old scraped rows.")
+    parser.add_argument("--once", action="store_true", help="Run a single pass.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.once:
+        await retention_job.run_once()
+        return
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    retention_job.start()
+    try:
+        await stopping.wait()
+    finally:
+        await retention_job.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
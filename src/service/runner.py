@@ -0,0 +1,210 @@
+import asyncio
+from datetime import date
+from typing import Awaitable, Callable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import config
+from crud import scrape as crud_scrape
+from models import marketplace
+from schemas import ScrapedProductCreate, ScrapeProductResponse, ScrapeResultItem
+from service import scrape
+from service.deadline import Deadline, DeadlineExceeded
+from service.snapshots import content_hash, snapshot_key
+
+OnItems = Callable[[marketplace.Marketplace, list[ScrapeResultItem]], Awaitable[None]]
+
+
+def product_data(
+    request_id: int,
+    marketplace: marketplace.Marketplace,
+    product_id: Optional[int],
+    query: str,
+    scrape_result: dict,
+    item: dict,
+) -> ScrapedProductCreate:
+    success = scrape_result["status"] == "success"
+    return ScrapedProductCreate(
+        request_id=request_id,
+        marketplace_id=marketplace.id,
+        product_id=product_id,
+        scraped_product_title=item.get("product_title"),
+        scraped_price=item.get("price"),
+        price_minor=item.get("price_minor"),
+        scraped_currency=item.get("currency"),
+        scraped_description=item.get("description"),
+        product_url=item.get("url"),
+        scraped_at=scrape_result["scraped_at"],
+        status=scrape_result["status"],
+        error_message=scrape_result.get("error_message"),
+        marketplace_name=marketplace.name,
+        page=item.get("page"),
+        position=item.get("position"),
+        snapshot_key=(
+            snapshot_key(product_id, query, marketplace.id, item.get("url"))
+            if success
+            else None
+        ),
+        content_hash=content_hash(
+            item.get("product_title"),
+            item.get("price"),
+            item.get("price_minor"),
+            item.get("currency"),
+            item.get("description"),
+        ),
+    )
+
+
+def result_items(
+    marketplace: marketplace.Marketplace, scrape_result: dict
+) -> list[ScrapeResultItem]:
+    return [
+        ScrapeResultItem(
+            marketplace_name=marketplace.name,
+            status=scrape_result["status"],
+            page=item.get("page"),
+            position=item.get("position"),
+            product_title=item.get("product_title"),
+            price=item.get("price"),
+            price_minor=item.get("price_minor"),
+            currency=item.get("currency"),
+            description=item.get("description"),
+            url=item.get("url"),
+            scraped_at=scrape_result["scraped_at"],
+            error_message=scrape_result.get("error_message"),
+        )
+        for item in scrape_result["items"] or [{}]
+    ]
+
+
+def summary(scrape_results: list[dict]) -> dict:
+    return {
+        "total_marketplaces_processed": len(scrape_results),
+        "successful_scrapes": sum(
+            1 for r in scrape_results if r["status"] == "success"
+        ),
+        "failed_scrapes": sum(1 for r in scrape_results if r["status"] != "success"),
+        "total_products_found": sum(len(r["items"]) for r in scrape_results),
+        "cached_marketplaces": sum(1 for r in scrape_results if r.get("cached")),
+        "skipped_marketplaces": sum(
+            1 for r in scrape_results if r["status"] == "circuit_open"
+        ),
+        "timed_out_marketplaces": sum(
+            1 for r in scrape_results if r["status"] == "timed_out"
+        ),
+        "failed_pages": sum(r.get("failed_pages", 0) for r in scrape_results),
+    }
+
+
+async def save_result(
+    db: AsyncSession,
+    request_id: int,
+    marketplace: marketplace.Marketplace,
+    product_id: Optional[int],
+    query: str,
+    scrape_result: dict,
+    commit: bool = True,
+):
+    await crud_scrape.save_scraped_products(
+        db,
+        [
+            product_data(
+                request_id, marketplace, product_id, query, scrape_result, item
+            )
+            for item in scrape_result["items"] or [{}]
+        ],
+        commit=commit,
+    )
+
+
+async def scrape_and_save(
+    db: AsyncSession,
+    request_id: int,
+    marketplaces: list[marketplace.Marketplace],
+    product_name: str,
+    product_id: Optional[int] = None,
+    force_refresh: bool = False,
+    on_items: OnItems | None = None,
+    deadline: Deadline | None = None,
+) -> ScrapeProductResponse:
+    rows: list[ScrapedProductCreate] = []
+    write_lock = asyncio.Lock()
+    writes: set[asyncio.Task] = set()
+    page_result = {"scraped_at": date.today(), "status": "success"}
+
+    # Rows are buffered and only written early when the buffer grows large.
+    # Writes run in their own tasks so that cancelling a scrape at its
+    # deadline never interrupts a commit on the shared session.
+    async def flush():
+        async def save():
+            async with write_lock:
+                products, rows[:] = list(rows), []
+                await crud_scrape.save_scraped_products(db, products)
+
+        task = asyncio.ensure_future(save())
+        writes.add(task)
+        task.add_done_callback(writes.discard)
+        await asyncio.shield(task)
+
+    async def save_page(mp: marketplace.Marketplace, page: int, items: list[dict]):
+        rows.extend(
+            product_data(request_id, mp, product_id, product_name, page_result, item)
+            for item in items
+        )
+        if len(rows) >= config.BULK_WRITE_SIZE:
+            await flush()
+
+    async def finish_marketplace(mp: marketplace.Marketplace, scrape_result: dict):
+        if not scrape_result["items"]:
+            rows.append(
+                product_data(
+                    request_id, mp, product_id, product_name, scrape_result, {}
+                )
+            )
+        if on_items is not None:
+            await on_items(mp, result_items(mp, scrape_result))
+
+    scrape_results = await scrape.scrape_marketplaces(
+        marketplaces,
+        product_name,
+        on_page=save_page,
+        force_refresh=force_refresh,
+        on_result=finish_marketplace,
+        deadline=deadline,
+    )
+    await asyncio.gather(*writes)
+
+    async def finish():
+        await crud_scrape.save_scraped_products(db, rows, commit=False)
+        await crud_scrape.update_scrape_request_status(
+            db, request_id, "completed", finished=True
+        )
+
+    if deadline is None:
+        await finish()
+    else:
+        # The last write gets what is left of the deadline, at least the
+        # write share that scraping was not allowed to use.
+        budget_ms = deadline.stage_ms("write", deadline.remaining_ms())
+        try:
+            await asyncio.wait_for(finish(), budget_ms / 1000)
+        except TimeoutError as e:
+            await db.rollback()
+            await crud_scrape.update_scrape_request_status(
+                db, request_id, "timed_out", finished=True
+            )
+            raise DeadlineExceeded(
+                f"write ran past the request deadline ({budget_ms:.0f} ms left)"
+            ) from e
+
+    results = []
+    for mp, scrape_result in zip(marketplaces, scrape_results):
+        results.extend(result_items(mp, scrape_result))
+
+    return ScrapeProductResponse(
+        scrape_request_id=request_id,
+        product_name_searched=product_name,
+        results=results,
+        summary=summary(scrape_results),
+        scraped_at=date.today(),
+    )
@@ -0,0 +1,162 @@
+import asyncio
+import datetime
+import logging
+import random
+import signal
+
+import config
+from crud import marketplace as crud_marketplace
+from crud import product as crud_product
+from crud import scrape as crud_scrape
+from database import AsyncSessionLocal
+from models.product import Product
+from service import extract
+from service.batch import batch_manager, start_batch
+from service.browser import pool as browser_pool
+from service.http import http_client
+
+logger = logging.getLogger("scrape.scheduler")
+
+
+def _interval(product: Product) -> datetime.timedelta:
+    minutes = product.refresh_interval_minutes
+    if minutes is None:
+        minutes = config.SCHEDULER_DEFAULT_INTERVAL_MINUTES
+    return datetime.timedelta(minutes=minutes)
+
+
+def _jittered(interval: datetime.timedelta) -> datetime.timedelta:
+    return interval * (
+        1 + random.uniform(-config.SCHEDULER_JITTER, config.SCHEDULER_JITTER)
+    )
+
+
+class RefreshScheduler:
+    def __init__(
+        self,
+        tick_seconds: float = config.SCHEDULER_TICK_SECONDS,
+        max_per_tick: int = config.SCHEDULER_MAX_PER_TICK,
+    ):
+        self.tick_seconds = tick_seconds
+        self.max_per_tick = max_per_tick
+        self._task: asyncio.Task | None = None
+        self._batch_id: int | None = None
+        self.ticks = 0
+        self.placed = 0
+        self.refreshed = 0
+        self.skipped_fresh = 0
+        self.last_tick_at: datetime.datetime | None = None
+
+    async def tick(self):
+        # Never pile a new refresh batch on top of one that is still running;
+        # due products simply wait for the next tick.
+        if self._batch_id is not None and batch_manager.running(self._batch_id):
+            return
+        now = datetime.datetime.now()
+        self.ticks += 1
+        self.last_tick_at = now
+        async with AsyncSessionLocal() as db:
+            products = await crud_product.get_due_products(db, now, self.max_per_tick)
+            if not products:
+                await db.commit()
+                return
+            last_success = await crud_scrape.get_last_success_times(
+                db, [product.id for product in products]
+            )
+
+            schedule = {}
+            due = []
+            for product in products:
+                interval = _interval(product)
+                scraped_at = last_success.get(product.id)
+                if product.next_refresh_at is None:
+                    # First time the product is seen: place it at a random
+                    # point of its period so refreshes spread evenly.
+                    schedule[product.id] = now + interval * random.random()
+                    self.placed += 1
+                elif (
+                    scraped_at is not None
+                    and now - scraped_at < interval * config.SCHEDULER_FRESH_FRACTION
+                ):
+                    schedule[product.id] = scraped_at + _jittered(interval)
+                    self.skipped_fresh += 1
+                else:
+                    schedule[product.id] = now + _jittered(interval)
+                    due.append(product)
+            await crud_product.set_next_refresh(db, schedule)
+
+            if not due:
+                return
+            marketplaces = [
+                mp for mp in await crud_marketplace.get_marketplaces(db) if mp.is_active
+            ]
+            if not marketplaces:
+                return
+            batch = await start_batch(
+                db,
+                [(product.id, product.global_query_name) for product in due],
+                marketplaces,
+                is_background=True,
+            )
+            self._batch_id = batch.id
+            self.refreshed += len(due)
+            logger.info(
+                "scheduled refresh batch %s for %s products", batch.id, len(due)
+            )
+
+    async def run(self):
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                logger.exception("refresh scheduler tick failed")
+            await asyncio.sleep(self.tick_seconds)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self._task is not None,
+            "ticks": self.ticks,
+            "placed": self.placed,
+            "refreshed": self.refreshed,
+            "skipped_fresh": self.skipped_fresh,
+            "last_tick_at": self.last_tick_at,
+            "batch_id": self._batch_id,
+        }
+
+
+refresh_scheduler = RefreshScheduler()
+
+
+async def main():
+    logging.basicConfig(level=logging.INFO)
+    extract.start_pool()
+    await http_client.start()
+    await browser_pool.start()
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    refresh_scheduler.start()
+    try:
+        await stopping.wait()
+    finally:
+        await refresh_scheduler.stop()
+        await batch_manager.shutdown()
+        await browser_pool.stop()
+        await http_client.stop()
+        extract.stop_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,67 +1,431 @@
+import asyncio
+import logging
+import time
 from datetime import date, datetime
+from typing import Awaitable, Callable, NamedTuple
 from urllib.parse import urljoin
-from playwright.async_api import async_playwright
+from playwright.async_api import BrowserContext
 from playwright_stealth import stealth_async
-from bs4 import BeautifulSoup
 from models import marketplace
+from service.blocking import install_request_filter
+from service.breaker import CircuitBreaker, breaker_for
+from service.browser import pool as browser_pool
+from service.extract import ExtractedPage, extract_async, plan_for
+from service.cache import scrape_cache
+from service.deadline import (
+    Deadline,
+    DeadlineExceeded,
+    current as deadline_context,
+    stage_budget,
+)
+from service.fanout import fan_out, run_bounded
+from service.http import http_client
+from service.limits import limiter_for
+from service.prices import parse_price
+from service.readiness import wait_until_ready
+import config
 
+logger = logging.getLogger("scrape.render")
 
-async def scrape_product(marketplace: marketplace.Marketplace, product_name: str):
-    search_url = marketplace.base_search_url.format(query=product_name)
-    result = {
+_learned_modes: dict[int, tuple[str, float]] = {}
+_static_failures: dict[int, tuple[int, str]] = {}
+
+OnPage = Callable[[marketplace.Marketplace, int, list[dict]], Awaitable[None]]
+OnResult = Callable[[marketplace.Marketplace, dict], Awaitable[None]]
+ContextFactory = Callable[[], Awaitable[BrowserContext]]
+
+
+class Crawl(NamedTuple):
+    items: list[dict]
+    page_errors: list[str]
+
+
+def _empty_result(marketplace: marketplace.Marketplace) -> dict:
+    return {
         "marketplace_id": marketplace.id,
-        "product_title": None,
-        "price": None,
-        "url": None,
-        "description": None,
+        "items": [],
         "scraped_at": date.today(),
         "status": "error_scraping",
         "error_message": None,
+        "render_mode": None,
+        "cached": False,
+        "failed_pages": 0,
     }
 
-    browser = None
+
+def _circuit_open_result(
+    marketplace: marketplace.Marketplace, breaker: CircuitBreaker
+) -> dict:
+    result = _empty_result(marketplace)
+    result["status"] = "circuit_open"
+    result["error_message"] = (
+        f"Circuit open for {marketplace.name} after repeated failures, "
+        f"last error: {breaker.last_error}"
+    )
+    return result
+
+
+async def _replay_pages(
+    marketplace: marketplace.Marketplace, items: list[dict], on_page: OnPage
+):
+    pages: dict[int, list[dict]] = {}
+    for item in items:
+        pages.setdefault(item.get("page") or 1, []).append(item)
+    for page, page_items in sorted(pages.items()):
+        await on_page(marketplace, page, page_items)
+
+
+async def _scrape_live(
+    mp: marketplace.Marketplace,
+    product_name: str,
+    on_page: OnPage | None,
+    browser_context: ContextFactory | None,
+) -> dict:
+    breaker = breaker_for(mp)
+    if not breaker.allow():
+        return _circuit_open_result(mp, breaker)
+    recorded = False
+    try:
+        result = await run_bounded(
+            mp,
+            lambda: scrape_product(mp, product_name, on_page, browser_context),
+            succeeded=_succeeded,
+        )
+        if result["status"] != "timed_out":
+            breaker.record(result["status"] == "success", result["error_message"])
+            recorded = True
+        return result
+    finally:
+        if not recorded:
+            breaker.abandon()
+
+
+def _succeeded(result: dict) -> bool | None:
+    # A scrape cut short by the client's deadline_ms is neither a success nor
+    # a marketplace failure.
+    if result["status"] == "timed_out":
+        return None
+    return result["status"] == "success"
+
+
+async def scrape_marketplace(
+    mp: marketplace.Marketplace,
+    product_name: str,
+    on_page: OnPage | None = None,
+    force_refresh: bool = False,
+    browser_context: ContextFactory | None = None,
+) -> dict:
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False)
-            context = await browser.new_context()
-            page = await context.new_page()
+        result = await scrape_cache.get_or_scrape(
+            mp,
+            product_name,
+            lambda: _scrape_live(mp, product_name, on_page, browser_context),
+            force_refresh=force_refresh,
+        )
+        if result.get("cached") and on_page is not None:
+            await _replay_pages(mp, result["items"], on_page)
+    except Exception as e:
+        result = _empty_result(mp)
+        result["error_message"] = f"{type(e).__name__}: {str(e)}"
+    return result
+
+
+async def scrape_marketplaces(
+    marketplaces: list[marketplace.Marketplace],
+    product_name: str,
+    on_page: OnPage | None = None,
+    force_refresh: bool = False,
+    on_result: OnResult | None = None,
+    deadline: Deadline | None = None,
+) -> list[dict]:
+    async def scrape_one(mp: marketplace.Marketplace) -> dict:
+        result = await scrape_marketplace(mp, product_name, on_page, force_refresh)
+        if on_result is not None:
+            await on_result(mp, result)
+        return result
+
+    token = deadline_context.set(deadline)
+    try:
+        outcomes = await fan_out(
+            marketplaces,
+            scrape_one,
+            timeout=deadline.scrape_seconds() if deadline is not None else None,
+        )
+    finally:
+        deadline_context.reset(token)
+
+    results = []
+    for mp, outcome in zip(marketplaces, outcomes):
+        if isinstance(outcome, BaseException):
+            result = _empty_result(mp)
+            result["error_message"] = f"{type(outcome).__name__}: {str(outcome)}"
+            if isinstance(outcome, TimeoutError):
+                result["status"] = "timed_out"
+                if on_result is not None:
+                    await on_result(mp, result)
+            outcome = result
+        results.append(outcome)
+    return results
+
 
-            await stealth_async(page)
+def _render_mode(marketplace: marketplace.Marketplace) -> str:
+    mode = marketplace.render_mode or "auto"
+    if mode != "auto":
+        return mode
+    learned = _learned_modes.get(marketplace.id)
+    if learned is None or learned[0] != "browser":
+        return "auto"
+    if time.monotonic() - learned[1] > config.RENDER_MODE_REPROBE_SECONDS:
+        return "auto"
+    return "browser"
 
-            await page.goto(search_url, timeout=10000)
-            await page.wait_for_timeout(6000)
 
-            await page.wait_for_selector(marketplace.product_selector, timeout=10000)
+def _remember_mode(marketplace: marketplace.Marketplace, mode: str):
+    if (marketplace.render_mode or "auto") == "auto":
+        _learned_modes[marketplace.id] = (mode, time.monotonic())
 
-            html = await page.content()
 
-        soup = BeautifulSoup(html, "html.parser")
+def _page_url(
+    marketplace: marketplace.Marketplace, product_name: str, page: int
+) -> str:
+    return marketplace.base_search_url.format(query=product_name, page=page)
 
-        title_element = soup.find(class_=marketplace.title_selector)
-        price_element = soup.find(class_=marketplace.price_selector)
-        url_element = soup.find(class_=marketplace.title_selector)
-        desc_element = soup.find(class_=marketplace.description_selector)
-        description = {}
-        for dl in soup.find_all("dl"):
-            dt = dl.find("dt")
-            dd = dl.find("dd")
-            if dt and dd:
-                key = dt.get_text(strip=True)
-                value = dd.get_text(strip=True)
-                description[key] = value
 
-        result["product_title"] = (
-            title_element.get_text(strip=True) if title_element else None
+async def _extract_page(
+    marketplace: marketplace.Marketplace, url: str, html: str | bytes, page: int
+) -> ExtractedPage:
+    deadline = deadline_context.get()
+    extracting = extract_async(html, plan_for(marketplace))
+    if deadline is None:
+        extracted = await extracting
+    else:
+        # Extraction has no timeout of its own, only the deadline's.
+        try:
+            extracted = await asyncio.wait_for(
+                extracting,
+                deadline.stage_ms("extraction", deadline.remaining_ms()) / 1000,
+            )
+        except TimeoutError as e:
+            raise DeadlineExceeded("extraction ran past the request deadline") from e
+    for position, item in enumerate(extracted.items, start=1):
+        if item["url"]:
+            item["url"] = urljoin(url, item["url"])
+        item["page"] = page
+        item["position"] = position
+        price = parse_price(
+            item["price"], marketplace.price_locale, marketplace.currency
         )
-        result["price"] = price_element.get_text(strip=True) if price_element else None
-        result["url"] = url_element.get("href") if url_element else None
-        result["description"] = description if desc_element else None
+        item["price_minor"] = price.minor
+        item["currency"] = price.currency
+    next_url = urljoin(url, extracted.next_url) if extracted.next_url else None
+    return ExtractedPage(extracted.items, next_url)
+
+
+async def _crawl(
+    marketplace: marketplace.Marketplace,
+    product_name: str,
+    fetch: Callable[[str], Awaitable[str | bytes]],
+    on_page: OnPage | None,
+) -> Crawl:
+    limiter = limiter_for(marketplace)
+
+    async def fetch_limited(page_url: str) -> str | bytes:
+        await limiter.bucket.acquire()
+        return await fetch(page_url)
+
+    url = _page_url(marketplace, product_name, 1)
+    first = await _extract_page(marketplace, url, await fetch_limited(url), 1)
+    if not first.items:
+        raise LookupError(f"Selector {marketplace.product_selector!r} not found")
+    if on_page is not None:
+        await on_page(marketplace, 1, first.items)
+
+    pages: dict[int, list[dict]] = {1: first.items}
+    page_errors: list[str] = []
+    max_pages = marketplace.max_pages or 1
+
+    # Once page 1 is in, a failed later page only loses that page: it is
+    # logged and reported with the result instead of failing the crawl.
+    async def scrape_page(page: int, page_url: str) -> ExtractedPage | None:
+        try:
+            extracted = await _extract_page(
+                marketplace, page_url, await fetch_limited(page_url), page
+            )
+            if on_page is not None and extracted.items:
+                await on_page(marketplace, page, extracted.items)
+        except Exception as e:
+            error = f"page {page}: {type(e).__name__}: {str(e)}"
+            logger.warning("crawl of %s failed on %s", marketplace.name, error)
+            page_errors.append(error)
+            return None
+        pages[page] = extracted.items
+        return extracted
+
+    if max_pages > 1 and "{page}" in marketplace.base_search_url:
+        # The crawl already holds one of the marketplace's concurrency slots;
+        # more pages run at once only for the extra slots that are free now.
+        remaining = list(range(2, max_pages + 1))
+        extra = 0
+        while extra < len(remaining) - 1 and limiter.concurrency.try_acquire():
+            extra += 1
+
+        async def worker():
+            while remaining:
+                page = remaining.pop(0)
+                await scrape_page(page, _page_url(marketplace, product_name, page))
+
+        try:
+            await asyncio.gather(*(worker() for _ in range(extra + 1)))
+        finally:
+            for _ in range(extra):
+                await limiter.concurrency.release()
+    elif max_pages > 1 and marketplace.next_page_selector:
+        next_url = first.next_url
+        for page in range(2, max_pages + 1):
+            if next_url is None:
+                break
+            extracted = await scrape_page(page, next_url)
+            if extracted is None or not extracted.items:
+                break
+            next_url = extracted.next_url
+
+    items = [item for _, page_items in sorted(pages.items()) for item in page_items]
+    return Crawl(items, page_errors)
+
+
+async def _scrape_static(
+    marketplace: marketplace.Marketplace, product_name: str, on_page: OnPage | None
+) -> Crawl:
+    return await _crawl(marketplace, product_name, http_client.get_html, on_page)
+
+
+async def _render(context, marketplace: marketplace.Marketplace, url: str) -> str:
+    page = await context.new_page()
+    try:
+        await stealth_async(page)
+        await install_request_filter(page, marketplace)
+
+        with stage_budget("navigation", 10000) as budget:
+            await page.goto(url, timeout=budget, wait_until="domcontentloaded")
+        await wait_until_ready(page, marketplace)
+
+        return await page.content()
+    finally:
+        await page.close()
+
+
+async def _scrape_browser(
+    marketplace: marketplace.Marketplace,
+    product_name: str,
+    on_page: OnPage | None,
+    browser_context: ContextFactory | None = None,
+) -> Crawl:
+    if browser_context is not None:
+        context = await browser_context()
+        return await _crawl(
+            marketplace,
+            product_name,
+            lambda url: _render(context, marketplace, url),
+            on_page,
+        )
+    async with browser_pool.context() as context:
+        return await _crawl(
+            marketplace,
+            product_name,
+            lambda url: _render(context, marketplace, url),
+            on_page,
+        )
+
+
+async def fetch_and_extract(
+    marketplace: marketplace.Marketplace,
+    product_name: str,
+    on_page: OnPage | None = None,
+    browser_context: ContextFactory | None = None,
+) -> tuple[Crawl, str]:
+    mode = _render_mode(marketplace)
+    if mode == "static":
+        return await _scrape_static(marketplace, product_name, on_page), "static"
+    if mode == "browser":
+        crawl = await _scrape_browser(
+            marketplace, product_name, on_page, browser_context
+        )
+        return crawl, "browser"
+
+    streamed = False
+
+    async def on_static_page(mp: marketplace.Marketplace, page: int, items):
+        nonlocal streamed
+        streamed = True
+        await on_page(mp, page, items)
+
+    try:
+        crawl = await _scrape_static(
+            marketplace, product_name, on_static_page if on_page else None
+        )
+        _remember_mode(marketplace, "static")
+        return crawl, "static"
+    except Exception as e:
+        # Pages already handed to on_page would be written a second time by
+        # the browser crawl, so a failure after that point is final. A
+        # deadline that cut the static fetch short would cut the browser too.
+        if streamed or isinstance(e, DeadlineExceeded):
+            raise
+        error = f"{type(e).__name__}: {str(e)}"
+        logger.debug(
+            "static fetch of %s failed, falling back to browser: %s",
+            marketplace.name,
+            error,
+        )
+        failures, _ = _static_failures.get(marketplace.id, (0, None))
+        _static_failures[marketplace.id] = (failures + 1, error)
+    crawl = await _scrape_browser(marketplace, product_name, on_page, browser_context)
+    _remember_mode(marketplace, "browser")
+    return crawl, "browser"
+
+
+def render_mode_stats() -> dict:
+    now = time.monotonic()
+    stats = {}
+    for marketplace_id in _learned_modes.keys() | _static_failures.keys():
+        mode, learned_at = _learned_modes.get(marketplace_id, (None, None))
+        failures, last_error = _static_failures.get(marketplace_id, (0, None))
+        stats[marketplace_id] = {
+            "mode": mode,
+            "learned_seconds_ago": (
+                round(now - learned_at) if learned_at is not None else None
+            ),
+            "static_failures": failures,
+            "last_static_error": last_error,
+        }
+    return stats
+
+
+async def scrape_product(
+    marketplace: marketplace.Marketplace,
+    product_name: str,
+    on_page: OnPage | None = None,
+    browser_context: ContextFactory | None = None,
+):
+    result = _empty_result(marketplace)
+
+    try:
+        crawl, result["render_mode"] = await fetch_and_extract(
+            marketplace, product_name, on_page, browser_context
+        )
+        result["items"] = crawl.items
         result["status"] = "success"
+        if crawl.page_errors:
+            result["failed_pages"] = len(crawl.page_errors)
+            result["error_message"] = (
+                f"{len(crawl.page_errors)} page(s) failed, "
+                f"first: {crawl.page_errors[0]}"
+            )
 
+    except DeadlineExceeded as e:
+        result["status"] = "timed_out"
+        result["error_message"] = f"{type(e).__name__}: {str(e)}"
     except Exception as e:
         result["error_message"] = f"{type(e).__name__}: {str(e)}"
-    finally:
-        if browser:
-            await browser.close()
 
     return result
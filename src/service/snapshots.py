@@ -0,0 +1,31 @@
+import hashlib
+import json
+from typing import Optional
+
+from service.cache import normalize_query
+
+
+def _digest(value) -> str:
+    encoded = json.dumps(value, ensure_ascii=False, sort_keys=True, default=str)
+    return hashlib.blake2b(encoded.encode(), digest_size=16).hexdigest()
+
+
+# Identifies "the same listing" across scrapes: tracked products by id,
+# ad-hoc searches by their normalized query.
+def snapshot_key(
+    product_id: Optional[int], query: str, marketplace_id: int, url: Optional[str]
+) -> Optional[str]:
+    if not url:
+        return None
+    owner = product_id if product_id is not None else normalize_query(query)
+    return _digest([owner, marketplace_id, str(url)])
+
+
+def content_hash(
+    title: Optional[str],
+    price: Optional[str],
+    price_minor: Optional[int],
+    currency: Optional[str],
+    description: Optional[dict],
+) -> str:
+    return _digest([title, price, price_minor, currency, description])
@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import logging
+import os
+import signal
+import socket
+
+import config
+from crud import marketplace as crud_marketplace
+from crud import scrape_task as crud_scrape_task
+from database import AsyncSessionLocal
+from models.scrapetask import ScrapeTask
+from service import extract, runner, scrape
+from service.browser import pool as browser_pool
+from service.http import http_client
+
+logger = logging.getLogger("scrape.worker")
+
+
+class Worker:
+    def __init__(
+        self,
+        concurrency: int = config.WORKER_CONCURRENCY,
+        lease_seconds: int = config.QUEUE_LEASE_SECONDS,
+        poll_seconds: float = config.WORKER_POLL_SECONDS,
+    ):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_seconds = poll_seconds
+        self._running: set[asyncio.Task] = set()
+        self._stopping = asyncio.Event()
+
+    def stop(self):
+        self._stopping.set()
+
+    async def run(self):
+        extract.start_pool()
+        await http_client.start()
+        await browser_pool.start()
+        logger.info("worker %s started", self.worker_id)
+        try:
+            while not self._stopping.is_set():
+                leased = await self._lease()
+                if not leased and not self._running:
+                    await self._sleep(self.poll_seconds)
+                elif self._running:
+                    await asyncio.wait(
+                        self._running,
+                        timeout=self.poll_seconds,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+            await asyncio.gather(*self._running, return_exceptions=True)
+        finally:
+            await browser_pool.stop()
+            await http_client.stop()
+            extract.stop_pool()
+            logger.info("worker %s stopped", self.worker_id)
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _lease(self) -> int:
+        free = self.concurrency - len(self._running)
+        if free <= 0:
+            return 0
+        try:
+            async with AsyncSessionLocal() as db:
+                for request_id in await crud_scrape_task.reap_expired_leases(db):
+                    await crud_scrape_task.finish_request_if_done(db, request_id)
+                tasks = await crud_scrape_task.lease_tasks(
+                    db, self.worker_id, free, self.lease_seconds
+                )
+        except Exception:
+            logger.exception("failed to lease scrape tasks")
+            return 0
+        for task in tasks:
+            running = asyncio.create_task(self._process(task))
+            self._running.add(running)
+            running.add_done_callback(self._running.discard)
+        return len(tasks)
+
+    async def _keep_lease(self, task_id: int):
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with AsyncSessionLocal() as db:
+                    await crud_scrape_task.renew_lease(
+                        db, task_id, self.worker_id, self.lease_seconds
+                    )
+            except Exception:
+                logger.exception("failed to renew lease of scrape task %s", task_id)
+
+    async def _process(self, task: ScrapeTask):
+        heartbeat = asyncio.create_task(self._keep_lease(task.id))
+        try:
+            async with AsyncSessionLocal() as db:
+                marketplace = await crud_marketplace.get_marketplace(
+                    db, task.marketplace_id
+                )
+                if marketplace is None:
+                    task.attempts = task.max_attempts
+                    if await crud_scrape_task.fail_task(
+                        db, task, self.worker_id, "Marketplace not found"
+                    ):
+                        await crud_scrape_task.finish_request_if_done(
+                            db, task.request_id
+                        )
+                    return
+
+                [result] = await scrape.scrape_marketplaces(
+                    [marketplace], task.query, force_refresh=task.force_refresh
+                )
+                final_attempt = task.attempts >= task.max_attempts
+                if result["status"] != "success" and not final_attempt:
+                    await crud_scrape_task.fail_task(
+                        db, task, self.worker_id, result["error_message"]
+                    )
+                    return
+
+                await runner.save_result(
+                    db,
+                    task.request_id,
+                    marketplace,
+                    task.product_id,
+                    task.query,
+                    result,
+                    commit=False,
+                )
+                if result["status"] == "success":
+                    finished = await crud_scrape_task.complete_task(
+                        db, task.id, self.worker_id
+                    )
+                else:
+                    finished = await crud_scrape_task.fail_task(
+                        db, task, self.worker_id, result["error_message"]
+                    )
+                if not finished:
+                    logger.warning(
+                        "lost the lease on scrape task %s, discarded its result",
+                        task.id,
+                    )
+                    return
+                await crud_scrape_task.finish_request_if_done(db, task.request_id)
+        except Exception as e:
+            logger.exception("scrape task %s failed", task.id)
+            async with AsyncSessionLocal() as db:
+                if await crud_scrape_task.fail_task(
+                    db, task, self.worker_id, f"{type(e).__name__}: {e}"
+                ):
+                    await crud_scrape_task.finish_request_if_done(db, task.request_id)
+        finally:
+            heartbeat.cancel()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Scrape queue worker.")
+    parser.add_argument("--concurrency", type=int, default=config.WORKER_CONCURRENCY)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    worker = Worker(concurrency=args.concurrency)
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    await worker.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,38 @@
+import pytest
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from database import Base
+from models import (
+    marketplace,
+    pricehistory,
+    product,
+    scrapebatch,
+    scrapecache,
+    scrapedproduct,
+    scraperequest,
+    scrapesighting,
+    scrapetask,
+)
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture
+async def db():
+    # price_history is partitioned, which only Postgres can create.
+    tables = [
+        table
+        for table in Base.metadata.sorted_tables
+        if table.name != pricehistory.PriceHistory.__tablename__
+    ]
+    engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all, tables=tables)
+        async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+            yield session
+    finally:
+        await engine.dispose()
@@ -0,0 +1,86 @@
+import datetime
+
+import pytest
+
+import config
+from service import archive
+
+pytestmark = pytest.mark.anyio
+
+
+def _row(id: int, request_id: int, marketplace_id: int, day: datetime.date) -> dict:
+    return {
+        "id": id,
+        "request_id": request_id,
+        "marketplace_id": marketplace_id,
+        "product_id": 1,
+        "scraped_product_title": f"title {id}",
+        "scraped_price": "1 299 ₴",
+        "price_minor": 129900,
+        "scraped_currency": "UAH",
+        "scraped_description": {"id": id},
+        "product_url": f"https://example.com/{id}",
+        "scraped_at": day,
+        "status": "success",
+        "error_message": None,
+        "page": 1,
+        "position": id,
+        "snapshot_key": None,
+        "content_hash": None,
+        "version": 1,
+        "previous_id": None,
+        "last_seen_at": None,
+        "last_request_id": request_id,
+    }
+
+
+@pytest.fixture
+def rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_DIR", str(tmp_path))
+    rows = [
+        _row(
+            id,
+            request_id=7 if id % 3 else 8,
+            marketplace_id=id % 2 + 1,
+            day=datetime.date(2026, 1 + id // 100, 1),
+        )
+        for id in range(1, 301)
+    ]
+    for start in range(0, 300, 50):
+        archive.write_rows(rows[start : start + 50])
+    # A retention run that crashed before deleting archives its batch again,
+    # into files whose id ranges overlap the first ones.
+    archive.write_rows(rows[30:120])
+    return rows
+
+
+def _expected(rows, request_id, after=0, limit=None) -> list[int]:
+    ids = [row["id"] for row in rows if row["request_id"] == request_id]
+    ids = [id for id in ids if id > after]
+    return ids if limit is None else ids[:limit]
+
+
+async def test_load_rows_skips_rows_archived_twice(rows):
+    loaded = await archive.load_rows(request_id=7)
+
+    assert sorted(row["id"] for row in loaded) == _expected(rows, 7)
+    assert loaded[0]["scraped_description"] == {"id": loaded[0]["id"]}
+
+
+@pytest.mark.parametrize("after,limit", [(0, 10), (35, 20), (110, 5), (290, 50)])
+async def test_load_rows_pages_by_id(rows, after, limit):
+    loaded = await archive.load_rows(request_id=7, after=after, limit=limit)
+
+    assert [row["id"] for row in loaded] == _expected(rows, 7, after, limit)
+
+
+async def test_read_rows_stops_once_the_limit_is_reached(rows):
+    read = sum(len(batch) for batch in archive.read_rows(request_id=7, limit=5))
+
+    assert read < len(_expected(rows, 7))
+
+
+def test_read_rows_without_an_archive(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "ARCHIVE_DIR", str(tmp_path))
+
+    assert list(archive.read_rows(request_id=7)) == []
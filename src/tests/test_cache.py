@@ -0,0 +1,78 @@
+import asyncio
+import datetime
+from types import SimpleNamespace
+
+import pytest
+
+from service.cache import ScrapeCache
+
+pytestmark = pytest.mark.anyio
+
+MARKETPLACE = SimpleNamespace(id=1, cache_ttl_seconds=60)
+
+
+def _scraper(status: str, items: list):
+    state = {"calls": 0, "running": 0, "peak": 0}
+
+    async def scrape():
+        state["calls"] += 1
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        return {"status": status, "items": items, "scraped_at": datetime.date.today()}
+
+    return scrape, state
+
+
+async def test_concurrent_callers_share_one_successful_scrape():
+    cache = ScrapeCache(persist=False)
+    scrape, state = _scraper("success", [{"title": "t"}])
+
+    results = await asyncio.gather(
+        *(cache.get_or_scrape(MARKETPLACE, "Query", scrape) for _ in range(3))
+    )
+
+    assert state["calls"] == 1
+    assert all(result["status"] == "success" for result in results)
+    assert cache.coalesced == 2
+
+
+async def test_failed_scrape_is_retried_by_one_waiter_at_a_time():
+    cache = ScrapeCache(persist=False)
+    scrape, state = _scraper("failed", [])
+
+    results = await asyncio.gather(
+        *(cache.get_or_scrape(MARKETPLACE, "query", scrape) for _ in range(3))
+    )
+
+    assert state["calls"] == 3
+    assert state["peak"] == 1
+    assert all(result["status"] == "failed" for result in results)
+    assert cache.stats()["inflight"] == 0
+
+
+async def test_waiter_takes_over_when_the_leader_raises():
+    cache = ScrapeCache(persist=False)
+    calls = 0
+
+    async def scrape():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        if calls == 1:
+            raise RuntimeError("browser crashed")
+        return {
+            "status": "success",
+            "items": [{"title": "t"}],
+            "scraped_at": datetime.date.today(),
+        }
+
+    results = await asyncio.gather(
+        *(cache.get_or_scrape(MARKETPLACE, "query", scrape) for _ in range(3)),
+        return_exceptions=True,
+    )
+
+    assert isinstance(results[0], RuntimeError)
+    assert [result["status"] for result in results[1:]] == ["success", "success"]
+    assert calls == 2
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from service.fanout import PrioritySemaphore
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_interactive_waiters_go_before_background_ones():
+    semaphore = PrioritySemaphore(1, 1)
+    await semaphore.acquire()
+    order = []
+
+    async def worker(name: str, is_background: bool):
+        async with semaphore.slot(is_background):
+            order.append(name)
+
+    tasks = [
+        asyncio.create_task(worker("background 1", True)),
+        asyncio.create_task(worker("interactive 1", False)),
+        asyncio.create_task(worker("background 2", True)),
+        asyncio.create_task(worker("interactive 2", False)),
+    ]
+    await asyncio.sleep(0)
+    semaphore.release()
+    await asyncio.gather(*tasks)
+
+    assert order == ["interactive 1", "interactive 2", "background 1", "background 2"]
+
+
+async def test_background_work_keeps_slots_free_for_interactive_work():
+    semaphore = PrioritySemaphore(3, 2)
+    await semaphore.acquire(True)
+    await semaphore.acquire(True)
+
+    background = asyncio.create_task(semaphore.acquire(True))
+    await asyncio.sleep(0)
+    assert not background.done()
+
+    await asyncio.wait_for(semaphore.acquire(), 1)
+    assert semaphore.stats()["free"] == 0
+
+    semaphore.release(True)
+    await asyncio.wait_for(background, 1)
+
+
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    semaphore = PrioritySemaphore(1, 1)
+    await semaphore.acquire()
+    waiter = asyncio.create_task(semaphore.acquire())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    semaphore.release()
+
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert semaphore.stats()["free"] == 1
@@ -0,0 +1,48 @@
+import pytest
+
+from service.prices import ParsedPrice, parse_price
+
+
+@pytest.mark.parametrize(
+    "raw, locale, default_currency, expected",
+    [
+        # Ukrainian storefronts: space or no-break space groups, comma decimals.
+        ("2 599 ₴", "uk_UA", None, ParsedPrice(259900, "UAH")),
+        ("2\u00a0599\u00a0₴", "uk_UA", None, ParsedPrice(259900, "UAH")),
+        ("2\u202f599 ₴", "uk_UA", None, ParsedPrice(259900, "UAH")),
+        ("2 599,50 грн", "uk_UA", None, ParsedPrice(259950, "UAH")),
+        ("1 234 567 грн", "uk_UA", None, ParsedPrice(123456700, "UAH")),
+        ("12999", "uk_UA", "UAH", ParsedPrice(1299900, "UAH")),
+        ("від 899 ₴", "uk_UA", None, ParsedPrice(89900, "UAH")),
+        # Old and new price in one element: only the first number counts.
+        ("2 599 1 999 ₴", "uk_UA", None, ParsedPrice(259900, "UAH")),
+        ("2599 1999 ₴", "uk_UA", None, ParsedPrice(259900, "UAH")),
+        # Dot groups, comma decimals.
+        ("1.299,00 €", "de_DE", None, ParsedPrice(129900, "EUR")),
+        ("12,5 €", "de_DE", None, ParsedPrice(1250, "EUR")),
+        ("1.299 €", "de_DE", None, ParsedPrice(129900, "EUR")),
+        # Comma groups, dot decimals.
+        ("$1,299.99", "en_US", None, ParsedPrice(129999, "USD")),
+        ("£12.50", "en_GB", None, ParsedPrice(1250, "GBP")),
+        ("1,299", "en_US", "USD", ParsedPrice(129900, "USD")),
+        # Apostrophe groups.
+        ("CHF 1'299.90", "de_CH", None, ParsedPrice(129990, "CHF")),
+        ("1’299.90 CHF", "de_CH", None, ParsedPrice(129990, "CHF")),
+        # No locale: the separator is guessed from the string.
+        ("1.299,00", None, "EUR", ParsedPrice(129900, "EUR")),
+        ("1,299.00", None, "USD", ParsedPrice(129900, "USD")),
+        ("12,50 zł", None, None, ParsedPrice(1250, "PLN")),
+        ("1,299", None, "USD", ParsedPrice(129900, "USD")),
+        ("9.9", None, "USD", ParsedPrice(990, "USD")),
+        # A separator the locale does not use still reads as a decimal.
+        ("12.50 грн", "uk_UA", None, ParsedPrice(1250, "UAH")),
+        # Currencies without minor units.
+        ("¥1,200", "en_US", None, ParsedPrice(1200, "JPY")),
+        # Nothing to parse.
+        (None, "uk_UA", "UAH", ParsedPrice(None, "UAH")),
+        ("", None, None, ParsedPrice(None, None)),
+        ("Немає в наявності", "uk_UA", "UAH", ParsedPrice(None, "UAH")),
+    ],
+)
+def test_parse_price(raw, locale, default_currency, expected):
+    assert parse_price(raw, locale, default_currency) == expected
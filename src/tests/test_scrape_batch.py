@@ -0,0 +1,42 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.future import select
+
+from crud import scrape_batch as crud_scrape_batch
+from models.scraperequest import ScrapeRequest
+
+pytestmark = pytest.mark.anyio
+
+# asyncpg accepts at most this many bind parameters in one statement.
+ASYNCPG_MAX_PARAMETERS = 32767
+
+
+async def test_create_batch_requests_past_bind_parameter_limit(db):
+    # Four parameters per row: one multi-VALUES statement would need 36000.
+    queries = [f"query {i}" for i in range(9000)]
+    batch = await crud_scrape_batch.create_batch(db, len(queries), 1)
+    parameter_counts = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        # A real executemany passes a list of rows, one statement each.
+        rows = parameters if isinstance(parameters, list) else [parameters]
+        parameter_counts.extend(len(row) for row in rows)
+
+    engine = db.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        request_ids = await crud_scrape_batch.create_batch_requests(
+            db, batch.id, queries
+        )
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+
+    assert max(parameter_counts) <= ASYNCPG_MAX_PARAMETERS
+    assert len(request_ids) == len(queries)
+    result = await db.execute(
+        select(ScrapeRequest.id, ScrapeRequest.product_name_searched).where(
+            ScrapeRequest.batch_id == batch.id
+        )
+    )
+    names = dict(result.all())
+    assert [names[request_id] for request_id in request_ids] == queries
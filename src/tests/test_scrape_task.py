@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy.future import select
+
+from crud import scrape_task as crud_scrape_task
+from models.scrapetask import ScrapeTask
+
+pytestmark = pytest.mark.anyio
+
+
+async def _leased_task(db, worker_id: str, attempts: int = 1) -> ScrapeTask:
+    task = ScrapeTask(
+        request_id=1,
+        marketplace_id=1,
+        query="query",
+        status="leased",
+        attempts=attempts,
+        max_attempts=3,
+        leased_by=worker_id,
+    )
+    db.add(task)
+    await db.commit()
+    return task
+
+
+async def test_complete_task_requires_the_lease(db):
+    task = await _leased_task(db, "worker-b")
+
+    assert not await crud_scrape_task.complete_task(db, task.id, "worker-a")
+    await db.refresh(task)
+    assert (task.status, task.leased_by) == ("leased", "worker-b")
+
+    assert await crud_scrape_task.complete_task(db, task.id, "worker-b")
+    await db.refresh(task)
+    assert task.status == "done"
+
+
+async def test_complete_task_rolls_back_the_callers_writes(db):
+    task = await _leased_task(db, "worker-b")
+    task_id = task.id
+    # Written by the stale worker in the same transaction as its completion.
+    db.add(ScrapeTask(request_id=2, marketplace_id=1, query="orphan"))
+    await db.flush()
+
+    assert not await crud_scrape_task.complete_task(db, task_id, "worker-a")
+    result = await db.execute(select(ScrapeTask.query))
+    assert result.scalars().all() == ["query"]
+
+
+async def _task_state(db, task_id: int) -> tuple:
+    result = await db.execute(
+        select(ScrapeTask.status, ScrapeTask.leased_by, ScrapeTask.last_error).where(
+            ScrapeTask.id == task_id
+        )
+    )
+    return tuple(result.one())
+
+
+async def test_fail_task_requires_the_lease(db):
+    task = await _leased_task(db, "worker-b")
+    task_id = task.id
+
+    assert not await crud_scrape_task.fail_task(db, task, "worker-a", "timeout")
+    assert await _task_state(db, task_id) == ("leased", "worker-b", None)
+
+    # The rollback expired the task, as it would in the worker.
+    await db.refresh(task)
+    assert await crud_scrape_task.fail_task(db, task, "worker-b", "timeout")
+    assert await _task_state(db, task_id) == ("queued", None, "timeout")
+
+
+async def test_fail_task_on_the_last_attempt_is_dead(db):
+    task = await _leased_task(db, "worker-b", attempts=3)
+
+    assert await crud_scrape_task.fail_task(db, task, "worker-b", "timeout")
+    assert await _task_state(db, task.id) == ("dead", None, "timeout")
+
+
+async def test_renew_lease_requires_the_lease(db):
+    task = await _leased_task(db, "worker-b")
+
+    assert not await crud_scrape_task.renew_lease(db, task.id, "worker-a", 60)
+    assert await crud_scrape_task.renew_lease(db, task.id, "worker-b", 60)